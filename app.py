@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
 from src.data_loader import DataLoader
-from src.feature_eng import FeatureEngineer
-from src.models import QuantileModels
-from src.deep_models import DeepQuantileModel
+from src.feature_eng import FeatureEngineer, target_column
+from src.ensemble import Ensemble
 from src.strategy import SignalGenerator
-from src.utils import evaluate_metrics
+from src.utils import evaluate_metrics, apply_calibration
+from src.calibration import ConformalCalibrator
+from src.registry import ModelRegistry
+# Pipeline settings shared with the nightly run, so the models it registers are found here
+from main import HORIZONS, FEATURE_COLS, CALIBRATION_WINDOW, LSTM_LOOKBACK, BACKTEST
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="AI Stock Forecaster", layout="wide", page_icon="📈")
@@ -15,7 +18,9 @@ st.set_page_config(page_title="AI Stock Forecaster", layout="wide", page_icon="
 if 'history' not in st.session_state: st.session_state['history'] = []
 if 'selected_ticker' not in st.session_state: st.session_state['selected_ticker'] = "RELIANCE.NS"
 
-def set_ticker(ticker): st.session_state['selected_ticker'] = ticker
+def set_ticker(ticker):
+    st.session_state['selected_ticker'] = ticker
+    st.session_state['active_ticker'] = ticker
 
 # --- CSS STYLING ---
 st.markdown("""
@@ -30,10 +35,19 @@ st.sidebar.header("Configuration")
 
 # Model Selection
 st.sidebar.subheader("Model Engine")
+# Every engine is an Ensemble (src/ensemble.py); single engines are one-member ensembles
+ENGINES = {
+    "LightGBM (Fast & Stable)": ("lightgbm",),
+    "XGBoost (Quantile)": ("xgboost",),
+    "LSTM Deep Learning (Experimental)": ("lstm",),
+    "Ensemble (Best Accuracy)": ("lightgbm", "xgboost", "lstm"),
+}
+# Default: LightGBM, the engine the nightly main.py run registers (MODEL_MEMBERS), so
+# the first forecast is a registry hit; the other engines train on first use
 MODEL_TYPE = st.sidebar.radio(
     "Choose Model Architecture:",
-    ("LightGBM (Fast & Stable)", "LSTM Deep Learning (Experimental)", "Ensemble (Best Accuracy)"),
-    index=2
+    list(ENGINES),
+    index=0
 )
 
 # History
@@ -45,9 +59,8 @@ if st.session_state['history']:
             st.rerun()
 
 TICKER = st.sidebar.text_input("Ticker Symbol", value=st.session_state['selected_ticker']).upper()
-HORIZON = st.sidebar.selectbox("Horizon", [5, 21, 60], format_func=lambda x: f"{x} Days")
+HORIZON = st.sidebar.selectbox("Horizon", HORIZONS, format_func=lambda x: f"{x} Days")
 CONFIDENCE = st.sidebar.slider("Confidence", 0.70, 0.99, 0.90)
-SPLIT_RATIO = 0.80
 
 if TICKER.endswith((".NS", ".BO")): CURRENCY = "₹"
 else: CURRENCY = "$"
@@ -55,14 +68,75 @@ else: CURRENCY = "$"
 st.title(f"{TICKER} Price Interval Forecasting")
 st.markdown(f"**Engine:** {MODEL_TYPE} • {int(CONFIDENCE*100)}% Confidence Interval")
 
+# --- CACHED PIPELINE STAGES ---
+# Each stage is keyed only by the inputs it depends on, so moving the Confidence
+# slider reuses the downloaded frame and indicators, and re-running a ticker from
+# "Recent" reuses everything. Targets and LightGBM models are built for every
+# horizon at once, so switching the Horizon is just a lookup.
+# TTLs pick up new bars during the day; max_entries bounds memory on a shared deployment.
+CACHE_TTL = 3600 # seconds
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=32, show_spinner=False)
+def load_data(ticker):
+    return DataLoader(ticker).fetch_data()
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=32, show_spinner=False)
+def load_indicators(ticker):
+    fe = FeatureEngineer(load_data(ticker))
+    return fe.add_technical_indicators()
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=32, show_spinner=False)
+def load_dataset(ticker):
+    # One Target_Return_{h} column per horizon, NaN where the future is not known yet
+    fe = FeatureEngineer(load_indicators(ticker))
+    return fe.create_targets(HORIZONS)
+
+def split_index(ticker):
+    # Shared by every horizon: the training rows are those where even the longest
+    # target is known, each horizon is then tested up to its own last known target.
+    # Moves in steps of main.MODEL_REFRESH_BARS.
+    return BACKTEST.training_rows(len(load_dataset(ticker).dropna()))
+
+def train_split(ticker, horizon):
+    df = load_dataset(ticker)
+    split_idx = split_index(ticker)
+    # float32 model input, like main.py's TickerFrame.matrix
+    return df[FEATURE_COLS].astype(np.float32).iloc[:split_idx], df[target_column(horizon)].iloc[:split_idx]
+
+# Fitted models are looked up in the on-disk registry (pre-warmed by the nightly
+# main.py run) and only trained on a miss; cache_resource then keeps them in memory.
+@st.cache_resource(ttl=CACHE_TTL, max_entries=16, show_spinner=False)
+def fit_models(ticker, confidence, members):
+    # {horizon: Ensemble} for every horizon at once. Members train concurrently and are
+    # weighted by their out-of-sample pinball loss; TensorFlow and XGBoost are only
+    # imported when an engine that uses them is selected.
+    ensemble = Ensemble(members, confidence, lookback=LSTM_LOOKBACK)
+    registry = ModelRegistry()
+    # Keyed by the last training bar: a model stays valid until the split moves
+    data_through = load_dataset(ticker).index[split_index(ticker) - 1]
+    # and the training rows are unchanged (same digest as main.py: revised data refits)
+    X_train = train_split(ticker, HORIZONS[0])[0]
+    targets = {h: train_split(ticker, h)[1] for h in HORIZONS}
+    digest = BACKTEST.training_fingerprint(X_train, targets)
+    specs = {h: (ticker, h, confidence, "ensemble", FEATURE_COLS, data_through) for h in HORIZONS}
+    models = {h: registry.get(*spec, params=ensemble.key_params(), fingerprint=digest) for h, spec in specs.items()}
+    if any(m is None for m in models.values()):
+        models = ensemble.fit_horizons(X_train, targets)
+        for h, spec in specs.items():
+            registry.put(models[h], *spec, params=ensemble.key_params(), fingerprint=digest)
+    return models
+
 # --- MAIN APP LOGIC ---
 
+# Once a forecast has been run for a ticker, widget changes re-render it from the caches
 if st.button("Run Forecast Model"):
+    st.session_state['active_ticker'] = TICKER
+
+if st.session_state.get('active_ticker') == TICKER:
     with st.spinner(f"Training {MODEL_TYPE} on {TICKER}..."):
         try:
             # 1. Data Pipeline
-            loader = DataLoader(TICKER)
-            raw_df = loader.fetch_data()
+            raw_df = load_data(TICKER)
             
             if raw_df is None or len(raw_df) < 200:
                 st.error("Insufficient data."); st.stop()
@@ -73,70 +147,38 @@ if st.button("Run Forecast Model"):
             if len(st.session_state['history']) > 5: st.session_state['history'].pop(0)
 
             # 2. Features
-            fe = FeatureEngineer(raw_df)
-            fe.add_technical_indicators()
-            df = fe.create_targets(HORIZON)
+            df = load_dataset(TICKER).dropna(subset=[target_column(HORIZON)])
 
-            feature_cols = ['Close', 'VIX', 'ATR', 'BB_Width', 'Return']
-            X = df[feature_cols]; y = df['Target_Return']
-            split_idx = int(len(X) * SPLIT_RATIO)
+            feature_cols = FEATURE_COLS
+            X = df[feature_cols].astype(np.float32); y = df[target_column(HORIZON)]
+            split_idx = split_index(TICKER)
             X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
             y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
             
-            # Prepare Inputs
-            last_row = fe.df.iloc[[-1]][feature_cols]
-
             # 3. Model Logic
-            f_low, f_high = 0, 0
-            pred_low, pred_high = 0, 0
-            
-            # --- MODEL A: LightGBM ---
-            if "LightGBM" in MODEL_TYPE or "Ensemble" in MODEL_TYPE:
-                alpha_lower = (1 - CONFIDENCE) / 2
-                qm = QuantileModels(alpha_lower, 1 - alpha_lower)
-                m_low_lgb, m_high_lgb = qm.train_lgbm(X_train, y_train)
-                
-                # Predictions
-                f_low_lgb = m_low_lgb.predict(last_row)[0]
-                f_high_lgb = m_high_lgb.predict(last_row)[0]
-                pred_low_lgb = m_low_lgb.predict(X_test)
-                pred_high_lgb = m_high_lgb.predict(X_test)
-
-            # --- MODEL B: LSTM ---
-            if "LSTM" in MODEL_TYPE or "Ensemble" in MODEL_TYPE:
-                dl = DeepQuantileModel(input_shape=(1, len(feature_cols)))
-                dl.train(X_train, y_train, epochs=20) 
-                
-                # Predictions
-                f_low_lstm, f_high_lstm = dl.predict(last_row)
-                f_low_lstm = f_low_lstm[0]; f_high_lstm = f_high_lstm[0]
-                pred_low_lstm, pred_high_lstm = dl.predict(X_test)
-
-            # --- AGGREGATION (Ensemble Logic) ---
-            if "Ensemble" in MODEL_TYPE:
-                f_low = (f_low_lgb + f_low_lstm) / 2
-                f_high = (f_high_lgb + f_high_lstm) / 2
-                pred_low = (pred_low_lgb + pred_low_lstm) / 2
-                pred_high = (pred_high_lgb + pred_high_lstm) / 2
-            elif "LightGBM" in MODEL_TYPE:
-                f_low, f_high = f_low_lgb, f_high_lgb
-                pred_low, pred_high = pred_low_lgb, pred_high_lgb
-            else: # LSTM
-                f_low, f_high = f_low_lstm, f_high_lstm
-                pred_low, pred_high = pred_low_lstm, pred_high_lstm
-
-
-            # 4. Calibration & Display
-            calib_factor = 0.6 if HORIZON == 5 else (1.0 if HORIZON == 21 else 1.5)
+            model = fit_models(TICKER, CONFIDENCE, ENGINES[MODEL_TYPE])[HORIZON]
+
+            # Live forecast through the fast path: latest row plus any history the
+            # sequence members need. Backtest rows before split_idx only serve as history.
+            window = load_indicators(TICKER)[feature_cols].iloc[-(model.context + 1):].to_numpy(dtype=np.float32)
+            f_low, f_high = model.predict_one(window)
+            pred_low, pred_high = model.predict(X, start=split_idx)
+
+            if len(model.members) > 1:
+                weights = ", ".join(f"{name} {w:.0%}" for name, w in zip(model.member_names, model.weights.mean(axis=1)))
+                st.caption(f"Ensemble weights (out-of-sample pinball loss): {weights}")
+
+            # 4. Calibration & Display: conformal, from the backtest's out-of-sample misses.
+            # Backtest bars only use misses already known at the time (starting with the
+            # model's out-of-sample misses before the split); the live forecast uses all.
+            calibrator = ConformalCalibrator(CONFIDENCE, CALIBRATION_WINDOW).update(model.calibration_scores)
+            calib = calibrator.factors(y_test.to_numpy(), pred_low, pred_high, gap=HORIZON)
             
             latest_price = raw_df['Close'].iloc[-1]
             latest_date = raw_df.index[-1]
             future_date = latest_date + pd.Timedelta(days=HORIZON)
 
-            center = (f_high + f_low) / 2
-            width = f_high - f_low
-            f_low = center - (width * calib_factor)
-            f_high = center + (width * calib_factor)
+            f_low, f_high = apply_calibration(f_low, f_high, calibrator.factor())
             
             p_low = latest_price * (1 + f_low)
             p_high = latest_price * (1 + f_high)
@@ -158,8 +200,7 @@ if st.button("Run Forecast Model"):
             # Backtest Visualization
             st.subheader(" Historical Backtest")
             
-            ctr = (pred_high + pred_low)/2; w = pred_high - pred_low
-            pred_low = ctr - (w*calib_factor); pred_high = ctr + (w*calib_factor)
+            pred_low, pred_high = apply_calibration(pred_low, pred_high, calib)
             
             current_prices = df['Close'].iloc[split_idx:].values 
             pl_price = current_prices * (1+pred_low)
@@ -176,6 +217,7 @@ if st.button("Run Forecast Model"):
             k3.metric("PnL", f"{pnl:.2f}")
             k4.metric("Trades", f"{len(signals)}")
             
+            import plotly.graph_objects as go
             fig = go.Figure()
             fig.add_trace(go.Scatter(x=df.index[split_idx:], y=ph_price, fill=None, line=dict(color='rgba(0,0,0,0)'), showlegend=False))
             fig.add_trace(go.Scatter(x=df.index[split_idx:], y=pl_price, fill='tonexty', fillcolor='rgba(0, 100, 255, 0.2)', line=dict(color='rgba(0,0,0,0)'), name='Confidence'))
@@ -0,0 +1,85 @@
+# Static site build benchmark: src/dashboard.py vs the previous per-page Plotly renderer.
+# Builds a watchlist of synthetic backtests (3 horizons each) and reports render time
+# per ticker, bytes per ticker and the total build time, for both site layouts
+# (write_site: one page per ticker, write_app: one page + gzip data file per ticker).
+# Usage: python benchmarks/bench_dashboard.py [n_tickers] [n_bars]
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.dashboard import write_site, write_app
+from benchmarks.synthetic import make_ohlcv
+
+HORIZONS = [5, 21, 60]
+
+def make_results(n_tickers, n_bars):
+    results = {}
+    for i in range(n_tickers):
+        df = make_ohlcv(n_bars + max(HORIZONS), seed=i)
+        close = df['Close'].to_numpy()
+        horizons = {}
+        for h in HORIZONS:
+            n = n_bars + max(HORIZONS) - h
+            actual = close[h:h + n]
+            signals = [(df.index[j], 'BUY' if j % 2 else 'SELL', close[j]) for j in range(0, n, 25)]
+            horizons[h] = {'dates': df.index[:n], 'actuals': actual, 'lower': close[:n] * 0.95,
+                           'upper': close[:n] * 1.05, 'signals': signals, 'metrics': (0.9, 10.0, 5.0)}
+        results[f"SYN{i:04d}"] = {**horizons[HORIZONS[0]], 'horizons': horizons}
+    return results
+
+def site_bytes(out_dir):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(out_dir) for f in files)
+
+def plotly_page(ticker, res, tickers):
+    # What DashboardGenerator did before: Python Plotly figure with list-converted
+    # series and a reversed band polygon, to_html per page, sidebar + f-string
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for h, r in res['horizons'].items():
+        dates = list(r['dates'])
+        fig.add_trace(go.Scatter(x=dates + dates[::-1], y=list(r['upper']) + list(r['lower'])[::-1], fill='toself'))
+        fig.add_trace(go.Scatter(x=dates, y=list(r['actuals']), mode='lines'))
+        buys = [(s[0], s[2]) for s in r['signals'] if s[1] == 'BUY']
+        sells = [(s[0], s[2]) for s in r['signals'] if s[1] == 'SELL']
+        fig.add_trace(go.Scatter(x=[b[0] for b in buys], y=[b[1] for b in buys], mode='markers'))
+        fig.add_trace(go.Scatter(x=[s[0] for s in sells], y=[s[1] for s in sells], mode='markers'))
+    sidebar = "".join(f'<a href="{t}.html" class="list-group-item">{t}</a>' for t in tickers)
+    return f"<html><body>{sidebar}{fig.to_html(full_html=False, include_plotlyjs='cdn')}</body></html>"
+
+if __name__ == "__main__":
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_bars = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    results = make_results(n_tickers, n_bars)
+    tickers = list(results)
+
+    # 1. Previous renderer, on a sample (it is too slow for the whole watchlist)
+    sample = tickers[:10]
+    plotly_page(sample[0], results[sample[0]], tickers) # Warm-up (plotly import, validators)
+    t0 = time.perf_counter()
+    old_sizes = [len(plotly_page(t, results[t], tickers).encode()) for t in sample]
+    t_old = (time.perf_counter() - t0) / len(sample)
+    print(f"Plotly to_html : {t_old * 1e3:8.2f} ms/ticker, {np.mean(old_sizes) / 1024:8.1f} KB/page, "
+          f"~{t_old * n_tickers:6.1f} s for {n_tickers} tickers (extrapolated)")
+
+    # 2. Template + encoded arrays, written concurrently
+    with tempfile.TemporaryDirectory() as out_dir:
+        t0 = time.perf_counter()
+        sizes = write_site(results, horizon=HORIZONS[0], out_dir=out_dir)
+        t_new = time.perf_counter() - t0
+        total = site_bytes(out_dir)
+    print(f"write_site     : {t_new / n_tickers * 1e3:8.2f} ms/ticker, {np.mean(list(sizes.values())) / 1024:8.1f} KB/page, "
+          f" {t_new:6.1f} s for {n_tickers} tickers ({total / 1e6:.1f} MB site)")
+    print(f"Speedup: {t_old * n_tickers / t_new:.0f}x, pages {np.mean(old_sizes) / np.mean(list(sizes.values())):.1f}x smaller")
+
+    # 3. Single page + gzip JSON per ticker
+    with tempfile.TemporaryDirectory() as out_dir:
+        t0 = time.perf_counter()
+        sizes = write_app(results, horizon=HORIZONS[0], out_dir=out_dir)
+        t_app = time.perf_counter() - t0
+        total = site_bytes(out_dir)
+        manifest = os.path.getsize(os.path.join(out_dir, "assets", "manifest.json"))
+    print(f"write_app      : {t_app / n_tickers * 1e3:8.2f} ms/ticker, {np.mean(list(sizes.values())) / 1024:8.1f} KB/ticker,"
+          f" {t_app:6.1f} s for {n_tickers} tickers ({total / 1e6:.1f} MB site, manifest {manifest / 1024:.0f} KB)")
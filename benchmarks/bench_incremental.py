@@ -0,0 +1,54 @@
+# Incremental nightly run (main.run_nightly + src/incremental.py) on synthetic prices.
+# Runs the pipeline in a temp directory four times:
+#   1. cold      - empty caches: every stage runs, every model is fitted
+#   2. no change - same data (a holiday): every stage is reused
+#   3. +1 bar    - features, backtests and the dashboard rerun, models come from the registry
+#   4. full      - python main.py --full: everything recomputed (models still reused)
+# Usage: python benchmarks/bench_incremental.py [n_tickers] [n_bars]
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.bench_server import write_stub_prices
+from src.data_loader import DataLoader, LocalCSVSource
+from src.incremental import StageCache
+import main
+
+def nightly(prices, tickers, refresh=False):
+    t0 = time.perf_counter()
+    raw = DataLoader(source=LocalCSVSource(prices)).fetch_many(tickers)
+    cache = StageCache(main.CACHE_DIR, refresh=refresh)
+    datasets = main.build_datasets(raw, cache)
+    main.run_nightly(tickers, datasets, cache)
+    cache.save()
+    return time.perf_counter() - t0, cache.summary()
+
+if __name__ == "__main__":
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_bars = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        full, today = os.path.join(tmp, "full"), os.path.join(tmp, "prices")
+        os.makedirs(full)
+        os.makedirs(today)
+        tickers = write_stub_prices(full, n_tickers, n_bars + 1)
+
+        def publish(bars):
+            # The "exchange" has the first `bars` bars
+            for name in os.listdir(full):
+                with open(os.path.join(full, name)) as src, open(os.path.join(today, name), "w") as dst:
+                    dst.writelines(src.readlines()[:bars + 1])
+
+        timings = []
+        for label, bars, refresh in [("cold", n_bars, False), ("no change", n_bars, False),
+                                     ("+1 bar", n_bars + 1, False), ("full", n_bars + 1, True)]:
+            publish(bars)
+            timings.append((label, *nightly(today, tickers, refresh)))
+
+    print(f"\n{n_tickers} tickers x {n_bars} bars")
+    for label, seconds, summary in timings:
+        print(f"{label:<10} {seconds:7.2f} s   {summary}")
@@ -0,0 +1,75 @@
+# Indicator engine benchmark: src/indicators.py vs pandas_ta.
+# Checks numerical equivalence, then times full recomputation and streaming
+# one-bar updates across a universe of tickers. The pandas_ta parts need pandas_ta;
+# tests/test_indicators.py checks the same values without it.
+# Usage: python benchmarks/bench_indicators.py [n_tickers] [n_bars]
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.indicators import compute_features, IndicatorState
+from benchmarks.synthetic import make_universe
+
+try:
+    import pandas_ta as ta
+except ImportError:
+    ta = None
+
+def pandas_ta_features(df):
+    # What FeatureEngineer computed before the NumPy engine
+    bb = ta.bbands(df['Close'], length=20, std=2)
+    upper = bb[[c for c in bb.columns if c.startswith('BBU')][0]]
+    lower = bb[[c for c in bb.columns if c.startswith('BBL')][0]]
+    return {
+        'ATR': ta.atr(df['High'], df['Low'], df['Close'], length=14).to_numpy(),
+        'BB_Width': ((upper - lower) / df['Close']).to_numpy(),
+        'Return': df['Close'].pct_change().to_numpy(),
+    }
+
+if __name__ == "__main__":
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_bars = int(sys.argv[2]) if len(sys.argv) > 2 else 2500
+    universe = list(make_universe(n_tickers, n_bars).values())
+    arrays = [(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy()) for df in universe]
+    compute_features(*arrays[0]) # JIT warm-up
+
+    # 1. Equivalence
+    if ta is not None:
+        worst = {}
+        for df, arr in zip(universe[:50], arrays):
+            ref, new = pandas_ta_features(df), compute_features(*arr)
+            for name in ref:
+                assert np.array_equal(np.isnan(ref[name]), np.isnan(new[name])), f"{name}: NaN mask differs"
+                err = np.nanmax(np.abs(ref[name] - new[name]) / np.maximum(np.abs(ref[name]), 1e-12))
+                worst[name] = max(worst.get(name, 0), err)
+        print("Equivalence vs pandas_ta (max rel. error):", {k: f"{v:.1e}" for k, v in worst.items()})
+        assert all(v < 1e-8 for v in worst.values())
+
+    # 2. Full recomputation, one ticker at a time
+    if ta is not None:
+        t0 = time.perf_counter()
+        for df in universe:
+            pandas_ta_features(df)
+        t_ta = time.perf_counter() - t0
+        print(f"pandas_ta      : {t_ta:8.3f} s for {n_tickers} tickers x {n_bars} bars")
+
+    t0 = time.perf_counter()
+    for arr in arrays:
+        compute_features(*arr)
+    t_np = time.perf_counter() - t0
+    print(f"NumPy kernels  : {t_np:8.3f} s for {n_tickers} tickers x {n_bars} bars")
+
+    # 3. Streaming: fit on history once, then append one bar to every ticker
+    high = np.column_stack([a[0] for a in arrays])
+    low = np.column_stack([a[1] for a in arrays])
+    close = np.column_stack([a[2] for a in arrays])
+    state = IndicatorState()
+    state.fit(high[:-1], low[:-1], close[:-1])
+    t0 = time.perf_counter()
+    new = state.update(high[-1:], low[-1:], close[-1:])
+    t_up = time.perf_counter() - t0
+    full = compute_features(high, low, close)
+    assert all(np.allclose(new[k][-1], full[k][-1]) for k in new), "streaming update differs"
+    print(f"Streaming +1bar: {t_up*1e3:8.3f} ms for {n_tickers} tickers (panel state)")
@@ -0,0 +1,60 @@
+# LSTM lookback benchmark: CPU training time and peak memory per window length.
+# Each lookback is trained in a fresh interpreter, so peak RSS is not inherited from
+# an earlier (longer) run. Also shows what materializing the windows would cost.
+# Usage: python benchmarks/bench_lstm.py [--lookbacks 1 30 60 120] [--bars 2500] [--epochs 100]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+FEATURE_COLS = ['Close', 'VIX', 'ATR', 'BB_Width', 'Return']
+
+def train_once(lookback, n_bars, epochs):
+    from src.deep_models import DeepQuantileModel, make_windows
+    from src.feature_eng import FeatureEngineer
+    from benchmarks.synthetic import make_ohlcv
+
+    fe = FeatureEngineer(make_ohlcv(n_bars))
+    fe.add_technical_indicators()
+    df = fe.create_targets(5)
+    split_idx = int(len(df) * 0.8)
+    X, y = df[FEATURE_COLS].iloc[:split_idx], df['Target_Return'].iloc[:split_idx]
+
+    dl = DeepQuantileModel(input_shape=(lookback, len(FEATURE_COLS)))
+    dl.train(X, y, epochs=epochs)
+    report = dict(dl.train_report)
+
+    # The strided view shares the feature matrix's memory; a copy would not
+    values = X.to_numpy(dtype='float32')
+    windows = make_windows(values, lookback)
+    assert np.shares_memory(windows, values)
+    report['window_view_mb'] = values.nbytes / 1e6
+    report['materialized_mb'] = windows.size * windows.itemsize / 1e6
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookbacks", type=int, nargs="+", default=[1, 30, 60, 120])
+    parser.add_argument("--bars", type=int, default=2500)
+    parser.add_argument("--epochs", type=int, default=100, help="Upper bound, early stopping usually ends sooner")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS) # Internal: one run, JSON on stdout
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(train_once(args.single, args.bars, args.epochs)))
+        sys.exit(0)
+
+    print(f"{'lookback':>8} {'samples':>8} {'epochs':>6} {'wall s':>8} {'CPU s':>8} {'peak MB':>8} {'view MB':>8} {'copy MB':>8}")
+    for lookback in args.lookbacks:
+        proc = subprocess.run([sys.executable, __file__, "--single", str(lookback), "--bars", str(args.bars),
+                               "--epochs", str(args.epochs)], cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr)
+            sys.exit(1)
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{r['lookback']:>8} {r['samples']:>8} {r['epochs']:>6} {r['wall_s']:>8.1f} {r['cpu_s']:>8.1f} "
+              f"{r['peak_rss_mb']:>8.0f} {r['window_view_mb']:>8.2f} {r['materialized_mb']:>8.2f}")
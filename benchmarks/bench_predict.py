@@ -0,0 +1,75 @@
+# Single-forecast latency: the app's old one-row calls vs the predict_one fast paths.
+# Checks that the compiled tree evaluator reproduces Booster.predict, then reports the
+# median latency per (lower, upper) forecast.
+# Usage: python benchmarks/bench_predict.py [--repeat 2000] [--lstm]
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.feature_eng import FeatureEngineer
+from src.models import QuantileModels
+from benchmarks.synthetic import make_ohlcv
+
+FEATURE_COLS = ['Close', 'VIX', 'ATR', 'BB_Width', 'Return']
+
+def latency_us(fn, repeat):
+    fn() # Warm-up (JIT compile, graph tracing)
+    times = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - t0
+    return np.median(times) * 1e6
+
+def report(label, us, baseline=None):
+    speedup = f"  ({baseline / us:6.1f}x)" if baseline else ""
+    print(f"{label:<40} {us:10.1f} us{speedup}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--lstm", action="store_true", help="Also benchmark the LSTM (imports TensorFlow)")
+    args = parser.parse_args()
+
+    fe = FeatureEngineer(make_ohlcv(2500))
+    fe.add_technical_indicators()
+    df = fe.create_targets(5)
+    X, y = df[FEATURE_COLS], df['Target_Return']
+    split_idx = int(len(X) * 0.8)
+
+    qm = QuantileModels(0.05, 0.95)
+    m_low, m_high = qm.train_lgbm(X.iloc[:split_idx], y.iloc[:split_idx])
+
+    # 1. Equivalence on the whole test set
+    qm.predict_one(X.iloc[0].to_numpy())
+    fast = qm._forest.predict(X.iloc[split_idx:].to_numpy())
+    ref = np.column_stack([m_low.predict(X.iloc[split_idx:]), m_high.predict(X.iloc[split_idx:])])
+    print(f"Compiled forest vs Booster.predict: max abs diff {np.abs(fast - ref).max():.1e}")
+    assert np.allclose(fast, ref, rtol=0, atol=1e-12)
+
+    # 2. LightGBM latency per forecast
+    last_row = X.iloc[[-1]]
+    x = last_row.to_numpy()[0]
+    print(f"\nLightGBM ({len(qm._forest.roots)} trees, {args.repeat} calls)")
+    base = latency_us(lambda: (m_low.predict(last_row)[0], m_high.predict(last_row)[0]), args.repeat)
+    report("2x Booster.predict(1-row DataFrame)", base)
+    report("2x Booster.predict(float array)", latency_us(lambda: (m_low.predict(x[None]), m_high.predict(x[None])), args.repeat), base)
+    report("predict_one (compiled forest)", latency_us(lambda: qm.predict_one(x), args.repeat), base)
+
+    # 3. LSTM latency per forecast
+    if args.lstm:
+        from src.deep_models import DeepQuantileModel
+        lookback = 60
+        dl = DeepQuantileModel(input_shape=(lookback, len(FEATURE_COLS)))
+        dl.train(X.iloc[:split_idx], y.iloc[:split_idx], epochs=2)
+        window = X.iloc[-lookback:].to_numpy()
+        assert np.allclose(dl.predict_one(window), [p[0] for p in dl.predict(X.iloc[-lookback:])], atol=1e-5)
+
+        repeat = max(1, args.repeat // 10)
+        print(f"\nLSTM (lookback {lookback}, {repeat} calls)")
+        base = latency_us(lambda: dl.predict(X.iloc[-lookback:]), repeat)
+        report("model.predict via tf.data", base)
+        report("predict_one (tf.function)", latency_us(lambda: dl.predict_one(window), repeat), base)
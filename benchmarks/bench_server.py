@@ -0,0 +1,152 @@
+# Load generator for server.py against a local stub data source.
+# Writes synthetic prices for N tickers (plus ^VIX) as CSVs, starts the service on
+# them, then measures:
+#   1. cold burst  - many concurrent requests per ticker before any model exists
+#                    (coalescing: one computation per ticker, however many requests)
+#   2. warm load   - GET /forecast over keep-alive connections: requests/sec, p50/p99
+#   3. bulk        - one POST /forecast for the whole universe
+# Usage: python benchmarks/bench_server.py [--tickers 20] [--requests 5000] [--concurrency 50]
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.synthetic import make_ohlcv
+
+HORIZONS = [5, 21, 60]
+
+def write_stub_prices(directory, n_tickers, n_bars):
+    tickers = [f"SYN{i:04d}" for i in range(n_tickers)]
+    for i, ticker in enumerate(tickers):
+        make_ohlcv(n_bars, seed=i).to_csv(os.path.join(directory, f"{ticker}.csv"))
+    vix = make_ohlcv(n_bars, seed=10_000, vol=0.05)
+    vix['Close'] = vix['VIX']
+    vix.to_csv(os.path.join(directory, "^VIX.csv"))
+    return tickers
+
+class Client:
+    # Minimal keep-alive HTTP/1.1 client, one request in flight per connection
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, target, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+async def run_load(port, targets, concurrency):
+    # Returns per-request latencies (s) and the wall time for all targets
+    queue = list(reversed(targets))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        client = Client(port)
+        while queue:
+            target = queue.pop()
+            t0 = time.perf_counter()
+            status, _ = await client.request("GET", target)
+            latencies.append(time.perf_counter() - t0)
+            errors += status != 200
+        client.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return np.array(latencies), time.perf_counter() - t0, errors
+
+def summary(label, latencies, wall, errors):
+    ms = latencies * 1e3
+    print(f"{label:<12} {len(ms):>6} req  {len(ms) / wall:>8.0f} req/s  p50 {np.percentile(ms, 50):>8.2f} ms  "
+          f"p99 {np.percentile(ms, 99):>8.2f} ms  errors {errors}")
+
+async def main(args, port):
+    tickers = args.tickers_list
+
+    # Wait for the service to come up
+    for _ in range(600):
+        try:
+            client = Client(port)
+            await client.request("GET", "/health")
+            client.close()
+            break
+        except OSError:
+            await asyncio.sleep(0.1)
+
+    def target(ticker):
+        return f"/forecast?ticker={ticker}&horizon={random.choice(HORIZONS)}&confidence=0.9"
+
+    # 1. Cold burst
+    burst = [target(t) for t in tickers for _ in range(args.burst)]
+    random.shuffle(burst)
+    summary("cold burst", *await run_load(port, burst, args.concurrency))
+
+    # 2. Warm load
+    summary("warm", *await run_load(port, [target(random.choice(tickers)) for _ in range(args.requests)], args.concurrency))
+
+    # 3. Bulk
+    client = Client(port)
+    t0 = time.perf_counter()
+    status, payload = await client.request("POST", "/forecast", {'tickers': tickers, 'horizon': 21, 'confidence': 0.9})
+    print(f"{'bulk POST':<12} {len(payload['results']):>6} forecasts in {(time.perf_counter() - t0) * 1e3:.1f} ms (status {status})")
+
+    _, stats = await client.request("GET", "/stats")
+    client.close()
+    print("Service stats:", stats)
+    assert stats['computations'] == len(tickers), "Concurrent requests were not coalesced"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--bars", type=int, default=1500)
+    parser.add_argument("--burst", type=int, default=10, help="Concurrent cold requests per ticker")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="Server process pool size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prices = os.path.join(tmp, "prices")
+        os.makedirs(prices)
+        args.tickers_list = write_stub_prices(prices, args.tickers, args.bars)
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+
+        cmd = [sys.executable, os.path.join(ROOT, "server.py"), "--port", str(port), "--csv-dir", prices,
+               "--data-dir", os.path.join(tmp, "data"), "--registry-dir", os.path.join(tmp, "models")]
+        if args.workers:
+            cmd += ["--workers", str(args.workers)]
+        server = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(main(args, port))
+        finally:
+            server.terminate()
+            server.wait()
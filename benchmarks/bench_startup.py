@@ -0,0 +1,70 @@
+# Startup-time benchmark based on `python -X importtime`.
+# Imports each entry point in a fresh interpreter, reports the total import time and
+# the heaviest top-level packages, and fails if a lazily-loaded backend shows up in a
+# path that should not need it or an entry point goes over its budget.
+# Usage: python benchmarks/bench_startup.py [--budget SECONDS]
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy backends that must only be imported when the selected engine/output needs them
+LAZY_BACKENDS = ["tensorflow", "xgboost", "matplotlib", "plotly", "pandas_ta"]
+
+ENTRY_POINTS = {
+    # Everything app.py pulls in before a LightGBM forecast
+    "lightgbm_path": "import src.data_loader, src.feature_eng, src.models, src.ensemble, src.strategy, src.utils, src.registry",
+    "main.py": "import main",
+}
+
+# Accepted import time per entry point (seconds), measured 0.6 - 0.8 s with
+# requirements.txt. lightgbm imports scikit-learn whenever it is installed (~0.85 s,
+# mostly scipy.stats), although nothing here uses it: that alone breaks the budget.
+BUDGETS = {"lightgbm_path": 1.0, "main.py": 1.0}
+
+def import_profile(statement):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    modules = {}
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+        if not name.startswith("  "): # No indentation = imported directly by the statement
+            top_level.append((name.strip(), int(cumulative)))
+    return modules, top_level
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=None, help="Override every entry point's budget (seconds)")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    failed = False
+    for label, statement in ENTRY_POINTS.items():
+        modules, top_level = import_profile(statement)
+        total = sum(us for _, us in top_level) / 1e6
+        print(f"\n{label}: {total:.3f} s")
+        for name, us in sorted(top_level, key=lambda x: -x[1])[:args.top]:
+            print(f"  {us/1e6:7.3f} s  {name}")
+
+        leaked = [b for b in LAZY_BACKENDS if b in modules]
+        if leaked:
+            print(f"  ❌ eagerly imported: {', '.join(leaked)}")
+            failed = True
+        budget = BUDGETS[label] if args.budget is None else args.budget
+        if total > budget:
+            print(f"  ❌ over budget ({budget:.2f} s)")
+            if "sklearn" in modules:
+                print("     scikit-learn is installed and lightgbm imports it, it is not in requirements.txt")
+            failed = True
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,58 @@
+# Micro-benchmark + equivalence check for the mean-reversion backtest
+# (tests/test_strategy.py runs the same check in CI).
+# Usage: python benchmarks/bench_strategy.py [n_bars] [n_series]
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.strategy import SignalGenerator, mean_reversion_engine
+from src.accel import HAS_NUMBA
+from tests.test_strategy import legacy_mean_reversion # The original iterrows() loop
+
+def make_series(n_bars, rng):
+    dates = pd.bdate_range("2015-01-01", periods=n_bars)
+    actuals = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    center = actuals * (1 + rng.normal(0, 0.01, n_bars))
+    width = actuals * 0.03
+    return dates, actuals, center - width, center + width
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+if __name__ == "__main__":
+    n_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_series = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = np.random.default_rng(42)
+
+    # 1. Equivalence against the original implementation
+    strat = SignalGenerator()
+    for _ in range(20):
+        args = make_series(n_bars, rng)
+        _, ref_signals, ref_pnl = legacy_mean_reversion(*args)
+        _, signals, pnl = strat.run_mean_reversion(*args)
+        assert signals == ref_signals, "signal mismatch"
+        assert np.isclose(pnl, ref_pnl, rtol=0, atol=1e-9), "PnL mismatch"
+    print("Equivalence: OK (20 random series)")
+
+    # 2. Single series
+    dates, actuals, lower, upper = make_series(n_bars, rng)
+    mean_reversion_engine(actuals, lower, upper) # JIT warm-up
+    t_legacy = best_of(lambda: legacy_mean_reversion(dates, actuals, lower, upper), repeat=3)
+    t_engine = best_of(lambda: mean_reversion_engine(actuals, lower, upper))
+    print(f"numba: {HAS_NUMBA}")
+    print(f"{n_bars} bars, 1 series : legacy {t_legacy*1e3:8.2f} ms | engine {t_engine*1e3:8.3f} ms | x{t_legacy/t_engine:.0f}")
+
+    # 3. 2-D batch: one price path against n_series calibration factors
+    calib = np.linspace(0.3, 2.0, n_series)[:, None]
+    center = (lower + upper) / 2
+    half = (upper - lower) / 2
+    t_batch = best_of(lambda: mean_reversion_engine(actuals, center - half * calib, center + half * calib))
+    print(f"{n_bars} bars, {n_series} series : engine {t_batch*1e3:8.2f} ms ({t_batch/n_series*1e6:.1f} us/series)")
@@ -0,0 +1,311 @@
+# Reproducible benchmark suite on synthetic data (benchmarks/synthetic.py), no network.
+# Times every pipeline stage at several universe sizes and writes one JSON file per
+# run, so two commits can be compared on the same box:
+#
+#   python benchmarks/suite.py --out before.json        # on the old commit
+#   python benchmarks/suite.py --out after.json         # on the new one
+#   python benchmarks/suite.py --compare before.json after.json
+#
+# Each suite runs `repeats` times per universe size; the median is reported. Suites
+# that are too slow to run for every ticker (model training) run on the first
+# `cap` tickers and report the per-ticker time plus an extrapolated total
+# ("measured" < "tickers"). Everything is single-threaded (n_jobs=1) and seeded.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.synthetic import make_universe
+from src import profiling
+from src.profiling import stage
+from src.feature_eng import FeatureEngineer, PanelFeatureEngineer, target_column
+
+HORIZONS = [5, 21, 60]
+FEATURE_COLS = ['Close', 'VIX', 'ATR', 'BB_Width', 'Return']
+SPLIT_RATIO = 0.80
+SCALES = [1, 100, 1000]
+REGRESSION = 0.10 # --compare flags suites that got more than 10% slower
+
+# --- INPUTS (built once per universe size, outside the timings) ---
+
+def build_inputs(n_tickers, n_bars, seed):
+    universe = make_universe(n_tickers, n_bars, seed=seed)
+    datasets = {t: FeatureEngineer(FeatureEngineer(df).add_technical_indicators()).create_targets(HORIZONS)
+                for t, df in universe.items()}
+    # Test-window bands: +-2 sigma of the realized horizon return around the close
+    bands = {}
+    for t, df in datasets.items():
+        df = df.dropna()
+        split = int(len(df) * SPLIT_RATIO)
+        close = df['Close'].to_numpy()[split:]
+        actual = close * (1 + df[target_column(HORIZONS[0])].to_numpy()[split:])
+        sigma = df['Return'].std() * np.sqrt(HORIZONS[0])
+        bands[t] = (df.index[split:], actual, close * (1 - 2 * sigma), close * (1 + 2 * sigma))
+    return {'universe': universe, 'datasets': datasets, 'bands': bands}
+
+def train_split(df, horizon=HORIZONS[0]):
+    df = df.dropna()
+    split = int(len(df) * SPLIT_RATIO)
+    return df[FEATURE_COLS].iloc[:split], df[target_column(horizon)].iloc[:split], df[FEATURE_COLS].iloc[split:]
+
+# --- SUITES: fn(inputs, tickers) -> rows processed ---
+
+def suite_features(inputs, tickers):
+    rows = 0
+    for t in tickers:
+        df = FeatureEngineer(inputs['universe'][t]).add_technical_indicators()
+        rows += len(FeatureEngineer(df).create_targets(HORIZONS))
+    return rows
+
+def suite_features_panel(inputs, tickers):
+    panel = PanelFeatureEngineer.from_frames({t: inputs['universe'][t] for t in tickers})
+    panel.add_technical_indicators()
+    panel.create_targets(HORIZONS)
+    return sum(len(frame) for frame in panel.to_tickers().values())
+
+def suite_train_lgbm(inputs, tickers):
+    from src.models import QuantileModels
+    rows = 0
+    for t in tickers:
+        X, y, _ = train_split(inputs['datasets'][t])
+        QuantileModels(0.05, 0.95, n_jobs=1).train_lgbm(X, y)
+        rows += len(X)
+    return rows
+
+def suite_predict_lgbm(inputs, tickers):
+    rows = 0
+    for t in tickers:
+        qm = inputs['lgbm'][t]
+        X_test = train_split(inputs['datasets'][t])[2]
+        qm.predict(X_test)
+        rows += len(X_test)
+    return rows
+
+def suite_train_lstm(inputs, tickers):
+    from src.deep_models import DeepQuantileModel
+    rows = 0
+    for t in tickers:
+        X, y, _ = train_split(inputs['datasets'][t])
+        model = DeepQuantileModel(input_shape=(60, X.shape[1]), quantiles=(0.05, 0.95))
+        model.train(X, y, epochs=3, patience=3)
+        rows += len(X)
+    return rows
+
+def suite_predict_lstm(inputs, tickers):
+    rows = 0
+    for t in tickers:
+        X_test = train_split(inputs['datasets'][t])[2]
+        inputs['lstm'][t].predict(X_test)
+        rows += len(X_test)
+    return rows
+
+def suite_strategy(inputs, tickers):
+    from src.strategy import SignalGenerator
+    rows = 0
+    for t in tickers:
+        dates, actual, lower, upper = inputs['bands'][t]
+        SignalGenerator().run_mean_reversion(dates, actual, lower, upper)
+        rows += len(actual)
+    return rows
+
+def suite_portfolio(inputs, tickers):
+    # The whole universe as one portfolio: align the bands, one vectorized backtest
+    from src.portfolio import PortfolioBacktest, align_results
+    results = {t: dict(zip(('dates', 'actuals', 'lower', 'upper'), inputs['bands'][t])) for t in tickers}
+    _, _, prices, lower, upper = align_results(results)
+    PortfolioBacktest().run(prices, lower, upper)
+    return sum(len(inputs['bands'][t][1]) for t in tickers)
+
+def suite_metrics(inputs, tickers):
+    from src.utils import evaluate_metrics
+    rows = 0
+    for t in tickers:
+        _, actual, lower, upper = inputs['bands'][t]
+        evaluate_metrics(actual, lower, upper)
+        rows += len(actual)
+    return rows
+
+def suite_dashboard(inputs, tickers):
+    from src.dashboard import DashboardGenerator
+    from src.strategy import SignalGenerator
+    rows = 0
+    with tempfile.TemporaryDirectory() as out_dir:
+        for t in tickers:
+            dates, actual, lower, upper = inputs['bands'][t]
+            signals = inputs['signals'].setdefault(t, SignalGenerator().run_mean_reversion(dates, actual, lower, upper)[1])
+            DashboardGenerator(t).generate_html(dates, actual, lower, upper, signals, (0.9, 1.0, 0.0),
+                                                recent_stocks=tickers, out_dir=out_dir)
+            rows += len(actual)
+    return rows
+
+def prepare_lgbm(inputs, tickers):
+    # Fitted models for the predict suite, kept across repeats
+    from src.models import QuantileModels
+    for t in tickers:
+        if t in inputs['lgbm']:
+            continue
+        X, y, _ = train_split(inputs['datasets'][t])
+        inputs['lgbm'][t] = QuantileModels(0.05, 0.95, n_jobs=1)
+        inputs['lgbm'][t].train_lgbm(X, y)
+
+def prepare_lstm(inputs, tickers):
+    from src.deep_models import DeepQuantileModel
+    for t in tickers:
+        if t in inputs['lstm']:
+            continue
+        X, y, _ = train_split(inputs['datasets'][t])
+        inputs['lstm'][t] = DeepQuantileModel(input_shape=(60, X.shape[1]), quantiles=(0.05, 0.95))
+        inputs['lstm'][t].train(X, y, epochs=1)
+
+# name: (fn, cap on tickers actually run, setup run once before timing)
+SUITES = {
+    'features': (suite_features, None, None),
+    'features_panel': (suite_features_panel, None, None),
+    'train_lgbm': (suite_train_lgbm, 20, None),
+    'predict_lgbm': (suite_predict_lgbm, 100, prepare_lgbm),
+    'train_lstm': (suite_train_lstm, 1, None),
+    'predict_lstm': (suite_predict_lstm, 5, prepare_lstm),
+    'strategy': (suite_strategy, None, None),
+    'portfolio': (suite_portfolio, None, None),
+    'metrics': (suite_metrics, None, None),
+    'dashboard': (suite_dashboard, None, None),
+}
+
+# --- RUNNER ---
+
+def environment():
+    def version(package):
+        # From the installed metadata: reading tensorflow.__version__ would import it
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'versions': {m: version(m) for m in ("numpy", "pandas", "lightgbm", "numba", "tensorflow")},
+    }
+
+def run_suite(name, inputs, tickers, repeats):
+    fn, cap, setup = SUITES[name]
+    measured = tickers[:cap] if cap else tickers
+    if setup:
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup(inputs, measured)
+
+    # Warm-up on one ticker: lazy imports, numba compilation, TensorFlow graph tracing
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(inputs, measured[:1])
+
+    runs = []
+    for _ in range(repeats):
+        profiling.clear()
+        # The pipeline's own prints (metrics, training logs) are not part of the timing
+        with contextlib.redirect_stdout(io.StringIO()), stage(name) as record:
+            rows = fn(inputs, measured)
+        runs.append((record['wall_s'], record['cpu_s'], record['peak_rss_mb'], rows))
+
+    wall = [r[0] for r in runs]
+    per_ticker = float(np.median(wall)) / len(measured)
+    return {
+        'suite': name,
+        'tickers': len(tickers),
+        'measured': len(measured),
+        'repeats': repeats,
+        'wall_s': float(np.median(wall)),
+        'wall_min_s': min(wall),
+        'wall_max_s': max(wall),
+        'cpu_s': float(np.median([r[1] for r in runs])),
+        'peak_rss_mb': max(r[2] for r in runs),
+        'rows': runs[0][3],
+        'per_ticker_ms': per_ticker * 1e3,
+        # Whole universe (what a nightly run over `tickers` would spend here)
+        'total_s': per_ticker * len(tickers) if name != 'features_panel' else float(np.median(wall)),
+        'rows_per_s': runs[0][3] / float(np.median(wall)) if np.median(wall) > 0 else None,
+    }
+
+def run(args):
+    profiling.enable()
+    suites = args.suites or list(SUITES)
+    report = {'created': time.strftime("%Y-%m-%dT%H:%M:%S"), 'env': environment(),
+              'config': {'bars': args.bars, 'seed': args.seed, 'repeats': args.repeats, 'scales': args.scales},
+              'results': []}
+    for n in args.scales:
+        inputs = build_inputs(n, args.bars, args.seed)
+        inputs.update(lgbm={}, lstm={}, signals={})
+        tickers = list(inputs['universe'])
+        for name in suites:
+            try:
+                result = run_suite(name, inputs, tickers, args.repeats)
+            except ImportError as e:
+                # e.g. no TensorFlow on this box: recorded, not fatal
+                result = {'suite': name, 'tickers': n, 'skipped': str(e)}
+            report['results'].append(result)
+            if 'skipped' in result:
+                print(f"{name:<16}{n:>6} tickers  skipped ({result['skipped']})")
+            else:
+                print(f"{name:<16}{n:>6} tickers  {result['per_ticker_ms']:>10.3f} ms/ticker  total {result['total_s']:>9.2f} s"
+                      f"  ({result['measured']} measured, peak {result['peak_rss_mb']:.0f} MB)")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results: {args.out}")
+
+def compare(old_path, new_path, threshold=REGRESSION):
+    # Per (suite, tickers): new / old median time per ticker. Exit code 1 on regressions.
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(r['suite'], r['tickers']): r for r in old['results'] if 'skipped' not in r}
+    print(f"{old['env']['commit']} -> {new['env']['commit']}")
+    regressions = 0
+    for r in new['results']:
+        key = (r['suite'], r['tickers'])
+        if 'skipped' in r or key not in before:
+            continue
+        ratio = r['per_ticker_ms'] / before[key]['per_ticker_ms']
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{r['suite']:<16}{r['tickers']:>6} tickers  {before[key]['per_ticker_ms']:>10.3f} -> "
+              f"{r['per_ticker_ms']:>10.3f} ms/ticker  x{ratio:.2f}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic market data")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="Universe sizes (tickers)")
+    parser.add_argument("--bars", type=int, default=2500, help="History length per ticker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--suites", nargs="+", choices=list(SUITES))
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    run(args)
@@ -0,0 +1,82 @@
+# Synthetic OHLCV+VIX data for offline benchmarks.
+import numpy as np
+import pandas as pd
+
+def make_ohlcv(n_bars=2500, seed=0, start="2015-01-01", vol=0.015):
+    # Geometric Brownian motion close with a random intraday range around it,
+    # in the same layout DataLoader.fetch_data returns
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_bars)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, vol, n_bars)))
+    spread = np.abs(rng.normal(0, vol / 2, (2, n_bars)))
+    return pd.DataFrame({
+        'Close': close,
+        'High': close * (1 + spread[0]),
+        'Low': close * (1 - spread[1]),
+        'Volume': rng.integers(100_000, 5_000_000, n_bars).astype(float),
+        'VIX': 15 + 5 * np.abs(np.sin(np.arange(n_bars) / 50)) + rng.normal(0, 1, n_bars),
+    }, index=dates)
+
+# --- REGIME-SWITCHING MARKET ---
+# A two-state Markov chain (calm / stressed) drives one market factor. Every ticker is
+# beta * market + its own GBM noise, with fatter-tailed (Student-t) shocks and higher
+# volatility in the stressed regime. VIX is shared by the whole universe and follows
+# the market's regime volatility (mean-reverting, spiking on down days), so the
+# model's VIX feature carries the same kind of signal it does on real data.
+REGIMES = {
+    # daily drift, daily vol, P(stay in regime)
+    'calm': (0.0004, 0.008, 0.985),
+    'stressed': (-0.0008, 0.025, 0.95),
+}
+
+def make_regimes(n_bars, rng):
+    # 0 = calm, 1 = stressed
+    stay = np.array([REGIMES['calm'][2], REGIMES['stressed'][2]])
+    states = np.empty(n_bars, dtype=np.int8)
+    state = 0
+    u = rng.random(n_bars)
+    for i in range(n_bars):
+        states[i] = state
+        if u[i] > stay[state]:
+            state = 1 - state
+    return states
+
+def make_universe(n_tickers, n_bars=2500, seed=0, start="2015-01-01"):
+    # {ticker: OHLCV+VIX DataFrame}, reproducible for a given (n_tickers, n_bars, seed)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_bars)
+    states = make_regimes(n_bars, rng)
+    drift = np.where(states == 1, REGIMES['stressed'][0], REGIMES['calm'][0])
+    vol = np.where(states == 1, REGIMES['stressed'][1], REGIMES['calm'][1])
+
+    # Market factor with Student-t (df=4) shocks scaled to unit variance
+    market = drift + vol * rng.standard_t(4, n_bars) / np.sqrt(2)
+
+    # VIX: mean-reverting towards 100 x annualized regime vol, jumps on market drops
+    target = 100 * vol * np.sqrt(252)
+    vix = np.empty(n_bars)
+    vix[0] = target[0]
+    shocks = rng.normal(0, 0.8, n_bars) - 150 * np.minimum(market, 0)
+    for i in range(1, n_bars):
+        vix[i] = vix[i - 1] + 0.1 * (target[i] - vix[i - 1]) + shocks[i]
+    vix = np.maximum(vix, 9.0)
+
+    # Tickers: (bars x tickers) at once
+    beta = rng.uniform(0.5, 1.5, n_tickers)
+    idio_vol = rng.uniform(0.005, 0.02, n_tickers)
+    idio = rng.standard_t(4, (n_bars, n_tickers)) / np.sqrt(2) * idio_vol * (1 + states[:, None])
+    returns = market[:, None] * beta + idio
+    close = rng.uniform(20, 2000, n_tickers) * np.exp(np.cumsum(returns, axis=0))
+    spread = np.abs(rng.normal(0, 1, (2, n_bars, n_tickers))) * (vol[:, None] / 2)
+    volume = rng.lognormal(14, 0.5, (n_bars, n_tickers)) * (1 + states[:, None])
+
+    universe = {}
+    for j in range(n_tickers):
+        universe[f"SYN{j:04d}"] = pd.DataFrame({
+            'Close': close[:, j],
+            'High': close[:, j] * (1 + spread[0, :, j]),
+            'Low': close[:, j] * (1 - spread[1, :, j]),
+            'Volume': np.round(volume[:, j]),
+            'VIX': vix,
+        }, index=dates)
+    return universe
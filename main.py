@@ -1,9 +1,17 @@
 from src.data_loader import DataLoader
-from src.feature_eng import FeatureEngineer
-from src.models import QuantileModels
-from src.strategy import SignalGenerator
-from src.utils import evaluate_metrics
-from src.dashboard import DashboardGenerator
+from src.feature_eng import PanelFeatureEngineer, extend_dataset
+from src.backtest import BandBacktest
+from src.portfolio import PortfolioBacktest, align_results
+from src.dashboard import write_site, write_app
+from src.sweep import ParameterSweep
+from src.incremental import StageCache, fingerprint, source_fingerprint
+from src import profiling
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import argparse
+import os
+import time
+import traceback
 import pandas as pd
 import numpy as np
 
@@ -11,87 +19,247 @@ import numpy as np
 # Add as many stocks as you want here!
 WATCHLIST = ["RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS"]
 HORIZON_DAYS = 5 
+HORIZONS = [5, 21, 60] # Published horizons, trained together; HORIZON_DAYS is the headline one
+CONFIDENCE = 0.90
 SPLIT_RATIO = 0.80
+OFFLINE_MODE = False # True = serve from the local data/ cache only, no downloads
+MAX_WORKERS = None # Process pool size, None = one worker per CPU core
+REGISTRY_DIR = "models" # Fitted models, shared with the Streamlit app
+FEATURE_COLS = ['Close', 'VIX', 'ATR', 'BB_Width', 'Return']
+# Ensemble members, any of "lightgbm", "xgboost", "lstm". The registered models pre-warm
+# the Streamlit app, so this must be one of its ENGINES (LightGBM is its default)
+MODEL_MEMBERS = ["lightgbm"]
+LSTM_LOOKBACK = 60 # Trading days of history the LSTM sees per forecast (part of its registry key)
+DASHBOARD_MODE = "app" # "app": one page + per-ticker data files loaded on click, "pages": one HTML page per ticker
+MODEL_REFRESH_BARS = 5 # The training split moves in steps of this many bars, so models are refit about weekly
+CACHE_DIR = "cache" # Stage manifest + cached features and backtests (python main.py --full ignores it)
+REPORT_DIR = "reports" # Run report: wall/CPU time, peak RSS and rows per stage and ticker (src/profiling.py)
+CALIBRATION_WINDOW = 250 # Out-of-sample bars the band width is calibrated on (src/calibration.py)
 
-def run_pipeline(ticker, is_first=False):
+# Portfolio backtest of the whole watchlist (src/portfolio.py)
+FEE_BPS = 1.0 # Commission, bps of traded notional
+SLIPPAGE_BPS = 5.0
+ALLOCATION = "equal" # "equal": fixed 1/N of equity per ticker, "active": split between the open positions
+
+# Source files each cached stage depends on (src/incremental.py)
+FEATURE_CODE = ["src/feature_eng.py", "src/indicators.py"]
+MODEL_CODE = ["src/models.py", "src/ensemble.py", "src/deep_models.py"]
+BACKTEST_CODE = ["src/backtest.py", "src/strategy.py", "src/utils.py", "src/calibration.py", "src/predictor.py"] + MODEL_CODE
+
+# Parameter sweep grid (python main.py --sweep): 5 x 117 = 585 settings per ticker
+SWEEP_CONFIDENCE = [0.70, 0.80, 0.90, 0.95, 0.99]
+SWEEP_CALIB = np.round(np.arange(0.1, 3.0 + 1e-9, 0.025), 3)
+
+# Walk-forward evaluation (python main.py --walk-forward 21): retrain every N bars
+WALK_FORWARD_MIN_TRAIN = 500
+
+# Everything above that changes a backtest; its settings() are part of the backtest cache key
+BACKTEST = BandBacktest(HORIZONS, FEATURE_COLS, HORIZON_DAYS, CONFIDENCE, SPLIT_RATIO, MODEL_REFRESH_BARS,
+                        CALIBRATION_WINDOW, MODEL_MEMBERS, LSTM_LOOKBACK, WALK_FORWARD_MIN_TRAIN, REGISTRY_DIR, MODEL_CODE)
+
+def build_datasets(raw_data, cache=None):
+    # Features & targets for the whole watchlist in one vectorized panel pass.
+    # Returns {ticker: (dataset, data_through)}, None where there is not enough data;
+    # a dataset is a TickerFrame (float32 columns but Volume, views into the panel).
+    # With a StageCache only tickers whose raw data (or feature code) changed are
+    # recomputed; indicators are per ticker, so a smaller panel gives the same frames.
+    # A ticker that only gained new bars (the usual nightly case) is not recomputed
+    # either: its stored dataset is extended from its saved indicator state.
+    usable = {t: df for t, df in raw_data.items() if df is not None and len(df) >= 200}
+    for ticker in raw_data:
+        if ticker not in usable:
+            print(f"Skipping {ticker}: Insufficient data.")
+
+    datasets, digests = {}, {}
+    code = source_fingerprint(*FEATURE_CODE) if cache else None
+    for ticker, df in usable.items():
+        if cache is not None:
+            digests[ticker] = fingerprint(df, HORIZONS, code)
+            previous = cache.previous("features", ticker)
+            # Stored: (dataset, IndicatorState at its last bar, raw bars it was built from)
+            if previous is None or not isinstance(previous[1], tuple):
+                continue
+            digest, (dataset, state, n_raw) = previous
+            if digest == digests[ticker]:
+                datasets[ticker] = dataset
+                cache.count("features", "reused")
+            elif state is not None and len(df) > n_raw and fingerprint(df.iloc[:n_raw], HORIZONS, code) == digest:
+                dataset = extend_dataset(dataset, state, df.iloc[n_raw:], HORIZONS)
+                if dataset is not None:
+                    datasets[ticker] = dataset
+                    cache.count("features", "extended")
+                    cache.put("features", ticker, digests[ticker], (dataset, state, len(df)))
+
+    stale = {t: df for t, df in usable.items() if t not in datasets}
+    if stale:
+        panel = PanelFeatureEngineer.from_frames(stale)
+        panel.add_technical_indicators()
+        panel.create_targets(HORIZONS)
+        states = panel.states() if cache is not None else {}
+        for ticker, dataset in panel.to_tickers().items():
+            datasets[ticker] = dataset
+            if cache is not None:
+                cache.count("features", "recomputed")
+                cache.put("features", ticker, digests[ticker], (dataset, states[ticker], len(stale[ticker])))
+    return {t: (datasets[t], usable[t].index[-1]) if t in usable else None for t in raw_data}
+
+def run_pipeline(ticker, prepared, n_jobs=1, walk_step=None):
+    # 1. Data & Features: (dataset, data_through) from build_datasets, None = skipped
+    if prepared is None:
+        return None
     print(f"\n--- 🚀 Processing {ticker} ---")
-    
-    # 1. Data Pipeline
-    loader = DataLoader(ticker)
-    raw_df = loader.fetch_data()
-    
-    if raw_df is None or len(raw_df) < 200:
-        print(f"Skipping {ticker}: Insufficient data.")
-        return
+    # 2. - 5. Split, models, forecasts, calibrated bands and strategy (src/backtest.py)
+    return BACKTEST.run(ticker, prepared[0], n_jobs, walk_step)
+
+def run_sweep(ticker, prepared, n_jobs=1):
+    if prepared is None:
+        return None
+    print(f"\n--- 🔎 Sweeping {ticker} ---")
+
+    dataset, split_idx, X_train, X_test, y_train, y_test = BACKTEST.split(prepared[0], HORIZON_DAYS)
+    current_prices = dataset['Close'][split_idx:]
+
+    sweep = ParameterSweep(SWEEP_CALIB, SWEEP_CONFIDENCE, n_jobs=n_jobs)
+    table = sweep.run(X_train, y_train, X_test, current_prices, y_test)
+    table.insert(0, 'ticker', ticker)
+    table.insert(1, 'horizon', HORIZON_DAYS)
+    return table
+
+def run_watchlist(tickers, inputs, max_workers=None, task=run_pipeline, profile_ticker=None):
+    # Split the cores between pool workers and LightGBM threads, so a short
+    # watchlist still uses the whole box and a long one doesn't oversubscribe it.
+    # Stage records from the workers are merged into this process's run report;
+    # profile_ticker also runs that one ticker under cProfile ({REPORT_DIR}/{ticker}.prof).
+    n_cpu = os.cpu_count() or 1
+    n_workers = max(1, min(max_workers or n_cpu, len(tickers)))
+    n_jobs = max(1, n_cpu // n_workers)
+    print(f"Running {len(tickers)} tickers on {n_workers} workers x {n_jobs} LightGBM threads")
+
+    results, failures = {}, {}
 
-    fe = FeatureEngineer(raw_df)
-    fe.add_technical_indicators()
-    df = fe.create_targets(HORIZON_DAYS)
-    
-    # 2. Train/Test Split
-    feature_cols = ['Close', 'VIX', 'ATR', 'BB_Width', 'Return']
-    X = df[feature_cols]
-    y = df['Target_Return']
-    
-    split_idx = int(len(X) * SPLIT_RATIO)
-    X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
-    y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
-    
-    test_dates = df.index[split_idx:]
-    current_prices = df['Close'].iloc[split_idx:].values 
-    
-    # 3. Model Training
-    qm = QuantileModels()
-    model_low, model_high = qm.train_lgbm(X_train, y_train)
-    
-    # 4. Forecast Returns & Calibration
-    pred_ret_low = model_low.predict(X_test)
-    pred_ret_high = model_high.predict(X_test)
-    
-    # Dynamic Calibration
-    if HORIZON_DAYS == 5: calib = 0.6
-    elif HORIZON_DAYS == 21: calib = 1.0
-    else: calib = 1.5
-    
-    center = (pred_ret_high + pred_ret_low) / 2
-    width = (pred_ret_high - pred_ret_low)
-    pred_ret_low = center - (width * calib)
-    pred_ret_high = center + (width * calib)
-    
-    # 5. Reconstruct Prices
-    p_low_price = current_prices * (1 + pred_ret_low)
-    p_high_price = current_prices * (1 + pred_ret_high)
-    y_test_price = current_prices * (1 + y_test.values)
-    
-    # 6. Evaluation
-    picp, mpiw = evaluate_metrics(y_test_price, p_low_price, p_high_price)
-    
-    # 7. Strategy & Dashboard
-    strat = SignalGenerator()
-    df_sig, signals, total_pnl = strat.run_mean_reversion(test_dates, y_test_price, p_low_price, p_high_price)
-    
-    print(f"Strategy PnL: {total_pnl:.2f}")
-    
-    # GENERATE DASHBOARD PAGE
-    # We pass the full WATCHLIST so the sidebar knows all links
-    dash = DashboardGenerator(ticker)
-    dash.generate_html(
-        dates=test_dates, 
-        actuals=y_test_price, 
-        lower=p_low_price, 
-        upper=p_high_price, 
-        signals=signals,
-        metrics=(picp, mpiw, total_pnl),
-        recent_stocks=WATCHLIST 
-    )
-    
-    # If this is the first stock, also save it as index.html (Homepage)
-    if is_first:
-        import shutil
-        shutil.copy(f"{ticker}.html", "index.html")
-        print(f"Set {ticker} as Homepage (index.html)")
+    def options(ticker):
+        profile_path = os.path.join(REPORT_DIR, f"{ticker.replace('^', '_')}.prof") if ticker == profile_ticker else None
+        return {'ticker': ticker, 'enabled': profiling.is_enabled(), 'profile_path': profile_path}
+
+    if n_workers == 1:
+        for ticker in tickers:
+            try:
+                results[ticker], records = profiling.call(task, ticker, inputs[ticker], n_jobs, **options(ticker))
+                profiling.merge(records)
+            except Exception:
+                failures[ticker] = traceback.format_exc()
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {pool.submit(profiling.call, task, t, inputs[t], n_jobs, **options(t)): t for t in tickers}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    results[ticker], records = future.result()
+                    profiling.merge(records)
+                except Exception:
+                    failures[ticker] = traceback.format_exc()
+
+    # One bad symbol never aborts the batch, it is just reported here
+    for ticker, error in failures.items():
+        print(f"❌ {ticker} failed:\n{error}")
+
+    # Keep watchlist order and drop skipped tickers
+    results = {t: results[t] for t in tickers if results.get(t) is not None}
+    return results, failures
+
+def run_nightly(tickers, datasets, cache, max_workers=None, walk_step=None, profile_ticker=None):
+    # Incremental run_watchlist + write_dashboards. Backtests (predictions included) are
+    # reused while a ticker's dataset, the config and the code are unchanged; only the
+    # other tickers go through the process pool. Their models come from the registry
+    # unless the training rows changed, so a new bar alone never retrains anything.
+    config = [BACKTEST.settings(), walk_step]
+    code = source_fingerprint(*BACKTEST_CODE)
+    digests = {t: fingerprint(datasets[t][0], config, code) for t in tickers if datasets.get(t) is not None}
+
+    results = {t: cache.get("backtest", t, digest) for t, digest in digests.items()}
+    # A profiled ticker is always rerun, there is nothing to profile in a cache hit
+    stale = [t for t in digests if results[t] is None or t == profile_ticker]
+    failures = {}
+    if stale:
+        fresh, failures = run_watchlist(stale, datasets, max_workers, task=partial(run_pipeline, walk_step=walk_step),
+                                        profile_ticker=profile_ticker)
+        for ticker, res in fresh.items():
+            results[ticker] = res
+            cache.put("backtest", ticker, digests[ticker], res)
+    results = {t: results[t] for t in tickers if results.get(t) is not None}
+
+    # Dashboard: unchanged tickers keep the data file already on disk
+    code = source_fingerprint("src/dashboard.py")
+    pages = {t: fingerprint(digests[t], DASHBOARD_MODE, code) for t in results}
+    reuse = {t for t, digest in pages.items() if cache.fresh("dashboard", t, digest)}
+    write_dashboards(results, reuse=reuse)
+    for ticker, digest in pages.items():
+        cache.put("dashboard", ticker, digest)
+    return results, failures
+
+def run_portfolio(results, horizon=HORIZON_DAYS):
+    # The whole watchlist as one portfolio with costs, on the same prices and bands as
+    # the per-ticker strategy. Cheap (one vectorized pass), so never cached.
+    if not results:
+        return None
+    dates, tickers, prices, lower, upper = align_results(results, horizon)
+    portfolio = PortfolioBacktest(FEE_BPS, SLIPPAGE_BPS, ALLOCATION).run(prices, lower, upper, dates)
+    m = portfolio['metrics']
+    print(f"📊 Portfolio ({len(tickers)} tickers, {horizon}d bands, {ALLOCATION} allocation): "
+          f"return {m['total_return']:.1%}, Sharpe {m['sharpe']:.2f}, max drawdown {m['max_drawdown']:.1%}, "
+          f"turnover {m['turnover']:.1f}x/yr, costs {m['costs']:.2%}")
+    return portfolio
+
+def write_dashboards(results, mode=DASHBOARD_MODE, reuse=()):
+    # The sidebar only lists tickers that were actually generated
+    tickers = list(results)
+    if not tickers:
+        return
+    if mode == "app":
+        sizes = write_app(results, horizon=HORIZON_DAYS, reuse=reuse)
+        print(f"Dashboard generated: index.html + {len(tickers)} data files ({len(tickers) - len(reuse)} rewritten), "
+              f"{sum(sizes.values()) / 1024:.0f} KB")
+    else:
+        # The first page doubles as the homepage (index.html)
+        sizes = write_site(results, horizon=HORIZON_DAYS)
+        print(f"Dashboards generated: {len(tickers)} pages, {sum(sizes.values()) / 1024:.0f} KB")
+        print(f"Set {tickers[0]} as Homepage (index.html)")
 
 if __name__ == "__main__":
-    # Loop through the watchlist
-    for i, stock in enumerate(WATCHLIST):
-        run_pipeline(stock, is_first=(i==0))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Nightly forecast pipeline")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Process pool size (default: one per CPU core)")
+    parser.add_argument("--offline", action="store_true", default=OFFLINE_MODE, help="Serve data from the local cache only")
+    parser.add_argument("--sweep", action="store_true", help="Grid-search calibration factor x confidence, write sweep_results.csv")
+    parser.add_argument("--walk-forward", type=int, metavar="STEP", help="Walk-forward backtest, retraining every STEP bars")
+    parser.add_argument("--full", action="store_true", help="Recompute every stage instead of reusing unchanged ones")
+    parser.add_argument("--profile", metavar="TICKER", help=f"Also run TICKER under cProfile, stats in {REPORT_DIR}/TICKER.prof")
+    args = parser.parse_args()
+    profiling.enable()
+    started = time.perf_counter()
+
+    # One batched download for the whole watchlist (VIX fetched once per market)
+    loader = DataLoader(offline=args.offline)
+    raw_data = loader.fetch_many(WATCHLIST)
+    cache = StageCache(CACHE_DIR, refresh=args.full)
+    datasets = build_datasets(raw_data, cache)
+
+    portfolio = None
+    if args.sweep:
+        results, failures = run_watchlist(WATCHLIST, datasets, args.workers, task=run_sweep, profile_ticker=args.profile)
+        if results:
+            pd.concat(results.values(), ignore_index=True).to_csv("sweep_results.csv", index=False)
+            print("Sweep results saved: sweep_results.csv")
+    else:
+        # Train changed tickers in parallel, then write the dashboard in one go
+        results, failures = run_nightly(WATCHLIST, datasets, cache, args.workers, args.walk_forward, args.profile)
+        portfolio = run_portfolio(results)
+
+    cache.save()
+    print(f"Stages: {cache.summary()}")
+
+    # Where the night went: per-stage totals here, every record in the report
+    profiling.print_summary()
+    report = profiling.write_report(REPORT_DIR, tickers=len(WATCHLIST), failures=sorted(failures), cache=cache.summary(),
+                                    wall_s=round(time.perf_counter() - started, 3), args=vars(args),
+                                    portfolio=portfolio['metrics'] if portfolio else None)
+    print(f"Run report: {report}")
@@ -0,0 +1,297 @@
+from src.data_loader import DataLoader, LocalCSVSource
+from src.feature_eng import FeatureEngineer, TickerFrame, target_column
+from src.utils import apply_calibration
+from src.calibration import ConformalCalibrator
+from main import FEATURE_COLS, HORIZONS, HORIZON_DAYS, CONFIDENCE, REGISTRY_DIR, OFFLINE_MODE, CALIBRATION_WINDOW, BACKTEST
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import multiprocessing
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# CONFIGURATION
+HOST = "127.0.0.1"
+PORT = 8000
+MAX_WORKERS = None # Process pool for data + training, None = one worker per CPU core
+MODEL_TTL = 3600 # Seconds a prepared ticker is served from memory before new bars are checked
+MAX_PREPARED = 1000 # Prepared tickers kept in memory
+BATCH_WINDOW = 0.002 # Seconds the batcher waits to collect predictions from concurrent requests
+MAX_BATCH = 256
+MAX_BULK = 500 # Forecasts per bulk POST
+
+# --- HEADLESS FORECAST SERVICE ---
+# GET  /forecast?ticker=INFY.NS&horizon=5&confidence=0.9
+# POST /forecast  {"tickers": [...], "horizon": 5, "confidence": 0.9}
+#                 or {"requests": [{"ticker": ..., "horizon": ..., "confidence": ...}, ...]}
+# GET  /health, GET /stats
+#
+# Request path:
+#   1. Coalescing: concurrent requests for the same (ticker, confidence) share one
+#      in-flight computation, and the result is kept in memory for MODEL_TTL.
+#   2. The computation (download, indicators, registry lookup or training of every
+#      horizon) runs in a process pool, so the event loop never blocks on it.
+#   3. Predictions from all requests arriving within BATCH_WINDOW are handed to a
+#      thread as one batch; windows sharing a model are scored in a single call.
+
+def prepare_ticker(ticker, confidence, data_dir, registry_dir, offline, source):
+    # Runs in a pool worker: data, features and the fitted model of every horizon
+    df = DataLoader(ticker, data_dir=data_dir, offline=offline, source=source).fetch_data()
+    if df is None or len(df) < 200:
+        return None
+    features = FeatureEngineer(df).add_technical_indicators()
+    dataset = TickerFrame.from_frame(FeatureEngineer(features).create_targets(HORIZONS))
+    models, split_idx = BACKTEST.fit_models(ticker, dataset, confidence=confidence, registry_dir=registry_dir)
+    context = max(m.context for m in models.values())
+
+    # Band calibration per horizon from the misses after the training rows (src/calibration.py),
+    # after the model's own out-of-sample misses before them
+    X = dataset.matrix(FEATURE_COLS)
+    calib = {}
+    for h in HORIZONS:
+        n = dataset.known(target_column(h))
+        low, high = models[h].predict(X[:n], start=split_idx)
+        scores = ConformalCalibrator.score(dataset[target_column(h)][split_idx:n], low, high)
+        calib[h] = ConformalCalibrator(confidence, CALIBRATION_WINDOW).update(models[h].calibration_scores).update(scores).factor()
+    return {
+        'models': models,
+        'calib': calib,
+        # Latest feature row plus whatever history sequence members need (float32 model
+        # input, like TickerFrame.matrix)
+        'window': features[FEATURE_COLS].iloc[-(context + 1):].to_numpy(dtype=np.float32),
+        'price': float(df['Close'].iloc[-1]),
+        'date': df.index[-1],
+    }
+
+def predict_batch(items):
+    # items: [(Ensemble, feature window)]. Returns [(low_return, high_return)].
+    groups = {}
+    for i, (model, window) in enumerate(items):
+        groups.setdefault(id(model), (model, []))[1].append(i)
+
+    results = [None] * len(items)
+    for model, idx in groups.values():
+        low, high = model.predict_windows(np.stack([items[i][1] for i in idx]))
+        for i, lo, hi in zip(idx, low, high):
+            results[i] = (float(lo), float(hi))
+    return results
+
+class ForecastService:
+    def __init__(self, data_dir="data", registry_dir=REGISTRY_DIR, offline=OFFLINE_MODE, source=None, max_workers=MAX_WORKERS):
+        self.data_dir = data_dir
+        self.registry_dir = registry_dir
+        self.offline = offline
+        self.source = source
+        # Spawned workers: forking a process that already runs threads is unsafe
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self.threads = ThreadPoolExecutor(max_workers=1)
+        self.prepared = {} # (ticker, confidence) -> (expires, prepared)
+        self.inflight = {} # (ticker, confidence) -> asyncio.Task
+        self.queue = None
+        self.stats = {'requests': 0, 'computations': 0, 'coalesced': 0, 'batches': 0, 'predictions': 0}
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._batch_loop())
+
+    def close(self):
+        self.batcher.cancel()
+        self.pool.shutdown(cancel_futures=True)
+        self.threads.shutdown()
+
+    async def forecast(self, ticker, horizon=HORIZON_DAYS, confidence=CONFIDENCE):
+        ticker, horizon, confidence = self._validate(ticker, horizon, confidence)
+        self.stats['requests'] += 1
+
+        prepared = await self._prepare(ticker, confidence)
+        if prepared is None:
+            raise LookupError(f"Insufficient data for {ticker}")
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((prepared['models'][horizon], prepared['window'], future))
+        f_low, f_high = apply_calibration(*await future, prepared['calib'][horizon])
+
+        price, date = prepared['price'], prepared['date']
+        return {
+            'ticker': ticker,
+            'horizon': horizon,
+            'confidence': confidence,
+            'date': str(date.date()),
+            'target_date': str((date + pd.Timedelta(days=horizon)).date()),
+            'price': price,
+            'lower': price * (1 + f_low),
+            'upper': price * (1 + f_high),
+            'lower_return': f_low,
+            'upper_return': f_high,
+        }
+
+    @staticmethod
+    def _validate(ticker, horizon, confidence):
+        ticker = str(ticker or "").strip().upper()
+        if not ticker:
+            raise ValueError("ticker is required")
+        horizon = int(horizon)
+        if horizon not in HORIZONS:
+            raise ValueError(f"horizon must be one of {HORIZONS}")
+        # Rounded so near-identical sliders share one model
+        confidence = round(float(confidence), 2)
+        if not 0.5 <= confidence < 1:
+            raise ValueError("confidence must be in [0.5, 1)")
+        return ticker, horizon, confidence
+
+    async def _prepare(self, ticker, confidence):
+        key = (ticker, confidence)
+        cached = self.prepared.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        # A client hanging up must not cancel the computation other requests wait on
+        return await asyncio.shield(task)
+
+    async def _compute(self, key):
+        self.stats['computations'] += 1
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(
+            self.pool, prepare_ticker, *key, self.data_dir, self.registry_dir, self.offline, self.source)
+
+        if len(self.prepared) >= MAX_PREPARED:
+            # Drop the entry closest to expiry
+            del self.prepared[min(self.prepared, key=lambda k: self.prepared[k][0])]
+        self.prepared[key] = (time.monotonic() + MODEL_TTL, prepared)
+        return prepared
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + BATCH_WINDOW
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.stats['batches'] += 1
+            self.stats['predictions'] += len(batch)
+            try:
+                results = await loop.run_in_executor(self.threads, predict_batch, [(m, window) for m, window, _ in batch])
+                for (_, _, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+# --- HTTP/1.1 (keep-alive, JSON only) ---
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+async def route(service, method, target, body):
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    if url.path == "/health":
+        return 200, {'status': 'ok'}
+    if url.path == "/stats":
+        return 200, service.stats
+    if url.path != "/forecast":
+        return 404, {'error': f"Unknown path {url.path}"}
+
+    try:
+        if method == "GET":
+            return 200, await service.forecast(query.get('ticker'), query.get('horizon', HORIZON_DAYS),
+                                               query.get('confidence', CONFIDENCE))
+        if method == "POST":
+            payload = json.loads(body or b"{}")
+            requests = payload.get('requests') or [
+                {'ticker': t, 'horizon': payload.get('horizon', HORIZON_DAYS), 'confidence': payload.get('confidence', CONFIDENCE)}
+                for t in payload.get('tickers', [])]
+            if len(requests) > MAX_BULK:
+                return 400, {'error': f"At most {MAX_BULK} forecasts per request"}
+            results = await asyncio.gather(*[service.forecast(r.get('ticker'), r.get('horizon', HORIZON_DAYS),
+                                                              r.get('confidence', CONFIDENCE)) for r in requests],
+                                           return_exceptions=True)
+            # One bad ticker never fails the whole batch
+            return 200, {'results': [res if not isinstance(res, Exception) else {'ticker': req.get('ticker'), 'error': str(res)}
+                                     for req, res in zip(requests, results)]}
+        return 405, {'error': f"{method} not allowed"}
+    except (ValueError, TypeError, AttributeError) as e:
+        return 400, {'error': str(e)}
+    except LookupError as e:
+        return 404, {'error': str(e)}
+    except Exception as e:
+        return 500, {'error': str(e)}
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, _ = request_line.decode('latin-1').split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode('latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            status, payload = await route(service, method, target, body)
+            data = json.dumps(payload).encode()
+            keep_alive = headers.get('connection', '').lower() != "close"
+            writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                          f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host=HOST, port=PORT, **service_args):
+    service = ForecastService(**service_args)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"🌐 Forecast service on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless forecast HTTP service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Process pool size (default: one per CPU core)")
+    parser.add_argument("--offline", action="store_true", default=OFFLINE_MODE, help="Serve data from the local cache only")
+    parser.add_argument("--csv-dir", help="Read prices from {dir}/{symbol}.csv instead of Yahoo (stub/fixtures)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    args = parser.parse_args()
+
+    source = LocalCSVSource(args.csv_dir) if args.csv_dir else None
+    try:
+        asyncio.run(serve(args.host, args.port, data_dir=args.data_dir, registry_dir=args.registry_dir,
+                          offline=args.offline, source=source, max_workers=args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,14 @@
+# Optional numba acceleration.
+# Hot loops are written once in plain Python over arrays and decorated with @njit.
+# If numba is installed they are compiled, otherwise they run as ordinary Python.
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # Support both @njit and @njit(cache=True)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
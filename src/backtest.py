@@ -0,0 +1,155 @@
+import numpy as np
+from src.feature_eng import target_column
+from src.models import QuantileModels
+from src.ensemble import Ensemble
+from src.strategy import SignalGenerator
+from src.utils import evaluate_metrics, apply_calibration
+from src.calibration import ConformalCalibrator
+from src.registry import ModelRegistry
+from src.incremental import fingerprint, source_fingerprint
+from src.profiling import stage
+
+# --- PER-TICKER BACKTEST ---
+# One ticker of the nightly run (main.py): split its dataset, get the models of every
+# horizon (model registry or one fit for all of them), forecast the test rows, calibrate
+# the bands and run the strategy. Every setting that changes a result is a constructor
+# argument and part of settings(), so main.run_nightly's cache key (settings() + the
+# source of this module and the ones it uses) covers it and main.py's code does not.
+
+class BandBacktest:
+    def __init__(self, horizons, feature_cols, headline=5, confidence=0.90, split_ratio=0.80, refresh_bars=5,
+                 calibration_window=250, members=("lightgbm",), lookback=60, walk_min_train=500,
+                 registry_dir="models", model_code=()):
+        self.horizons = list(horizons)
+        self.feature_cols = list(feature_cols)
+        self.headline = headline                     # The horizon of the dashboard / walk-forward
+        self.confidence = confidence
+        self.split_ratio = split_ratio
+        self.refresh_bars = refresh_bars
+        self.calibration_window = calibration_window
+        self.members = list(members)
+        self.lookback = lookback
+        self.walk_min_train = walk_min_train
+        self.registry_dir = registry_dir
+        self.model_code = list(model_code)           # Source files the registry fingerprints
+
+    def settings(self):
+        # JSON-able, for cache keys
+        return dict(vars(self))
+
+    def training_rows(self, n_known):
+        # Rows before the train/test split, given the rows where every target is known.
+        # Rounded down to refresh_bars: a new bar does not change the training set
+        # (and the registered models stay valid) until the split moves to the next step.
+        split_idx = int(n_known * self.split_ratio)
+        return split_idx - split_idx % self.refresh_bars
+
+    def split(self, dataset, horizon, split_idx=None, X=None):
+        # Train/Test Split on the rows where this horizon's target is known (a prefix:
+        # targets are only missing at the end). Everything returned is a view into the
+        # dataset, except the feature matrix X; pass X in to share one between horizons.
+        target = target_column(horizon)
+        dataset = dataset.head(dataset.known(target))
+        X = dataset.matrix(self.feature_cols) if X is None else X[:len(dataset)]
+        y = dataset[target]
+
+        if split_idx is None:
+            split_idx = int(len(X) * self.split_ratio)
+        X_train, X_test = X[:split_idx], X[split_idx:]
+        y_train, y_test = y[:split_idx], y[split_idx:]
+        return dataset, split_idx, X_train, X_test, y_train, y_test
+
+    def band(self, dataset, split_idx, y_test, pred_ret_low, pred_ret_high, horizon, seed_scores=()):
+        # Calibrate one horizon's forecast returns, turn them into price bands and score them
+        test_dates = dataset.dates[split_idx:]
+        current_prices = dataset['Close'][split_idx:]
+
+        # Conformal Calibration: each bar's band width comes from the misses of the bars
+        # before it whose outcome was already known (horizon bars earlier), seeded with the
+        # model's out-of-sample misses from before the split (Ensemble.calibration_scores)
+        calibrator = ConformalCalibrator(self.confidence, self.calibration_window).update(seed_scores)
+        calib = calibrator.factors(y_test, pred_ret_low, pred_ret_high, gap=horizon)
+        pred_ret_low, pred_ret_high = apply_calibration(pred_ret_low, pred_ret_high, calib)
+
+        # Price bands, metrics and strategy
+        p_low_price = current_prices * (1 + pred_ret_low)
+        p_high_price = current_prices * (1 + pred_ret_high)
+        y_test_price = current_prices * (1 + y_test)
+        picp, mpiw = evaluate_metrics(y_test_price, p_low_price, p_high_price)
+        _, signals, total_pnl = SignalGenerator().run_mean_reversion(test_dates, y_test_price, p_low_price, p_high_price)
+
+        # Results travel back from the pool workers and into the cache with float32 bands;
+        # the prices stay float64 (the portfolio backtest trades them)
+        return {
+            'dates': test_dates,
+            'actuals': y_test_price,
+            'lower': p_low_price.astype(np.float32, copy=False),
+            'upper': p_high_price.astype(np.float32, copy=False),
+            'signals': signals,
+            'metrics': (picp, mpiw, total_pnl),
+        }
+
+    def training_fingerprint(self, X_train, targets):
+        # What the model registry checks before reusing a model: the training rows (feature
+        # matrix + {horizon: target}) and the model code. Arrays or pandas objects alike, so
+        # main.py, the server and the app agree on the same data.
+        arrays = [np.ascontiguousarray(X_train, dtype=np.float32)]
+        arrays += [np.ascontiguousarray(y, dtype=np.float32) for y in targets.values()]
+        return fingerprint(*arrays, source_fingerprint(*self.model_code))
+
+    def fit_models(self, ticker, dataset, n_jobs=1, confidence=None, registry_dir=None):
+        # All horizons share one training set: the rows where even the longest target is
+        # known. Each horizon is then tested up to its own last known target.
+        confidence = self.confidence if confidence is None else confidence
+        split_idx = self.training_rows(int(dataset.valid.sum()))
+        X_train = dataset.matrix(self.feature_cols, stop=split_idx)
+        targets = {h: dataset[target_column(h)][:split_idx] for h in self.horizons}
+
+        # Reuse registered models fitted on exactly these rows, or fit every horizon at once
+        # (LightGBM and XGBoost bin the features only once) and pre-warm the registry so the
+        # Streamlit app can load them. Returns ({horizon: Ensemble}, split_idx)
+        ensemble = Ensemble(self.members, confidence, n_jobs=n_jobs, lookback=self.lookback)
+        registry = ModelRegistry(registry_dir or self.registry_dir)
+        data_through = dataset.dates[split_idx - 1]
+        digest = self.training_fingerprint(X_train, targets)
+        specs = {h: (ticker, h, confidence, "ensemble", self.feature_cols, data_through) for h in self.horizons}
+        models = {h: registry.get(*spec, params=ensemble.key_params(), fingerprint=digest) for h, spec in specs.items()}
+        if any(m is None for m in models.values()):
+            models = ensemble.fit_horizons(X_train, targets)
+            for h, spec in specs.items():
+                registry.put(models[h], *spec, params=ensemble.key_params(), fingerprint=digest)
+        return models, split_idx
+
+    def run(self, ticker, dataset, n_jobs=1, walk_step=None):
+        if walk_step:
+            # Walk-forward mode tests on everything after the first walk_min_train rows,
+            # retraining every walk_step bars: out-of-sample bands across the whole history
+            if dataset.known(target_column(self.headline)) <= self.walk_min_train:
+                print(f"Skipping {ticker}: Insufficient data for walk-forward (needs more than {self.walk_min_train} bars).")
+                return None
+            dataset, split_idx, X_train, X_test, y_train, y_test = self.split(dataset, self.headline, self.walk_min_train)
+            alpha_lower = (1 - self.confidence) / 2
+            qm = QuantileModels(alpha_lower, 1 - alpha_lower, n_jobs=n_jobs)
+            with stage("walk_forward", rows=len(dataset)):
+                pred_ret_low, pred_ret_high = qm.walk_forward(
+                    dataset.matrix(self.feature_cols), dataset[target_column(self.headline)], step=walk_step,
+                    min_train=split_idx, gap=self.headline)
+            result = self.band(dataset, split_idx, y_test, pred_ret_low, pred_ret_high, self.headline)
+            print(f"Strategy PnL: {result['metrics'][2]:.2f}")
+            return result
+
+        # Train/Test Split and Model Training
+        models, split_idx = self.fit_models(ticker, dataset, n_jobs)
+
+        # Forecast Returns & backtest every horizon in the same pass, on one feature matrix
+        X = dataset.matrix(self.feature_cols)
+        horizons = {}
+        for h in self.horizons:
+            dataset_h, _, _, X_test, _, y_test = self.split(dataset, h, split_idx, X)
+            # Rows before split_idx are history for sequence members
+            pred_ret_low, pred_ret_high = models[h].predict(X[:len(dataset_h)], start=split_idx)
+            horizons[h] = self.band(dataset_h, split_idx, y_test, pred_ret_low, pred_ret_high, h, models[h].calibration_scores)
+            print(f"Strategy PnL ({h}d): {horizons[h]['metrics'][2]:.2f}")
+
+        # Dashboards are written by the parent process once every ticker is done
+        return {**horizons[self.headline], 'horizons': horizons}
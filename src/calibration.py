@@ -0,0 +1,72 @@
+import bisect
+import math
+from collections import deque
+import numpy as np
+
+# --- CONFORMAL BAND CALIBRATION ---
+# The quantile models' band is rarely calibrated out of sample: coverage drifts away
+# from the requested confidence. Instead of a fixed width multiplier per horizon, the
+# factor is learned from the band's own out-of-sample misses (split conformal):
+#   score = |actual - band center| / band width
+# The conformal quantile of the last `window` scores at the target confidence is the
+# factor for utils.apply_calibration (center +/- width * factor); 0.5 is the raw band.
+#
+# Scores are kept in a sorted list (plus arrival order for the rolling window): a new
+# bar is a bisect search (O(log window)) plus a list insert / delete, which shifts up
+# to `window` items, so an update is O(window). The shift is one memmove: about 1 us
+# per update at window=250 and 10 us at 25,000. The factor is then a single index
+# lookup, so nothing is re-sorted and nothing is retrained to fix a band that is too
+# narrow. For much larger windows, swap the list for a logarithmic structure (two heaps
+# or an order-statistic tree).
+
+class ConformalCalibrator:
+    RAW_FACTOR = 0.5 # The uncalibrated band, used until there are min_samples scores
+
+    def __init__(self, confidence=0.90, window=250, min_samples=20):
+        self.confidence = confidence
+        self.window = window
+        self.min_samples = min_samples
+        self.sorted = []       # Scores in the window, ascending (insert / delete are O(window))
+        self.recent = deque()  # Same scores in arrival order, to drop the oldest
+
+    @staticmethod
+    def score(actual, lower, upper):
+        # Vectorized: distance from the band center in units of band width
+        lower, upper = np.asarray(lower, dtype=np.float64), np.asarray(upper, dtype=np.float64)
+        width = np.maximum(np.abs(upper - lower), 1e-12)
+        return np.abs(np.asarray(actual, dtype=np.float64) - (lower + upper) / 2) / width
+
+    def __len__(self):
+        return len(self.sorted)
+
+    def update(self, scores):
+        # Add one score or an array of them (oldest first)
+        for s in np.atleast_1d(scores).tolist():
+            bisect.insort(self.sorted, s)
+            self.recent.append(s)
+            if len(self.recent) > self.window:
+                old = self.recent.popleft()
+                del self.sorted[bisect.bisect_left(self.sorted, old)]
+        return self
+
+    def factor(self):
+        # Finite-sample conformal quantile: the ceil((n + 1) * confidence)-th smallest score
+        n = len(self.sorted)
+        if n < self.min_samples:
+            return self.RAW_FACTOR
+        k = min(math.ceil((n + 1) * self.confidence), n)
+        return self.sorted[k - 1]
+
+    def factors(self, actual, lower, upper, gap):
+        # Backtest: the factor in force at every bar of a test period, without look-ahead.
+        # A bar's score is known `gap` bars later (its target is the return `gap` bars
+        # ahead), so bar t is calibrated on bars <= t - gap. Afterwards the state holds
+        # every score, ready for the live forecast after the last bar.
+        scores = self.score(actual, lower, upper)
+        out = np.empty(len(scores))
+        for t in range(len(scores)):
+            if t >= gap:
+                self.update(scores[t - gap])
+            out[t] = self.factor()
+        self.update(scores[max(len(scores) - gap, 0):])
+        return out
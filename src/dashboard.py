@@ -1,8 +1,312 @@
-import plotly.graph_objects as go
-import pandas as pd
+import base64
+import gzip
+import hashlib
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import pytz # Optional: For specific timezones if needed
+from string import Template
+import numpy as np
+import pandas as pd
+from src.profiling import stage
+from src.utils import write_atomic
+
+# --- STATIC DASHBOARD ---
+# Every page is the same small HTML template plus an embedded JSON payload. Series are
+# stored as base64 little-endian float32 (prices) / int32 (dates as days since
+# 1970-01-01) instead of JSON number lists, and the figure is built in the browser
+# by one shared script (assets/dashboard.js). Plotly and Bootstrap come from a CDN,
+# so the browser caches them once for the whole site.
+#
+# Two site layouts:
+#   write_site - one HTML page per ticker ({ticker}.html), works from file://
+#   write_app  - one static page (index.html) + assets/manifest.json + one gzip JSON
+#                file per ticker (assets/tickers/), fetched when the ticker is
+#                selected. Needs to be served over HTTP (GitHub Pages, python -m http.server).
+
+PLOTLY_JS = "https://cdn.plot.ly/plotly-2.35.2.min.js"
+BOOTSTRAP_CSS = "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css"
+ASSETS_DIR = "assets"
+
+DASHBOARD_CSS = """
+body { background-color: #121212; color: #e0e0e0; }
+.card { background-color: #1e1e1e; border: 1px solid #333; }
+.metric-value { font-size: 2rem; font-weight: bold; color: #fff; }
+.signal-BUY { color: #00FF00; } .signal-SELL { color: #FF0000; } .signal-HOLD { color: #888; }
+.sidebar { height: 100vh; border-right: 1px solid #333; padding-top: 20px; }
+.footer-text { color: #666; font-size: 0.8rem; margin-top: 20px; }
+#chart { height: 500px; }
+"""
+
+DASHBOARD_JS = """
+(function () {
+  function bytes(b64) {
+    var bin = atob(b64), out = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) out[i] = bin.charCodeAt(i);
+    return out.buffer;
+  }
+  function f32(b64) { return new Float32Array(bytes(b64)); }
+  function day(d) { return new Date(d * 86400000).toISOString().slice(0, 10); }
+
+  function traces(h, shared) {
+    var x = h.dates ? Array.from(new Int32Array(bytes(h.dates)), day) : shared.slice(0, h.n);
+    var marker = function (kind, symbol, color) {
+      var s = h.signals.filter(function (s) { return s[1] === kind; });
+      return {x: s.map(function (s) { return day(s[0]); }), y: s.map(function (s) { return s[2]; }),
+              mode: 'markers', name: kind, marker: {symbol: symbol, size: 12, color: color}};
+    };
+    return [
+      {x: x, y: f32(h.upper), mode: 'lines', line: {color: 'rgba(0,0,0,0)'}, showlegend: false, hoverinfo: 'skip'},
+      {x: x, y: f32(h.lower), mode: 'lines', fill: 'tonexty', fillcolor: 'rgba(0, 100, 255, 0.2)',
+       line: {color: 'rgba(0,0,0,0)'}, name: h.label},
+      {x: x, y: f32(h.actual), mode: 'lines', name: 'Actual Price', line: {color: '#00F0FF', width: 2}},
+      marker('BUY', 'triangle-up', '#00FF00'),
+      marker('SELL', 'triangle-down', '#FF0000')
+    ];
+  }
+
+  function showChart(data) {
+    var shared = Array.from(new Int32Array(bytes(data.dates)), day);
+    var layout = {paper_bgcolor: '#1e1e1e', plot_bgcolor: '#1e1e1e', font: {color: 'white'},
+                  xaxis: {gridcolor: '#333'}, yaxis: {gridcolor: '#333', title: 'Price (' + data.currency + ')'},
+                  hovermode: 'x unified', margin: {l: 0, r: 0, t: 0, b: 0}};
+    var show = function (h) {
+      Plotly.react('chart', traces(data.horizons[h], shared), layout, {responsive: true});
+      document.querySelectorAll('#horizon-buttons button').forEach(function (b) {
+        b.classList.toggle('active', b.dataset.h === h);
+      });
+    };
+    var keys = Object.keys(data.horizons);
+    var group = document.getElementById('horizon-buttons');
+    group.innerHTML = '';
+    if (keys.length > 1) {
+      keys.forEach(function (h) {
+        var b = document.createElement('button');
+        b.className = 'btn btn-outline-light btn-sm'; b.dataset.h = h; b.textContent = h + ' Days';
+        b.onclick = function () { show(h); };
+        group.appendChild(b);
+      });
+    }
+    show(String(data.horizon));
+  }
+
+  // --- One page per ticker ---
+  function sidebar(current) {
+    // Watchlist links come from the shared assets/watchlist.js, not from every page
+    document.getElementById('sidebar').innerHTML = (window.WATCHLIST || []).map(function (t) {
+      return '<a href="' + encodeURIComponent(t) + '.html" class="list-group-item list-group-item-action bg-dark text-white' +
+             (t === current ? ' active' : '') + '">' + t + '</a>';
+    }).join('');
+  }
+
+  window.renderDashboard = function (data) {
+    sidebar(data.ticker);
+    showChart(data);
+  };
+
+  // --- Single page: manifest + one gzip JSON file per ticker, fetched on selection ---
+  function loadJson(url, options) {
+    return fetch(url, options).then(function (r) {
+      if (!r.ok) throw new Error(url + ': HTTP ' + r.status);
+      return r.arrayBuffer();
+    }).then(function (buf) {
+      var head = new Uint8Array(buf, 0, 2);
+      if (head[0] !== 0x1f || head[1] !== 0x8b) // Already decoded (server sent Content-Encoding: gzip)
+        return JSON.parse(new TextDecoder().decode(buf));
+      return new Response(new Blob([buf]).stream().pipeThrough(new DecompressionStream('gzip'))).json();
+    });
+  }
+
+  function text(id, value) { document.getElementById(id).textContent = value; }
+
+  function showSummary(data) {
+    var m = data.horizons[data.horizon].metrics;
+    text('title', data.ticker + ' AI Forecast');
+    text('latest', 'Latest Data: ' + data.latest);
+    text('price', data.currency + data.price.toFixed(2));
+    text('coverage', (m[0] * 100).toFixed(1) + '%');
+    text('pnl', (m[2] >= 0 ? '+' : '') + m[2].toFixed(2));
+    document.getElementById('pnl').style.color = m[2] > 0 ? '#0f0' : '#f00';
+    text('signal', data.signal);
+    document.getElementById('signal').className = 'metric-value signal-' + data.signal;
+
+    var keys = Object.keys(data.horizons), card = document.getElementById('scorecard');
+    card.hidden = keys.length < 2;
+    card.querySelector('tbody').innerHTML = keys.map(function (h) {
+      var r = data.horizons[h].metrics;
+      return '<tr><td>' + h + ' Days</td><td>' + (r[0] * 100).toFixed(1) + '%</td><td>' + data.currency + r[1].toFixed(2) +
+             '</td><td>' + (r[2] >= 0 ? '+' : '') + r[2].toFixed(2) + '</td><td>' + data.horizons[h].trades + '</td></tr>';
+    }).join('');
+  }
+
+  window.renderApp = function (assets) {
+    var cache = {}, current = null;
+    // The manifest changes every night: revalidate it. Ticker files are versioned by hash.
+    loadJson(assets + '/manifest.json', {cache: 'no-cache'}).then(function (manifest) {
+      var entries = {}, list = document.getElementById('sidebar');
+      text('updated', manifest.updated);
+      manifest.tickers.forEach(function (e) {
+        entries[e.ticker] = e;
+        var a = document.createElement('a');
+        a.href = '#' + encodeURIComponent(e.ticker);
+        a.className = 'list-group-item list-group-item-action bg-dark text-white d-flex justify-content-between';
+        a.dataset.ticker = e.ticker;
+        a.innerHTML = '<span></span><small class="signal-' + e.signal + '">' + e.signal + '</small>';
+        a.firstChild.textContent = e.ticker;
+        list.appendChild(a);
+      });
+
+      var select = function () {
+        var ticker = decodeURIComponent(location.hash.slice(1));
+        var entry = entries[ticker] || manifest.tickers[0];
+        if (!entry || entry.ticker === current) return;
+        current = entry.ticker;
+        list.querySelectorAll('a').forEach(function (a) { a.classList.toggle('active', a.dataset.ticker === current); });
+        // Plotly, Bootstrap and earlier tickers stay loaded; only this ticker's file is fetched, once
+        cache[current] = cache[current] || loadJson(assets + '/' + entry.file + '?v=' + entry.v);
+        cache[current].then(function (data) {
+          if (data.ticker !== current) return; // Another ticker was clicked meanwhile
+          showSummary(data);
+          showChart(data);
+        }, function (err) {
+          delete cache[entry.ticker];
+          text('title', entry.ticker + ': ' + err.message);
+        });
+      };
+      window.addEventListener('hashchange', select);
+      select();
+    });
+  };
+})();
+"""
+
+# One template for every page; $-placeholders so CSS/JS braces need no escaping
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$ticker Forecast</title>
+<link href="$bootstrap_css" rel="stylesheet">
+<link href="$assets/dashboard.css" rel="stylesheet">
+<script src="$plotly_js"></script>
+<script src="$assets/watchlist.js"></script>
+<script src="$assets/dashboard.js"></script>
+</head>
+<body>
+<div class="container-fluid"><div class="row">
+<div class="col-md-2 sidebar bg-dark">
+<h4 class="text-center mb-4"> Watchlist</h4>
+<div class="list-group list-group-flush" id="sidebar"></div>
+</div>
+<div class="col-md-10 p-4">
+<div class="d-flex justify-content-between align-items-center mb-4">
+<h1> $ticker AI Forecast</h1>
+<span class="badge bg-secondary">Latest Data: $latest</span>
+</div>
+<div class="row mb-4">
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">Price</div><div class="metric-value">$price</div></div></div>
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">Coverage</div><div class="metric-value">$coverage</div></div></div>
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">PnL</div><div class="metric-value" style="color:$pnl_color">$pnl</div></div></div>
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">Signal</div><div class="metric-value signal-$signal">$signal</div></div></div>
+</div>
+<div class="card p-4"><div class="btn-group mb-2" id="horizon-buttons"></div><div id="chart"></div></div>
+$scorecard
+<div class="text-center footer-text">
+Last Updated: $updated (Server Time) <br>
+Generated by Python Quant Pipeline • Hosted on GitHub Pages
+</div>
+</div>
+</div></div>
+<script type="application/json" id="data">$data</script>
+<script>renderDashboard(JSON.parse(document.getElementById('data').textContent));</script>
+</body>
+</html>
+""")
+
+# Single-page shell: static, the data comes from the manifest and ticker files
+APP_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Forecast Dashboard</title>
+<link href="$bootstrap_css" rel="stylesheet">
+<link href="$assets/dashboard.css" rel="stylesheet">
+<script src="$plotly_js"></script>
+<script src="$assets/dashboard.js"></script>
+</head>
+<body>
+<div class="container-fluid"><div class="row">
+<div class="col-md-2 sidebar bg-dark overflow-auto">
+<h4 class="text-center mb-4"> Watchlist</h4>
+<div class="list-group list-group-flush" id="sidebar"></div>
+</div>
+<div class="col-md-10 p-4">
+<div class="d-flex justify-content-between align-items-center mb-4">
+<h1 id="title">Loading...</h1>
+<span class="badge bg-secondary" id="latest"></span>
+</div>
+<div class="row mb-4">
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">Price</div><div class="metric-value" id="price"></div></div></div>
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">Coverage</div><div class="metric-value" id="coverage"></div></div></div>
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">PnL</div><div class="metric-value" id="pnl"></div></div></div>
+<div class="col-md-3"><div class="card p-3"><div class="text-muted">Signal</div><div class="metric-value" id="signal"></div></div></div>
+</div>
+<div class="card p-4"><div class="btn-group mb-2" id="horizon-buttons"></div><div id="chart"></div></div>
+<div class="card p-3 mt-4" id="scorecard" hidden><table class="table table-dark table-sm mb-0">
+<thead><tr><th>Horizon</th><th>Coverage</th><th>Avg Width</th><th>PnL</th><th>Trades</th></tr></thead>
+<tbody></tbody></table></div>
+<div class="text-center footer-text">
+Last Updated: <span id="updated"></span> (Server Time) <br>
+Generated by Python Quant Pipeline • Hosted on GitHub Pages
+</div>
+</div>
+</div></div>
+<script>renderApp("$assets");</script>
+</body>
+</html>
+""")
+
+def encode_f32(values):
+    return base64.b64encode(np.asarray(values, dtype='<f4').tobytes()).decode('ascii')
+
+def encode_dates(dates):
+    days = pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype('<i4')
+    return base64.b64encode(days.tobytes()).decode('ascii')
+
+def _day(date):
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+def chart_payload(horizons, horizon, currency):
+    # JSON-ready chart data for every horizon. The horizons are backtested from the same
+    # start date, so their dates are prefixes of the longest one: dates are stored once
+    # and each horizon only keeps its length (or its own dates if they differ).
+    longest = max((pd.DatetimeIndex(res['dates']) for res in horizons.values()), key=len)
+    payload = {'currency': currency, 'horizon': str(horizon), 'dates': encode_dates(longest), 'horizons': {}}
+    for h, res in horizons.items():
+        dates = pd.DatetimeIndex(res['dates'])
+        series = {
+            'label': f"{h} Days" if h is not None else "Forecast",
+            'actual': encode_f32(res['actuals']),
+            'lower': encode_f32(res['lower']),
+            'upper': encode_f32(res['upper']),
+            'signals': [[_day(s[0]), s[1], round(float(s[2]), 4)] for s in res['signals'] if s[1] in ('BUY', 'SELL')],
+            'metrics': [round(float(v), 4) for v in res['metrics']],
+            'trades': len(res['signals']),
+        }
+        if dates.equals(longest[:len(dates)]):
+            series['n'] = len(dates)
+        else:
+            series['dates'] = encode_dates(dates)
+        payload['horizons'][str(h)] = series
+    return payload
+
+def write_assets(recent_stocks, out_dir="."):
+    # Shared by every page, written once per build. The watchlist (sidebar links) is
+    # one small script instead of N links repeated on N pages.
+    os.makedirs(os.path.join(out_dir, ASSETS_DIR), exist_ok=True)
+    write_atomic(os.path.join(out_dir, ASSETS_DIR, "dashboard.css"), DASHBOARD_CSS)
+    write_atomic(os.path.join(out_dir, ASSETS_DIR, "dashboard.js"), DASHBOARD_JS)
+    write_atomic(os.path.join(out_dir, ASSETS_DIR, "watchlist.js"), f"window.WATCHLIST = {json.dumps(list(recent_stocks))};\n")
 
 class DashboardGenerator:
     def __init__(self, ticker):
@@ -12,96 +316,141 @@ class DashboardGenerator:
         else:
             self.currency = "$"
 
-    def generate_html(self, dates, actuals, lower, upper, signals, metrics, recent_stocks=[]):
-        # 1. Prepare Data
-        df = pd.DataFrame({'Date': dates, 'Actual': actuals, 'Lower': lower, 'Upper': upper})
-        last_price = df['Actual'].iloc[-1]
-        
+    def payload(self, dates, actuals, lower, upper, signals, metrics, horizons=None, horizon=None):
+        # Everything a page shows, JSON-ready.
+        # horizons: {days: {'dates', 'actuals', 'lower', 'upper', 'signals', 'metrics'}}, every
+        # one switchable in the browser; horizon: the key of the headline result.
+        headline = {'dates': dates, 'actuals': actuals, 'lower': lower, 'upper': upper, 'signals': signals, 'metrics': metrics}
+        if not horizons:
+            horizons = {horizon: headline}
+        if horizon not in horizons:
+            horizon = next(iter(horizons))
+
+        # 1. Headline numbers
+        last_date = pd.Timestamp(dates[-1])
         last_signal = "HOLD"
-        if signals:
-            if signals[-1][0] == df['Date'].iloc[-1]:
-                last_signal = signals[-1][1]
-
-        # 2. Build Chart
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df['Date'].tolist() + df['Date'].tolist()[::-1], y=df['Upper'].tolist() + df['Lower'].tolist()[::-1], fill='toself', fillcolor='rgba(0, 100, 255, 0.2)', line=dict(color='rgba(255,255,255,0)'), name='90% Confidence'))
-        fig.add_trace(go.Scatter(x=df['Date'], y=df['Actual'], mode='lines', name='Actual Price', line=dict(color='#00F0FF', width=2)))
-        
-        buy_x, buy_y = zip(*[(s[0], s[2]) for s in signals if s[1] == 'BUY']) if any(s[1]=='BUY' for s in signals) else ([],[])
-        sell_x, sell_y = zip(*[(s[0], s[2]) for s in signals if s[1] == 'SELL']) if any(s[1]=='SELL' for s in signals) else ([],[])
-        fig.add_trace(go.Scatter(x=buy_x, y=buy_y, mode='markers', name='BUY', marker=dict(symbol='triangle-up', size=12, color='#00FF00')))
-        fig.add_trace(go.Scatter(x=sell_x, y=sell_y, mode='markers', name='SELL', marker=dict(symbol='triangle-down', size=12, color='#FF0000')))
-
-        fig.update_layout(paper_bgcolor='#1e1e1e', plot_bgcolor='#1e1e1e', font=dict(color='white'), xaxis=dict(gridcolor='#333'), yaxis=dict(gridcolor='#333', title=f"Price ({self.currency})"), hovermode="x unified", margin=dict(l=0, r=0, t=0, b=0), height=500)
-        plot_div = fig.to_html(full_html=False, include_plotlyjs='cdn')
+        if signals and pd.Timestamp(signals[-1][0]) == last_date:
+            last_signal = signals[-1][1]
+
+        # 2. Chart data, encoded once per series
+        payload = chart_payload(horizons, horizon, self.currency)
+        payload.update(ticker=self.ticker, latest=str(last_date.date()), price=float(actuals[-1]), signal=last_signal)
+        return payload, horizons
+
+    def render(self, dates, actuals, lower, upper, signals, metrics, recent_stocks=[], horizons=None, horizon=None):
+        # Returns the page as a string
+        payload, horizons = self.payload(dates, actuals, lower, upper, signals, metrics, horizons, horizon)
         picp, mpiw, pnl = metrics
 
-        # 3. Generate Sidebar Links
-        sidebar_html = ""
-        for stock in recent_stocks:
-            active_class = "active" if stock == self.ticker else ""
-            # Link assumes file naming convention TICKER.html
-            sidebar_html += f'<a href="{stock}.html" class="list-group-item list-group-item-action bg-dark text-white {active_class}">{stock}</a>'
-
-        # 4. Generate Timestamp
-        # Uses UTC by default, or server time. 
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{self.ticker} Forecast</title>
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-            <style>
-                body {{ background-color: #121212; color: #e0e0e0; }}
-                .card {{ background-color: #1e1e1e; border: 1px solid #333; }}
-                .metric-value {{ font-size: 2rem; font-weight: bold; color: #fff; }}
-                .signal-BUY {{ color: #00FF00; }} .signal-SELL {{ color: #FF0000; }} .signal-HOLD {{ color: #888; }}
-                .sidebar {{ height: 100vh; border-right: 1px solid #333; padding-top: 20px; }}
-                .footer-text {{ color: #666; font-size: 0.8rem; margin-top: 20px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container-fluid">
-                <div class="row">
-                    <div class="col-md-2 sidebar bg-dark">
-                        <h4 class="text-center mb-4"> Watchlist</h4>
-                        <div class="list-group list-group-flush">
-                            {sidebar_html}
-                        </div>
-                    </div>
-                    
-                    <div class="col-md-10 p-4">
-                        <div class="d-flex justify-content-between align-items-center mb-4">
-                            <h1> {self.ticker} AI Forecast</h1>
-                            <span class="badge bg-secondary">Latest Data: {df['Date'].iloc[-1].date()}</span>
-                        </div>
-                        <div class="row mb-4">
-                            <div class="col-md-3"><div class="card p-3"><div class="text-muted">Price</div><div class="metric-value">{self.currency}{last_price:.2f}</div></div></div>
-                            <div class="col-md-3"><div class="card p-3"><div class="text-muted">Coverage</div><div class="metric-value">{picp*100:.1f}%</div></div></div>
-                            <div class="col-md-3"><div class="card p-3"><div class="text-muted">PnL</div><div class="metric-value" style="color:{'#0f0' if pnl>0 else '#f00'}">{pnl:+.2f}</div></div></div>
-                            <div class="col-md-3"><div class="card p-3"><div class="text-muted">Signal</div><div class="metric-value signal-{last_signal}">{last_signal}</div></div></div>
-                        </div>
-                        <div class="card p-4">{plot_div}</div>
-                        
-                        <div class="text-center footer-text">
-                            Last Updated: {current_time} (Server Time) <br>
-                            Generated by Python Quant Pipeline • Hosted on GitHub Pages
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
+        # Per-horizon scorecard (only when there is more than one horizon)
+        scorecard = ""
+        if len(horizons) > 1:
+            rows = ""
+            for h, res in horizons.items():
+                h_picp, h_mpiw, h_pnl = res['metrics']
+                rows += f"<tr><td>{h} Days</td><td>{h_picp*100:.1f}%</td><td>{self.currency}{h_mpiw:.2f}</td><td>{h_pnl:+.2f}</td><td>{len(res['signals'])}</td></tr>"
+            scorecard = ('<div class="card p-3 mt-4"><table class="table table-dark table-sm mb-0">'
+                         '<thead><tr><th>Horizon</th><th>Coverage</th><th>Avg Width</th><th>PnL</th><th>Trades</th></tr></thead>'
+                         f'<tbody>{rows}</tbody></table></div>')
+
+        return PAGE_TEMPLATE.substitute(
+            ticker=self.ticker,
+            bootstrap_css=BOOTSTRAP_CSS,
+            plotly_js=PLOTLY_JS,
+            assets=ASSETS_DIR,
+            latest=payload['latest'],
+            price=f"{self.currency}{payload['price']:.2f}",
+            coverage=f"{picp*100:.1f}%",
+            pnl=f"{pnl:+.2f}",
+            pnl_color='#0f0' if pnl > 0 else '#f00',
+            signal=payload['signal'],
+            scorecard=scorecard,
+            updated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            # "</" would end the <script> block early
+            data=json.dumps(payload, separators=(',', ':')).replace("</", "<\\/"),
+        )
+
+    def generate_html(self, dates, actuals, lower, upper, signals, metrics, recent_stocks=[], horizons=None, horizon=None, out_dir="."):
+        # Single page (plus index.html for the first watchlist entry); see write_site for a whole watchlist
+        with stage("render", rows=len(dates), ticker=self.ticker):
+            html = self.render(dates, actuals, lower, upper, signals, metrics, recent_stocks, horizons, horizon)
+        write_assets(recent_stocks, out_dir)
         filename = f"{self.ticker}.html"
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(html_content)
-        
-        if self.ticker == recent_stocks[0]: 
-            with open("index.html", "w", encoding="utf-8") as f:
-                f.write(html_content)
-                
+        write_atomic(os.path.join(out_dir, filename), html)
+        if recent_stocks and self.ticker == recent_stocks[0]:
+            write_atomic(os.path.join(out_dir, "index.html"), html)
         print(f"Dashboard generated: {filename}")
+
+def write_site(results, horizon=None, out_dir=".", max_workers=8):
+    # results: {ticker: run_pipeline result}, in watchlist order. Renders every page and
+    # writes them concurrently; the first ticker doubles as the homepage (index.html),
+    # written once from the same rendered string.
+    tickers = list(results)
+    write_assets(tickers, out_dir)
+
+    def build(ticker):
+        res = results[ticker]
+        with stage("render", rows=len(res['dates']), ticker=ticker):
+            html = DashboardGenerator(ticker).render(
+                res['dates'], res['actuals'], res['lower'], res['upper'], res['signals'], res['metrics'],
+                horizons=res.get('horizons'), horizon=horizon)
+        write_atomic(os.path.join(out_dir, f"{ticker}.html"), html)
+        if ticker == tickers[0]:
+            write_atomic(os.path.join(out_dir, "index.html"), html)
+        return len(html.encode("utf-8"))
+
+    with stage("dashboard", rows=len(tickers), ticker="site"), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        sizes = dict(zip(tickers, pool.map(build, tickers)))
+    return sizes
+
+def write_app(results, horizon=None, out_dir=".", max_workers=8, reuse=()):
+    # results: {ticker: run_pipeline result}, in watchlist order. Writes the single-page
+    # site: index.html (static shell), assets/manifest.json and assets/tickers/{ticker}.json.gz.
+    # Output grows linearly with the watchlist: one data file per ticker plus one
+    # manifest line, and the shell does not change between runs.
+    # reuse: tickers whose data file from the previous build is still current (main.py's
+    # incremental run); they keep their manifest entry and file as they are.
+    tickers = list(results)
+    write_assets(tickers, out_dir)
+    data_dir = os.path.join(out_dir, ASSETS_DIR, "tickers")
+    os.makedirs(data_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, ASSETS_DIR, "manifest.json")
+
+    previous = {}
+    if reuse:
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                previous = {e['ticker']: e for e in json.load(f)['tickers']}
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def build(ticker):
+        entry = previous.get(ticker)
+        if ticker in reuse and entry and os.path.exists(os.path.join(out_dir, ASSETS_DIR, entry['file'])):
+            return entry
+        res = results[ticker]
+        with stage("render", rows=len(res['dates']), ticker=ticker):
+            gen = DashboardGenerator(ticker)
+            payload, _ = gen.payload(res['dates'], res['actuals'], res['lower'], res['upper'], res['signals'], res['metrics'],
+                                     horizons=res.get('horizons'), horizon=horizon)
+            # mtime=0: same data, same bytes, so unchanged tickers keep their version (browser cache)
+            blob = gzip.compress(json.dumps(payload, separators=(',', ':')).encode("utf-8"), mtime=0)
+        filename = f"{ticker}.json.gz"
+        write_atomic(os.path.join(data_dir, filename), blob)
+        return {'ticker': ticker, 'file': f"tickers/{filename}", 'v': hashlib.sha1(blob).hexdigest()[:12],
+                'bytes': len(blob), 'signal': payload['signal']}
+
+    with stage("dashboard", rows=len(tickers), ticker="site"), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        entries = list(pool.map(build, tickers))
+
+    # Tickers dropped from the watchlist
+    current = {os.path.basename(e['file']) for e in entries}
+    for name in os.listdir(data_dir):
+        if name not in current:
+            os.remove(os.path.join(data_dir, name))
+
+    manifest = {'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'tickers': entries}
+    write_atomic(manifest_path, json.dumps(manifest, separators=(',', ':')))
+    write_atomic(os.path.join(out_dir, "index.html"), APP_TEMPLATE.substitute(
+        bootstrap_css=BOOTSTRAP_CSS, plotly_js=PLOTLY_JS, assets=ASSETS_DIR))
+    return {e['ticker']: e['bytes'] for e in entries}
@@ -1,47 +1,175 @@
-import yfinance as yf
 import pandas as pd
+import numpy as np
 import os
+from src.profiling import stage
+from src.utils import write_atomic
+
+# --- DATA SOURCES ---
+# A source turns (symbols, start) into {symbol: OHLCV DataFrame}. DataLoader only talks
+# to this interface, so tests and benchmarks can swap Yahoo for a local fixture.
+
+class YahooSource:
+    def download(self, symbols, start):
+        import yfinance as yf # Not needed at all when serving from the cache
+
+        # One batched request for every symbol
+        data = yf.download(list(symbols), start=start, group_by='ticker', progress=False)
+        frames = {}
+        if data is None or data.empty:
+            return frames
+
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol].copy()
+            else:
+                df = data.copy()
+            df.columns.name = None
+            # Batched frames are aligned on the union of all trading calendars
+            df = df.dropna(how='all')
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+class LocalCSVSource:
+    # Reads {directory}/{symbol}.csv, e.g. fixtures or a dump from a stub server
+    def __init__(self, directory):
+        self.directory = directory
+
+    def download(self, symbols, start):
+        frames = {}
+        for symbol in symbols:
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+            frames[symbol] = df.loc[df.index >= pd.Timestamp(start)]
+        return frames
 
 class DataLoader:
-    def __init__(self, ticker, start_date="2015-01-01", data_dir="data"):
+    def __init__(self, ticker=None, start_date="2015-01-01", data_dir="data", offline=False, source=None):
         self.ticker = ticker
         self.start_date = start_date
         self.data_dir = data_dir
+        # Offline mode never touches the network and serves from the local cache only
+        self.offline = offline
+        self.source = source if source is not None else YahooSource()
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
 
+    @staticmethod
+    def vix_for(ticker):
+        # Automatic Detection: Use India VIX for .NS or .BO tickers
+        if ticker.endswith(".NS") or ticker.endswith(".BO"):
+            return "^INDIAVIX"
+        return "^VIX" # Default to US VIX
+
     def fetch_data(self):
-        # 1. Automatic Detection: Use India VIX for .NS or .BO tickers
-        if self.ticker.endswith(".NS") or self.ticker.endswith(".BO"):
-            vix_ticker = "^INDIAVIX" 
+        vix_ticker = self.vix_for(self.ticker)
+        if vix_ticker == "^INDIAVIX":
             print(f"🇮🇳 Detected Indian Stock. Using {vix_ticker}...")
         else:
-            vix_ticker = "^VIX" # Default to US VIX
             print(f"🇺🇸 Using US {vix_ticker}...")
 
         print(f"Fetching data for {self.ticker} and {vix_ticker}...")
-        
-        try:
-            df = yf.download(self.ticker, start=self.start_date, progress=False)
-            vix = yf.download(vix_ticker, start=self.start_date, progress=False)
-        except Exception as e:
-            print(f"Error downloading data: {e}")
+
+        # 1. Read the local store first, only downloading the bars after the last cached one.
+        # VIX lives in its own file, so every ticker on the same market shares one copy.
+        with stage("fetch", ticker=self.ticker) as record:
+            data = self._load_symbols([self.ticker, vix_ticker])
+            df = self._merge_vix(data.get(self.ticker), data.get(vix_ticker))
+            if record is not None:
+                record['rows'] = 0 if df is None else len(df)
+        return df
+
+    def fetch_many(self, tickers):
+        # Bulk version of fetch_data: one batched download for all tickers plus each
+        # distinct VIX index (fetched once, however many tickers use it).
+        vix_map = {t: self.vix_for(t) for t in tickers}
+        symbols = list(dict.fromkeys(list(tickers) + list(vix_map.values())))
+
+        print(f"Fetching data for {len(tickers)} tickers and {len(set(vix_map.values()))} VIX series...")
+        with stage("fetch", ticker="batch") as record:
+            data = self._load_symbols(symbols)
+            frames = {t: self._merge_vix(data.get(t), data.get(vix_map[t])) for t in tickers}
+            if record is not None:
+                record['rows'] = sum(len(df) for df in frames.values() if df is not None)
+        return frames
+
+    def _merge_vix(self, df, vix):
+        if df is None or vix is None:
             return None
 
+        df = df.loc[df.index >= pd.Timestamp(self.start_date), ['Close', 'High', 'Low', 'Volume']]
+
+        # 2. Merge VIX, with robust gap filling (India VIX often has missing data points)
+        vix = vix['Close'].reindex(df.index).ffill().bfill()
+
+        # One copy of just the columns the pipeline uses: VIX (a model feature only) as
+        # float32, prices and Volume stay float64 (feature_eng.column_dtype)
+        return df.assign(VIX=vix.astype(np.float32))
+
+    # --- LOCAL OHLCV CACHE ---
+    # One Parquet file per symbol: data/{symbol}.parquet
+
+    def _cache_path(self, symbol):
+        return os.path.join(self.data_dir, f"{symbol.replace('^', '_')}.parquet")
+
+    def _read_cache(self, symbol):
+        path = self._cache_path(symbol)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def _write_cache(self, symbol, df):
+        # Atomic, so an interrupted run never leaves a torn cache and server workers may
+        # refresh a shared VIX file at once
+        write_atomic(self._cache_path(symbol), df.to_parquet)
+
+    def _load_symbols(self, symbols):
+        cached = {s: self._read_cache(s) for s in symbols}
+
+        if self.offline:
+            for s in symbols:
+                if cached[s] is None:
+                    print(f"Offline mode: no cached data for {s}")
+            return {s: df for s, df in cached.items() if df is not None}
+
+        # Group symbols by the date they need data from. After the first run every
+        # symbol shares the same last bar, so this is usually a single request.
+        # Re-fetch the last cached bar too, it may have been a partial (intraday) bar.
+        groups = {}
+        for s in symbols:
+            start = cached[s].index[-1] if cached[s] is not None else pd.Timestamp(self.start_date)
+            groups.setdefault(start, []).append(s)
+
+        result = {}
+        for start, group in groups.items():
+            try:
+                fresh = self.source.download(group, start)
+            except Exception as e:
+                print(f"Error downloading data: {e}")
+                fresh = {}
+
+            for s in group:
+                df = self._append(s, cached[s], fresh.get(s))
+                if df is not None:
+                    result[s] = df
+        return result
+
+    def _append(self, symbol, cached, fresh):
+        if fresh is None or fresh.empty:
+            if cached is None:
+                print(f"No data available for {symbol}")
+            return cached
+
         # Fix MultiIndex columns
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-        if isinstance(vix.columns, pd.MultiIndex):
-            vix.columns = vix.columns.get_level_values(0)
-
-        # Merge VIX
-        df['VIX'] = vix['Close']
-        
-        # 2. Robust Gap Filling (India VIX often has missing data points)
-        df['VIX'] = df['VIX'].ffill().bfill()
-        
-        # Save raw data
-        file_path = os.path.join(self.data_dir, f"{self.ticker}_raw.csv")
-        df.to_csv(file_path)
-        
-        return df[['Close', 'High', 'Low', 'Volume', 'VIX']].copy()
\ No newline at end of file
+        if isinstance(fresh.columns, pd.MultiIndex):
+            fresh.columns = fresh.columns.get_level_values(0)
+
+        if cached is not None:
+            fresh = pd.concat([cached.loc[cached.index < fresh.index[0]], fresh])
+
+        self._write_cache(symbol, fresh)
+        return fresh
@@ -1,52 +1,160 @@
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+from tensorflow.keras.callbacks import EarlyStopping
+from numpy.lib.stride_tricks import sliding_window_view
 import numpy as np
+import json
+import os
+import time
+from src.profiling import stage, _peak_rss_mb
 
 # --- CUSTOM LOSS FUNCTION ---
-# This forces the Neural Network to predict the "edge" (quantile) 
-# instead of the average.
-def quantile_loss(q):
+# Pinball loss forces the Neural Network to predict the "edge" (quantile) instead of
+# the average. One output unit per quantile, losses summed, so a single network
+# learns the whole band (or a fan of quantiles) at once.
+def multi_quantile_loss(quantiles):
+    q = tf.constant(quantiles, dtype=tf.float32)
     def loss(y_true, y_pred):
-        e = y_true - y_pred
-        return tf.reduce_mean(tf.maximum(q * e, (q - 1) * e))
+        e = tf.reshape(tf.cast(y_true, tf.float32), (-1, 1)) - y_pred
+        return tf.reduce_sum(tf.reduce_mean(tf.maximum(q * e, (q - 1) * e), axis=0))
     return loss
 
+# --- LOOKBACK WINDOWS ---
+# Sample i is the `lookback` rows ending at row lookback-1+i, shaped (lookback, features).
+# sliding_window_view returns a strided view of the feature matrix, so a 120-day window
+# costs no more host memory than a 1-day one; rows are only copied batch by batch.
+def make_windows(values, lookback):
+    windows = sliding_window_view(values, lookback, axis=0)   # (samples, features, lookback)
+    return windows.transpose(0, 2, 1)                         # (samples, lookback, features)
+
 class DeepQuantileModel:
-    def __init__(self, input_shape):
-        self.input_shape = input_shape
+    def __init__(self, input_shape, quantiles=(0.05, 0.95)):
+        # input_shape: (lookback, n_features); lookback=1 is the old single-row model
+        self.input_shape = tuple(input_shape)
+        self.lookback = self.input_shape[0]
+        self.quantiles = sorted(quantiles)
         self.model = None
+        # Feature scaling, fit on the training split only
+        self.mean = None
+        self.scale = None
+        self.train_report = None
+        self._serve = None
 
-    def build_model(self, quantile):
+    def build_model(self):
         model = Sequential([
             Input(shape=self.input_shape),
             # LSTM Layer: Learn patterns over time
             LSTM(64, return_sequences=False),
             Dropout(0.2),
-            Dense(1)
+            Dense(len(self.quantiles))
         ])
-        model.compile(optimizer='adam', loss=quantile_loss(quantile))
+        model.compile(optimizer='adam', loss=multi_quantile_loss(self.quantiles))
         return model
 
-    def train(self, X_train, y_train, epochs=20, batch_size=32):
-        # We need to reshape data for LSTM: [Samples, TimeSteps, Features]
-        X_reshaped = X_train.values.reshape((X_train.shape[0], 1, X_train.shape[1]))
-        
-        # Train Lower Bound (Bear)
-        self.model_low = self.build_model(0.05)
-        self.model_low.fit(X_reshaped, y_train, epochs=epochs, batch_size=batch_size, verbose=0)
-        
-        # Train Upper Bound (Bull)
-        self.model_high = self.build_model(0.95)
-        self.model_high.fit(X_reshaped, y_train, epochs=epochs, batch_size=batch_size, verbose=0)
-        
-        return self.model_low, self.model_high
+    def _scaled(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return (X - self.mean) / self.scale
+
+    def _dataset(self, windows, y, batch_size, shuffle):
+        # Batched, prefetched input pipeline over the strided windows. Only the rows of
+        # the current batch are materialized, while the model trains on the previous one.
+        n, lookback, n_features = windows.shape
+
+        def batches():
+            order = np.random.permutation(n) if shuffle else np.arange(n)
+            for start in range(0, n, batch_size):
+                idx = order[start:start + batch_size]
+                yield windows[idx], y[idx]
+
+        signature = (tf.TensorSpec((None, lookback, n_features), tf.float32), tf.TensorSpec((None,), tf.float32))
+        n_batches = -(-n // batch_size)
+        ds = tf.data.Dataset.from_generator(batches, output_signature=signature)
+        return ds.apply(tf.data.experimental.assert_cardinality(n_batches)).prefetch(tf.data.AUTOTUNE)
+
+    def train(self, X_train, y_train, epochs=100, batch_size=32, patience=5, val_fraction=0.1):
+        # X_train: (rows, features) in time order. y_train[i] is the target of row i; the
+        # window ending at row i is used to predict it, so the first lookback-1 rows only
+        # serve as history.
+        X = np.asarray(X_train, dtype=np.float32)
+        self.mean = X.mean(axis=0)
+        self.scale = X.std(axis=0) + 1e-8
+
+        windows = make_windows(self._scaled(X), self.lookback)
+        y = np.asarray(y_train, dtype=np.float32)[self.lookback - 1:]
+
+        # Chronological hold-out for early stopping: the most recent windows
+        n_val = max(1, int(len(y) * val_fraction))
+        train_ds = self._dataset(windows[:-n_val], y[:-n_val], batch_size, shuffle=True)
+        val_ds = self._dataset(windows[-n_val:], y[-n_val:], batch_size, shuffle=False)
+
+        # One network for every quantile (Bear ... Bull)
+        self.model = self.build_model()
+        stop = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        with stage("fit:lstm", rows=len(y)):
+            history = self.model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=[stop], verbose=0)
+        self.train_report = {
+            'lookback': self.lookback,
+            'samples': len(y),
+            'epochs': len(history.history['loss']),
+            'wall_s': time.perf_counter() - wall,
+            'cpu_s': time.process_time() - cpu,
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        r = self.train_report
+        print(f"🧠 LSTM lookback={r['lookback']}: {r['epochs']} epochs, {r['wall_s']:.1f}s wall, "
+              f"{r['cpu_s']:.1f}s CPU, peak RSS {r['peak_rss_mb']:.0f} MB")
+
+        return self.model
+
+    def predict_quantiles(self, X):
+        # X: (rows, features) in time order, including lookback-1 rows of history.
+        # Returns (rows - lookback + 1, n_quantiles), one forecast per complete window,
+        # sorted so quantiles never cross
+        windows = make_windows(self._scaled(X), self.lookback)
+        preds = self.model.predict(self._dataset(windows, np.zeros(len(windows), dtype=np.float32), 1024, shuffle=False), verbose=0)
+        return np.sort(preds, axis=1)
 
     def predict(self, X):
-        # Reshape input to match LSTM expectation
-        X_reshaped = X.values.reshape((X.shape[0], 1, X.shape[1]))
-        
-        pred_low = self.model_low.predict(X_reshaped, verbose=0).flatten()
-        pred_high = self.model_high.predict(X_reshaped, verbose=0).flatten()
-        
-        return pred_low, pred_high
+        # Outermost quantiles as the (lower, upper) band
+        preds = self.predict_quantiles(X)
+        return preds[:, 0], preds[:, -1]
+
+    def predict_windows(self, windows):
+        # Serving fast path: raw windows (n, lookback, features) in, (lower, upper) arrays
+        # out. Calls a tf.function-compiled forward pass directly instead of
+        # model.predict, which sets up a data pipeline on every call.
+        if self._serve is None:
+            spec = tf.TensorSpec((None,) + self.input_shape, tf.float32)
+            self._serve = tf.function(lambda x: self.model(x, training=False), input_signature=[spec])
+        x = self._scaled(np.asarray(windows).reshape((-1,) + self.input_shape))
+        preds = np.sort(self._serve(tf.constant(x)).numpy(), axis=1)
+        return preds[:, 0], preds[:, -1]
+
+    def predict_one(self, window):
+        # The last `lookback` feature rows in, the (lower, upper) band out as floats
+        low, high = self.predict_windows(window)
+        return float(low[0]), float(high[0])
+
+    # --- PERSISTENCE (used by the model registry) ---
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.model.save_weights(os.path.join(path, "lstm.weights.h5"))
+        with open(os.path.join(path, "config.json"), "w") as f:
+            json.dump({'input_shape': list(self.input_shape), 'quantiles': self.quantiles,
+                       'mean': self.mean.tolist(), 'scale': self.scale.tolist()}, f)
+
+    @classmethod
+    def load(cls, path):
+        # Rebuild the architecture and load the trained weights into it
+        with open(os.path.join(path, "config.json")) as f:
+            config = json.load(f)
+        dl = cls(tuple(config['input_shape']), config['quantiles'])
+        dl.mean = np.asarray(config['mean'], dtype=np.float32)
+        dl.scale = np.asarray(config['scale'], dtype=np.float32)
+        dl.model = dl.build_model()
+        dl.model.load_weights(os.path.join(path, "lstm.weights.h5"))
+        return dl
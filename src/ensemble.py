@@ -0,0 +1,307 @@
+import numpy as np
+import copy
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from src.models import QuantileModels
+from src.utils import pinball_loss
+from src.calibration import ConformalCalibrator
+from src.profiling import stage
+
+# --- QUANTILE MODEL INTERFACE ---
+# Every ensemble member forecasts the (lower, upper) quantile band of the target return:
+#   fit(X, y) / fit_horizons(X, {horizon: y})  -> trained member(s)
+#   predict(X, start=0)   -> (lower, upper) for rows X[start:], earlier rows are history
+#   predict_windows(W)    -> serving fast path, W = (n, context + 1, features) raw floats
+#   context               -> rows of history a forecast needs besides its own row
+#   save(path) / load(path)
+# Backends (XGBoost, TensorFlow) are imported on first use, like everywhere else.
+
+class QuantileMember:
+    name = None
+    context = 0
+
+    def __init__(self, confidence=0.90, n_jobs=1):
+        self.confidence = confidence
+        self.alpha_lower = (1 - confidence) / 2
+        self.alpha_upper = 1 - self.alpha_lower
+        self.n_jobs = n_jobs
+
+    def fit_horizons(self, X, targets):
+        # Default: an independent fit per horizon. Members that can share work across
+        # horizons (binned features) override this.
+        fitted = {}
+        for h, y in targets.items():
+            member = copy.copy(self)
+            member.fit(X, y)
+            fitted[h] = member
+        return fitted
+
+class LightGBMMember(QuantileMember):
+    name = "lightgbm"
+
+    def fit(self, X, y):
+        self.qm = QuantileModels(self.alpha_lower, self.alpha_upper, n_jobs=self.n_jobs)
+        self.qm.train_lgbm(X, y)
+        return self
+
+    def fit_horizons(self, X, targets):
+        # One binned lgb.Dataset for every horizon (QuantileModels.train_multi_horizon)
+        qm = QuantileModels(self.alpha_lower, self.alpha_upper, n_jobs=self.n_jobs)
+        fitted = {}
+        for h, model in qm.train_multi_horizon(X, targets).items():
+            fitted[h] = copy.copy(self)
+            fitted[h].qm = model
+        return fitted
+
+    def predict(self, X, start=0):
+        return self.qm.predict(np.asarray(X, dtype=np.float64)[start:])
+
+    def predict_windows(self, windows):
+        return self.qm.predict_fast(np.asarray(windows)[:, -1])
+
+    def save(self, path):
+        self.qm.save(path)
+
+    @classmethod
+    def load(cls, path, confidence, **kwargs):
+        member = cls(confidence)
+        member.qm = QuantileModels.load(path)
+        return member
+
+class XGBoostMember(QuantileMember):
+    # XGBoost >= 2.0 fits several quantiles in one model (reg:quantileerror)
+    name = "xgboost"
+
+    def _params(self):
+        return {
+            'objective': 'reg:quantileerror',
+            'quantile_alpha': np.array([self.alpha_lower, self.alpha_upper]),
+            'tree_method': 'hist',
+            'learning_rate': 0.1,
+            'max_depth': 6,
+            'nthread': self.n_jobs,
+        }
+
+    def fit(self, X, y):
+        return self.fit_horizons(X, {0: y})[0]
+
+    def fit_horizons(self, X, targets):
+        # Quantize the features once (QuantileDMatrix), swap the label per horizon
+        import xgboost as xgb
+        horizons = list(targets)
+        with stage("bin:xgboost", rows=len(X)):
+            dtrain = xgb.QuantileDMatrix(np.asarray(X, dtype=np.float64), label=np.asarray(targets[horizons[0]]))
+        fitted = {}
+        for h in horizons:
+            dtrain.set_label(np.asarray(targets[h]))
+            member = self if len(horizons) == 1 else copy.copy(self)
+            with stage("fit:xgboost", rows=len(X)):
+                member.booster = xgb.train(self._params(), dtrain, num_boost_round=100)
+            fitted[h] = member
+        return fitted
+
+    def _predict_rows(self, X):
+        preds = np.sort(self.booster.inplace_predict(np.asarray(X, dtype=np.float64)).reshape(len(X), -1), axis=1)
+        return preds[:, 0], preds[:, -1]
+
+    def predict(self, X, start=0):
+        return self._predict_rows(np.asarray(X, dtype=np.float64)[start:])
+
+    def predict_windows(self, windows):
+        return self._predict_rows(np.asarray(windows)[:, -1])
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.booster.save_model(os.path.join(path, "xgboost.json"))
+
+    @classmethod
+    def load(cls, path, confidence, **kwargs):
+        import xgboost as xgb
+        member = cls(confidence)
+        member.booster = xgb.Booster(model_file=os.path.join(path, "xgboost.json"))
+        return member
+
+class LSTMMember(QuantileMember):
+    name = "lstm"
+
+    def __init__(self, confidence=0.90, n_jobs=1, lookback=60):
+        super().__init__(confidence, n_jobs)
+        self.lookback = lookback
+        self.context = lookback - 1
+
+    def fit(self, X, y):
+        from src.deep_models import DeepQuantileModel
+        X = np.asarray(X, dtype=np.float64)
+        self.dl = DeepQuantileModel(input_shape=(self.lookback, X.shape[1]), quantiles=(self.alpha_lower, self.alpha_upper))
+        self.dl.train(X, y)
+        return self
+
+    def predict(self, X, start=0):
+        # Rows without `lookback` rows of history (at the very start of X) are NaN
+        X = np.asarray(X, dtype=np.float64)
+        first = max(start - self.context, 0)
+        low = np.full(len(X) - start, np.nan)
+        high = np.full(len(X) - start, np.nan)
+        if len(X) - first >= self.lookback:
+            p_low, p_high = self.dl.predict(X[first:])
+            low[len(low) - len(p_low):] = p_low
+            high[len(high) - len(p_high):] = p_high
+        return low, high
+
+    def predict_windows(self, windows):
+        return self.dl.predict_windows(np.asarray(windows)[:, -self.lookback:])
+
+    def save(self, path):
+        self.dl.save(path)
+
+    @classmethod
+    def load(cls, path, confidence, lookback=60, **kwargs):
+        from src.deep_models import DeepQuantileModel
+        member = cls(confidence, lookback=lookback)
+        member.dl = DeepQuantileModel.load(path)
+        return member
+
+MEMBERS = {cls.name: cls for cls in (LightGBMMember, XGBoostMember, LSTMMember)}
+
+# --- WEIGHTED ENSEMBLE ---
+
+class Ensemble:
+    # Any combination of MEMBERS behind the same interface as a single member.
+    # * Members train concurrently in threads on the same feature matrix (LightGBM,
+    #   XGBoost and TensorFlow all release the GIL while fitting), each with an even
+    #   share of the n_jobs threads.
+    # * Weights are learned per quantile from out-of-sample pinball loss: members are
+    #   first fitted on the oldest (1 - val_fraction) of the training rows and scored
+    #   on the rest, weight = 1 / loss (normalized), then refitted on all rows.
+    #   The last max(horizon) rows before the validation block are purged from that
+    #   first fit: their targets are returns over the validation bars.
+    #   A single member gets weight 1.
+    # * The same out-of-sample band gives calibration_scores: the conformal scores
+    #   (src/calibration.py) of the validation rows whose outcome is known by the end of
+    #   the training rows. They seed the calibrator, so the first test bars of a backtest
+    #   are calibrated too, not only those after the first `horizon` misses are in.
+    def __init__(self, members=("lightgbm",), confidence=0.90, n_jobs=1, val_fraction=0.2, lookback=60):
+        self.member_names = list(members)
+        self.confidence = confidence
+        self.n_jobs = n_jobs
+        self.val_fraction = val_fraction
+        self.lookback = lookback
+        self.members = None
+        self.weights = None # (n_members, 2): lower / upper quantile
+        self.calibration_scores = np.empty(0)
+
+    @property
+    def context(self):
+        return max(m.context for m in self.members)
+
+    def key_params(self):
+        # What identifies this configuration in the model registry
+        params = {'members': self.member_names}
+        if "lstm" in self.member_names:
+            params['lookback'] = self.lookback
+        return params
+
+    def _new_member(self, name):
+        n_jobs = max(1, self.n_jobs // len(self.member_names))
+        if name == "lstm":
+            return LSTMMember(self.confidence, n_jobs, lookback=self.lookback)
+        return MEMBERS[name](self.confidence, n_jobs)
+
+    def _fit_all(self, X, targets):
+        # [{horizon: member}] in member_names order, trained concurrently
+        members = [self._new_member(name) for name in self.member_names]
+        if len(members) == 1:
+            return [members[0].fit_horizons(X, targets)]
+        with ThreadPoolExecutor(max_workers=len(members)) as pool:
+            return list(pool.map(lambda m: m.fit_horizons(X, targets), members))
+
+    def fit(self, X, y):
+        fitted = self.fit_horizons(X, {0: y})[0]
+        self.members, self.weights = fitted.members, fitted.weights
+        self.calibration_scores = fitted.calibration_scores
+        return self
+
+    def fit_horizons(self, X, targets):
+        # targets: {horizon: y} aligned with X, y[t] the return over bars t..t+horizon
+        # (fit() passes horizon 0: no overlap). Returns {horizon: Ensemble}.
+        X = np.asarray(X, dtype=np.float64)
+        targets = {h: np.asarray(y, dtype=np.float64) for h, y in targets.items()}
+        n_members = len(self.member_names)
+
+        # 1. Out-of-sample band on the most recent training rows: weights from its
+        #    pinball loss, calibration scores from its misses
+        split = int(len(X) * (1 - self.val_fraction))
+        train_end = split - max(max(targets), 0)
+        trial = self._fit_all(X[:train_end], {h: y[:train_end] for h, y in targets.items()})
+        weights, scores = {}, {}
+        for h, y in targets.items():
+            preds = np.array([m[h].predict(X, start=split) for m in trial]) # (members, 2, rows)
+            # Score on rows every member can forecast (LSTM needs history)
+            valid = np.isfinite(preds).all(axis=(0, 1))
+            loss = np.array([[pinball_loss(y[split:][valid], p[k][valid], q)
+                              for k, q in enumerate((m[h].alpha_lower, m[h].alpha_upper))]
+                             for p, m in zip(preds, trial)])
+            weights[h] = 1 / np.maximum(loss, 1e-12) if n_members > 1 else np.ones((n_members, 2))
+
+            # Conformal scores of the combined band, up to the last row whose target
+            # ends inside the training rows
+            known = np.arange(split, len(X)) < len(X) - max(h, 0)
+            trial_ens = copy.copy(self)
+            trial_ens.weights = weights[h] / weights[h].sum(axis=0)
+            low, high = trial_ens._combine(preds)
+            scores[h] = ConformalCalibrator.score(y[split:], low, high)[valid & known]
+
+        # 2. Final fit on every training row
+        final = self._fit_all(X, targets)
+
+        result = {}
+        for h in targets:
+            ens = copy.copy(self)
+            ens.members = [m[h] for m in final]
+            ens.weights = weights[h] / weights[h].sum(axis=0)
+            ens.calibration_scores = scores[h]
+            result[h] = ens
+        return result
+
+    def _combine(self, preds):
+        # preds: (members, 2, rows). Weighted mean per quantile; members without a
+        # forecast for a row (NaN) are left out and the others re-weighted.
+        w = self.weights[:, :, None] * np.isfinite(preds)
+        combined = np.nansum(preds * w, axis=0) / w.sum(axis=0)
+        # Quantiles never cross
+        return np.minimum(combined[0], combined[1]), np.maximum(combined[0], combined[1])
+
+    def predict(self, X, start=0):
+        with stage("predict", rows=len(X) - start):
+            return self._combine(np.array([m.predict(X, start=start) for m in self.members]))
+
+    def predict_windows(self, windows):
+        return self._combine(np.array([m.predict_windows(windows) for m in self.members]))
+
+    def predict_one(self, window):
+        # The last context + 1 feature rows in, the (lower, upper) band out as floats
+        low, high = self.predict_windows(np.asarray(window)[None])
+        return float(low[0]), float(high[0])
+
+    # --- PERSISTENCE (used by the model registry) ---
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for i, member in enumerate(self.members):
+            member.save(os.path.join(path, f"{i}_{member.name}"))
+        with open(os.path.join(path, "ensemble.json"), "w") as f:
+            json.dump({'members': self.member_names, 'confidence': self.confidence,
+                       'lookback': self.lookback, 'weights': self.weights.tolist(),
+                       'calibration_scores': self.calibration_scores.tolist()}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "ensemble.json")) as f:
+            config = json.load(f)
+        ens = cls(config['members'], config['confidence'], lookback=config['lookback'])
+        ens.weights = np.asarray(config['weights'])
+        ens.calibration_scores = np.asarray(config.get('calibration_scores', []), dtype=np.float64)
+        ens.members = [MEMBERS[name].load(os.path.join(path, f"{i}_{name}"), config['confidence'], lookback=config['lookback'])
+                       for i, name in enumerate(config['members'])]
+        return ens
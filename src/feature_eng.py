@@ -1,40 +1,276 @@
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
+from src.indicators import compute_features, IndicatorState
+from src.profiling import stage
+
+# ATR / Bollinger settings shared by the batch engines and the streaming state
+INDICATORS = {'atr_length': 14, 'bb_length': 20, 'bb_std': 2.0}
+
+# Prices and Volume stay float64, everything else is float32. float32 keeps about 7
+# significant digits: cents are lost on prices above ~100,000 (and the dashboards and
+# the strategy's P&L use these prices), share counts above 2^24 are rounded.
+FLOAT64_COLUMNS = ('Close', 'High', 'Low', 'Volume')
+
+def column_dtype(name):
+    return np.float64 if name in FLOAT64_COLUMNS else np.float32
+
+def target_column(horizon_days):
+    # Column name of one horizon's target in multi-horizon mode
+    return f"Target_Return_{horizon_days}"
+
+class TickerFrame:
+    # One ticker's dataset for the nightly pipeline, without the pandas overhead:
+    # contiguous float32 column arrays (prices and Volume float64, see column_dtype) on
+    # a shared date index. Built by PanelFeatureEngineer.to_tickers, where the columns
+    # are views into the panel (no per-ticker copies), and sliced with views all the
+    # way down: the feature matrix handed to the models is the only copy. NaN means "not known yet"
+    # (the tail of each Target_Return_{h}); `valid` is the rows where everything is.
+    __slots__ = ('dates', 'columns')
+
+    def __init__(self, dates, columns):
+        self.dates = pd.DatetimeIndex(dates)
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df):
+        # FeatureEngineer output (a DataFrame) -> TickerFrame, e.g. for the server
+        return cls(df.index, {name: np.ascontiguousarray(df[name].to_numpy(dtype=column_dtype(name))) for name in df.columns})
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def valid(self):
+        keep = np.ones(len(self.dates), dtype=bool)
+        for values in self.columns.values():
+            keep &= ~np.isnan(values)
+        return keep
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    def known(self, name):
+        # Rows where `name` is known: targets are only missing at the end, so it is a prefix
+        missing = np.flatnonzero(np.isnan(self.columns[name]))
+        return int(missing[0]) if len(missing) else len(self.dates)
+
+    def head(self, n):
+        return TickerFrame(self.dates[:n], {name: values[:n] for name, values in self.columns.items()})
+
+    def matrix(self, names, start=0, stop=None):
+        # (rows x len(names)) float32 model input
+        columns = [self.columns[name][start:stop] for name in names]
+        out = np.empty((len(columns[0]), len(columns)), dtype=np.float32)
+        for i, values in enumerate(columns):
+            out[:, i] = values
+        return out
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns, index=self.dates, copy=False)
 
 class FeatureEngineer:
     def __init__(self, dataframe):
-        self.df = dataframe.copy()
+        # Not copied: add_technical_indicators builds the one new frame
+        self.df = dataframe
 
     def add_technical_indicators(self):
-        # 1. ATR (Volatility)
-        self.df['ATR'] = ta.atr(self.df['High'], self.df['Low'], self.df['Close'], length=14)
-        
-        # 2. Bollinger Bands (Robust Column Handling)
-        bb = ta.bbands(self.df['Close'], length=20, std=2)
-        
-        if bb is not None and not bb.empty:
-            # Dynamically find Upper/Lower columns to avoid KeyErrors
-            upper_col = [c for c in bb.columns if c.startswith('BBU')][0]
-            lower_col = [c for c in bb.columns if c.startswith('BBL')][0]
-            
-            self.df['BB_Upper'] = bb[upper_col]
-            self.df['BB_Lower'] = bb[lower_col]
-            self.df['BB_Width'] = (self.df['BB_Upper'] - self.df['BB_Lower']) / self.df['Close']
-        else:
-            self.df['BB_Upper'] = self.df['Close']
-            self.df['BB_Lower'] = self.df['Close']
-            self.df['BB_Width'] = 0
-            
-        # 3. Returns
-        self.df['Return'] = self.df['Close'].pct_change()
-        self.df['Log_Return'] = np.log(self.df['Close'] / self.df['Close'].shift(1))
-        
-        self.df.dropna(inplace=True)
+        # ATR (Volatility), Bollinger Band Width and Returns from the NumPy kernels
+        # in src/indicators.py (same values as pandas_ta's atr/bbands defaults).
+        # The result is float32 (prices and Volume float64) and only keeps the rows
+        # without NaNs (one copy, no dropna).
+        with stage("indicators", rows=len(self.df)):
+            # The kernels compute in float64, exactly like PanelFeatureEngineer
+            columns = {name: self.df[name].to_numpy(dtype=column_dtype(name)) for name in self.df.columns}
+            high, low, close = (columns[name].astype(np.float64) for name in ('High', 'Low', 'Close'))
+            columns.update(compute_features(high, low, close, **INDICATORS))
+            keep = np.ones(len(self.df), dtype=bool)
+            for values in columns.values():
+                keep &= ~np.isnan(values)
+            self.df = pd.DataFrame({name: np.asarray(values[keep], dtype=column_dtype(name)) for name, values in columns.items()},
+                                   index=self.df.index[keep], copy=False)
         return self.df
 
     def create_targets(self, horizon_days):
         # FORECAST TARGET: Percent Return over the horizon
         # (Forecasting raw prices fails because trees cannot extrapolate to new highs)
-        self.df['Target_Return'] = self.df['Close'].pct_change(periods=horizon_days).shift(-horizon_days)
-        return self.df.dropna()
+        # New columns go on a new frame (assign), never on the caller's DataFrame.
+        with stage("targets", rows=len(self.df)):
+            close = self.df['Close']
+            if isinstance(horizon_days, (list, tuple)):
+                # Multi-horizon: one Target_Return_{h} column each, from the same features.
+                # Each horizon has its own NaN tail, so rows are kept; drop per horizon.
+                self.df = self.df.assign(**{target_column(h): close.pct_change(periods=h).shift(-h).astype(np.float32)
+                                            for h in horizon_days})
+                return self.df
+            self.df = self.df.assign(Target_Return=close.pct_change(periods=horizon_days).shift(-horizon_days).astype(np.float32))
+            return self.df.dropna()
+
+class PanelFeatureEngineer:
+    # FeatureEngineer for a whole universe at once: every field is a (bars x tickers)
+    # float32 array (prices and Volume float64) and each indicator is a single
+    # vectorized pass over all columns.
+    #
+    # Ragged histories (late listings, different exchange holidays) are handled by
+    # "packing": column j holds ticker j's own bars at the top, in date order, with NaN
+    # below (rows[i, j] is the position of its bar i in `dates`). The kernels run on
+    # that block directly and give exactly the per-ticker result. Arrays are Fortran-
+    # ordered, so a ticker's column is contiguous and to_tickers hands out views.
+    FIELDS = ['Close', 'High', 'Low', 'Volume', 'VIX']
+
+    def __init__(self, dates, tickers, fields):
+        # fields: {name: (dates x tickers) array}, NaN where a ticker has no bar
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+
+        # A bar exists for a ticker when all its base fields are present
+        valid = np.ones((len(self.dates), len(self.tickers)), dtype=bool)
+        for name in self.FIELDS:
+            valid &= np.isfinite(fields[name])
+        self.lengths = valid.sum(axis=0)
+        self.rows = np.argsort(~valid, axis=0, kind='stable').astype(np.int32)
+        self.filled = np.arange(len(self.dates))[:, None] < self.lengths
+        del valid
+        self.data = {name: self._store(np.take_along_axis(np.asarray(fields[name]), self.rows, axis=0), name)
+                     for name in self.FIELDS}
+
+    @classmethod
+    def from_frames(cls, frames):
+        # {ticker: DataFrame} as returned by DataLoader.fetch_many, aligned on the union
+        # of dates. Filled straight into arrays of each field's column_dtype.
+        tickers = list(frames)
+        dates = frames[tickers[0]].index
+        for t in tickers[1:]:
+            dates = dates.union(frames[t].index)
+        positions = [dates.get_indexer(frames[t].index) for t in tickers]
+        fields = {}
+        for name in cls.FIELDS:
+            wide = np.full((len(dates), len(tickers)), np.nan, dtype=column_dtype(name))
+            for j, t in enumerate(tickers):
+                wide[positions[j], j] = frames[t][name].to_numpy()
+            fields[name] = wide
+        return cls(dates, tickers, fields)
+
+    def _store(self, packed, name):
+        out = np.asfortranarray(packed, dtype=column_dtype(name))
+        out[~self.filled] = np.nan
+        return out
+
+    def add_technical_indicators(self):
+        # The kernels work in float64, like FeatureEngineer; results are stored as float32
+        with stage("indicators", rows=int(self.lengths.sum()), ticker="panel"):
+            high, low, close = (self.data[name].astype(np.float64) for name in ('High', 'Low', 'Close'))
+            features = compute_features(high, low, close, **INDICATORS)
+            del high, low, close
+            # Unrounded ATR at each ticker's last bar, for states()
+            self.last_atr = features['ATR'][np.maximum(self.lengths - 1, 0), np.arange(len(self.tickers))]
+            for name in list(features):
+                self.data[name] = self._store(features.pop(name), name)
+        return self.data
+
+    def create_targets(self, horizon_days):
+        # FORECAST TARGET: Percent Return over the horizon, counted in each ticker's own bars.
+        # A list of horizons gives one Target_Return_{h} column each (see FeatureEngineer).
+        with stage("targets", rows=int(self.lengths.sum()), ticker="panel"):
+            close = self.data['Close']
+            horizons = horizon_days if isinstance(horizon_days, (list, tuple)) else [horizon_days]
+            for h in horizons:
+                target = np.full(close.shape, np.nan, dtype=np.float32, order='F')
+                target[:-h] = close[h:] / close[:-h] - 1
+                name = target_column(h) if isinstance(horizon_days, (list, tuple)) else 'Target_Return'
+                self.data[name] = self._store(target, name)
+        return self.data
+
+    def mask(self):
+        # Rows FeatureEngineer would keep after dropna, per ticker, in the packed layout
+        # (multi-horizon targets keep their NaN tails, like FeatureEngineer)
+        keep = self.filled.copy()
+        for name, values in self.data.items():
+            if not name.startswith('Target_Return_'):
+                keep &= ~np.isnan(values)
+        return keep
+
+    def states(self):
+        # {ticker: IndicatorState} at the end of each ticker's history (after
+        # add_technical_indicators), so extend_dataset can append new bars to its
+        # to_tickers() dataset later. None where that would not match a recompute:
+        # too short a history, or rows dropped inside it (to_tickers copies those).
+        keep = self.mask()
+        close = self.data['Close']
+        warm_up = max(INDICATORS['atr_length'], INDICATORS['bb_length'])
+        states = {}
+        for j, ticker in enumerate(self.tickers):
+            n = int(self.lengths[j])
+            kept = np.flatnonzero(keep[:, j])
+            if n < warm_up or np.isnan(self.last_atr[j]) or not len(kept) or kept[-1] - kept[0] + 1 != len(kept) or kept[-1] != n - 1:
+                states[ticker] = None
+                continue
+            states[ticker] = IndicatorState.resume(close[:n, j], self.last_atr[j:j + 1], **INDICATORS)
+        return states
+
+    def _dates(self, positions):
+        # A ticker's dates: a slice of `dates` (shared, no copy) unless it has gaps
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            return self.dates[positions[0]:positions[-1] + 1]
+        return self.dates[positions]
+
+    def to_tickers(self):
+        # {ticker: TickerFrame} of the rows FeatureEngineer would keep, as views into
+        # this panel. The kept rows are one block (the indicators' warm-up is at the
+        # top, a single-horizon target's tail at the bottom); a ticker with NaNs inside
+        # its history falls back to a copy of just its rows.
+        keep = self.mask()
+        tickers = {}
+        for j, ticker in enumerate(self.tickers):
+            kept = np.flatnonzero(keep[:, j])
+            if not len(kept):
+                rows = slice(0, 0)
+            elif kept[-1] - kept[0] + 1 == len(kept):
+                rows = slice(kept[0], kept[-1] + 1)
+            else:
+                rows = kept
+            columns = {name: values[rows, j] for name, values in self.data.items()}
+            tickers[ticker] = TickerFrame(self._dates(self.rows[rows, j]), columns)
+        return tickers
+
+    def to_frames(self):
+        # Per-ticker DataFrames, identical to FeatureEngineer's output
+        return {ticker: frame.to_frame() for ticker, frame in self.to_tickers().items()}
+
+def extend_dataset(dataset, state, bars, horizons):
+    # The nightly fast path for a ticker whose raw data only gained bars at the end:
+    # appends them to its multi-horizon dataset (PanelFeatureEngineer.to_tickers, same
+    # horizons) instead of recomputing the history. The new bars' indicators come from
+    # the ticker's IndicatorState (O(new bars); advanced in place) and only the targets
+    # the new closes complete are filled in, so the result equals a full recompute.
+    # Returns None when a new bar's indicators are NaN; the caller then recomputes
+    # (and drops the state, which has moved on).
+    fields = {name: bars[name].to_numpy(dtype=column_dtype(name)) for name in PanelFeatureEngineer.FIELDS}
+    valid = np.ones(len(bars), dtype=bool)
+    for values in fields.values():
+        valid &= np.isfinite(values)
+    if not valid.any():
+        return dataset
+    fields = {name: values[valid] for name, values in fields.items()}
+    high, low, close = (fields[name].astype(np.float64) for name in ('High', 'Low', 'Close'))
+    with stage("indicators", rows=len(close)):
+        fields.update(state.update(high, low, close))
+    if any(np.isnan(values).any() for values in fields.values()):
+        return None
+
+    n_old, n = len(dataset), len(dataset) + len(close)
+    targets = {target_column(h): h for h in horizons}
+    columns = {}
+    for name, values in dataset.columns.items():
+        new = fields[name].astype(column_dtype(name)) if name in fields else np.full(n - n_old, np.nan, dtype=np.float32)
+        columns[name] = np.concatenate([values, new])
+    close = columns['Close']
+    for name, h in targets.items():
+        # Rows before n_old - h already had their target; the new closes complete the rest
+        start = max(n_old - h, 0)
+        if n > h:
+            columns[name][start:n - h] = close[start + h:] / close[start:n - h] - 1
+    return TickerFrame(dataset.dates.append(bars.index[valid]), columns)
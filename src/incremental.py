@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from src.feature_eng import TickerFrame
+from src.utils import write_atomic
+
+# --- INCREMENTAL NIGHTLY RUN ---
+# Every stage of main.py (raw data -> features -> models -> backtest -> dashboard)
+# fingerprints its inputs and config per ticker. The fingerprints of the last run live
+# in {root}/manifest.json and the stage outputs in {root}/{stage}/{ticker}.pkl:
+# a stage whose fingerprint matches is skipped and its output reused, otherwise it
+# reruns and its new output is stored. Downstream fingerprints cover the upstream
+# outputs, so one new bar only reruns what actually depends on it.
+# Raw data is already incremental (data_loader only downloads bars after the cached ones).
+# Features go one step further: when the raw data only gained bars at the end, the
+# stored dataset is extended from its saved indicator state instead of recomputed
+# (main.build_datasets, feature_eng.extend_dataset).
+# Models are the exception: they are already cached in the model registry, which
+# checks the same kind of fingerprint itself (ModelRegistry.get/put).
+
+def fingerprint(*parts):
+    # Short content hash of DataFrames / Series / TickerFrames / arrays / JSON-able config
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, TickerFrame):
+            h.update(part.dates.asi8.tobytes())
+            for name, values in part.columns.items():
+                h.update(name.encode())
+                h.update(np.ascontiguousarray(values).tobytes())
+        elif isinstance(part, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            names = list(part.columns) if isinstance(part, pd.DataFrame) else [part.name]
+            h.update(json.dumps(names, default=str).encode())
+        elif isinstance(part, np.ndarray):
+            h.update(f"{part.dtype}{part.shape}".encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+def source_fingerprint(*paths):
+    # Code is an input too: editing a stage's module reruns that stage
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha1()
+    for path in paths:
+        with open(os.path.join(root, path), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+class StageCache:
+    # refresh=True recomputes every stage (nothing is reused) but still records the outputs
+    def __init__(self, root="cache", refresh=False):
+        self.root = root
+        self.refresh = refresh
+        self.path = os.path.join(root, "manifest.json")
+        try:
+            with open(self.path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.counts = {} # stage -> {outcome: count}, for the run summary
+
+    def _file(self, stage, key):
+        return os.path.join(self.root, stage, f"{key.replace('^', '_')}.pkl")
+
+    def count(self, stage, outcome):
+        # outcome: "reused" / "recomputed" / "extended" (get and fresh count themselves)
+        counts = self.counts.setdefault(stage, {"reused": 0, "recomputed": 0})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    def fresh(self, stage, key, digest):
+        # True if the stage ran on exactly these inputs last time
+        reused = not self.refresh and self.manifest.get(stage, {}).get(key) == digest
+        self.count(stage, "reused" if reused else "recomputed")
+        return reused
+
+    def get(self, stage, key, digest):
+        # The stored output, or None if the inputs changed (or it cannot be read)
+        previous = self.previous(stage, key)
+        if previous is not None and previous[0] == digest:
+            self.count(stage, "reused")
+            return previous[1]
+        self.count(stage, "recomputed")
+        return None
+
+    def previous(self, stage, key):
+        # (digest, output) of the last run whatever the inputs are now, or None: for a
+        # stage that can extend its old output. Not counted, the caller does.
+        digest = self.manifest.get(stage, {}).get(key)
+        if self.refresh or digest is None:
+            return None
+        try:
+            with open(self._file(stage, key), "rb") as f:
+                return digest, pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def put(self, stage, key, digest, value=None):
+        # value=None: the stage writes its own output (e.g. the dashboard), only record the digest
+        if value is not None:
+            path = self._file(stage, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        self.manifest.setdefault(stage, {})[key] = digest
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        write_atomic(self.path, json.dumps(self.manifest, indent=1, sort_keys=True))
+
+    def summary(self):
+        return ", ".join(f"{stage} " + " / ".join(f"{n} {outcome}" for outcome, n in counts.items())
+                         for stage, counts in self.counts.items())
@@ -0,0 +1,171 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.accel import njit, HAS_NUMBA
+
+# --- VECTORIZED INDICATOR KERNELS ---
+# Plain float64 arrays in, float64 arrays out. Every function works on a single
+# series (n_bars,) or on a panel (n_bars, n_tickers), always along axis 0.
+# Leading NaNs (e.g. a ticker that listed later) are handled per column.
+# Results match pandas_ta's defaults (ATR: Wilder/RMA seeded with an SMA,
+# Bollinger: SMA +/- 2 sample std) to floating-point precision.
+
+def true_range(high, low, close, prev_close=None):
+    # prev_close: close before the first bar (streaming updates), NaN if unknown
+    if prev_close is None:
+        prev_close = np.full(close[:1].shape, np.nan)
+    prev_close = np.concatenate([prev_close, close[:-1]])
+    # fmax ignores the missing previous close on a ticker's first bar
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(prev_close - low))
+
+@njit(cache=True)
+def _wilder_kernel(tr, length, seed, out):
+    # tr/out: (n_bars, n_cols). seed: per-column smoothed value carried in from
+    # earlier bars, NaN = start fresh (SMA of the first `length` valid bars).
+    alpha = 1.0 / length
+    n, k = tr.shape
+    for j in range(k):
+        value = seed[j]
+        count = 0
+        total = 0.0
+        for i in range(n):
+            x = tr[i, j]
+            if np.isnan(x):
+                out[i, j] = np.nan
+                continue
+            if np.isnan(value):
+                # Warm-up: seed with the simple average of the first `length` values
+                total += x
+                count += 1
+                if count == length:
+                    value = total / length
+                    out[i, j] = value
+                else:
+                    out[i, j] = np.nan
+            else:
+                value = (1.0 - alpha) * value + alpha * x
+                out[i, j] = value
+    return out
+
+def wilder_smooth(values, length, seed=None):
+    values = np.asarray(values, dtype=np.float64)
+    is_1d = values.ndim == 1
+    tr = values.reshape(len(values), -1)
+    if seed is None:
+        seed = np.full(tr.shape[1], np.nan)
+    out = _wilder_kernel(np.ascontiguousarray(tr), length, np.asarray(seed, dtype=np.float64).reshape(-1),
+                         np.empty_like(tr))
+    return out[:, 0] if is_1d else out
+
+def atr(high, low, close, length=14):
+    return wilder_smooth(true_range(high, low, close), length)
+
+@njit(cache=True)
+def _rolling_std_kernel(x, length, ddof, out):
+    # Two-pass (mean, then squared deviations) per window, without temporaries.
+    # Loops run across columns innermost so the (n_bars, n_cols) array is read in order.
+    n, k = x.shape
+    mean = np.empty(k)
+    sq = np.empty(k)
+    for i in range(length - 1, n):
+        mean[:] = 0.0
+        sq[:] = 0.0
+        for w in range(i - length + 1, i + 1):
+            for j in range(k):
+                mean[j] += x[w, j]
+        for j in range(k):
+            mean[j] /= length
+        for w in range(i - length + 1, i + 1):
+            for j in range(k):
+                d = x[w, j] - mean[j]
+                sq[j] += d * d
+        for j in range(k):
+            out[i, j] = np.sqrt(sq[j] / (length - ddof))
+    return out
+
+def rolling_std(values, length, ddof=1):
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if len(values) < length:
+        return out
+    # NaN anywhere in a window gives NaN (pandas min_periods=length)
+    if HAS_NUMBA:
+        x = np.ascontiguousarray(values.reshape(len(values), -1))
+        return _rolling_std_kernel(x, length, ddof, out.reshape(x.shape)).reshape(values.shape)
+    # Zero-copy windows; fine for single series, memory-hungry for large panels
+    windows = sliding_window_view(values, length, axis=0)
+    out[length - 1:] = windows.std(axis=-1, ddof=ddof)
+    return out
+
+def bollinger_width(close, length=20, n_std=2.0):
+    # (Upper - Lower) / Close, where Upper/Lower = SMA +/- n_std * std.
+    # The SMA cancels out, so only the rolling std is needed.
+    return (2 * n_std * rolling_std(close, length)) / close
+
+def simple_returns(close):
+    out = np.empty_like(close)
+    out[:1] = np.nan
+    out[1:] = close[1:] / close[:-1] - 1
+    return out
+
+def compute_features(high, low, close, atr_length=14, bb_length=20, bb_std=2.0):
+    return {
+        'ATR': atr(high, low, close, atr_length),
+        'BB_Width': bollinger_width(close, bb_length, bb_std),
+        'Return': simple_returns(close),
+    }
+
+# --- STREAMING STATE ---
+
+class IndicatorState:
+    # Keeps the rolling state needed to extend the indicators with new bars, so a daily
+    # append costs O(new bars) instead of recomputing the full history:
+    #   * last close (True Range, Return)
+    #   * current ATR value
+    #   * last bb_length-1 closes (Bollinger window)
+    # Works for one series or a panel of tickers (columns), like the kernels above.
+    def __init__(self, atr_length=14, bb_length=20, bb_std=2.0):
+        self.atr_length = atr_length
+        self.bb_length = bb_length
+        self.bb_std = bb_std
+        self.last_close = None
+        self.atr = None
+        self.close_window = None
+
+    @classmethod
+    def resume(cls, close, last_atr, atr_length=14, bb_length=20, bb_std=2.0):
+        # The state at the end of a history whose indicators were computed elsewhere
+        # (a panel pass): its closes (at least bb_length-1 bars) and its last ATR value
+        state = cls(atr_length, bb_length, bb_std)
+        close = np.asarray(close, dtype=np.float64)
+        state.last_close = close[-1:]
+        state.atr = np.asarray(last_atr, dtype=np.float64)[-1:]
+        state.close_window = close[-(bb_length - 1):]
+        return state
+
+    def fit(self, high, low, close):
+        # Full computation over the history, then remember the state at its end
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+        if len(close) < max(self.atr_length, self.bb_length):
+            raise ValueError(f"Need at least {max(self.atr_length, self.bb_length)} bars to warm up the indicators")
+        features = compute_features(high, low, close, self.atr_length, self.bb_length, self.bb_std)
+        self.last_close = close[-1:]
+        self.atr = features['ATR'][-1:]
+        self.close_window = close[-(self.bb_length - 1):]
+        return features
+
+    def update(self, high, low, close):
+        # Indicators for the new bars only
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+
+        tr = true_range(high, low, close, prev_close=self.last_close)
+        new_atr = wilder_smooth(tr, self.atr_length, seed=self.atr)
+
+        window = np.concatenate([self.close_window, close])
+        width = bollinger_width(window, self.bb_length, self.bb_std)[-len(close):]
+
+        returns = close / np.concatenate([self.last_close, close[:-1]]) - 1
+
+        self.last_close = close[-1:]
+        self.atr = new_atr[-1:]
+        self.close_window = window[-(self.bb_length - 1):]
+        return {'ATR': new_atr, 'BB_Width': width, 'Return': returns}
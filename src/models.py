@@ -1,29 +1,164 @@
 import numpy as np
 import lightgbm as lgb
+from src.predictor import CompiledForest
+from src.profiling import stage
 import warnings
+import json
+import os
 
 # Suppress warnings
 warnings.filterwarnings('ignore', category=UserWarning)
 
 class QuantileModels:
-    def __init__(self, alpha_lower=0.05, alpha_upper=0.95):
+    def __init__(self, alpha_lower=0.05, alpha_upper=0.95, n_jobs=1):
         self.alpha_lower = alpha_lower
         self.alpha_upper = alpha_upper
+        # LightGBM threads per fit. The parallel driver in main.py sets this from
+        # the cores left over per pool worker.
+        self.n_jobs = n_jobs
+        self._forest = None # Compiled copy of the boosters for predict_one
 
-    def train_lgbm(self, X, y):
+    def _params(self, alpha):
         # Parameters for stability
-        params = {
-            'n_jobs': 1, 
+        return {
+            'objective': 'quantile',
+            'alpha': alpha,
+            'num_threads': self.n_jobs,
             'verbose': -1,
             'force_col_wise': True
         }
-        
-        # Lower Bound Model (5th Percentile)
-        m_low = lgb.LGBMRegressor(objective='quantile', alpha=self.alpha_lower, n_estimators=100, **params)
-        m_low.fit(X, y)
-        
-        # Upper Bound Model (95th Percentile)
-        m_high = lgb.LGBMRegressor(objective='quantile', alpha=self.alpha_upper, n_estimators=100, **params)
-        m_high.fit(X, y)
-        
-        return m_low, m_high
\ No newline at end of file
+
+    def _fit_quantiles(self, X, y, quantiles, n_estimators=100):
+        # Bin the features once and fit every quantile against the same Dataset,
+        # instead of each LGBMRegressor.fit re-binning the same matrix
+        with stage("bin:lightgbm", rows=len(X)):
+            dataset = lgb.Dataset(X, label=y, params={'verbose': -1}, free_raw_data=False).construct()
+        boosters = []
+        for q in quantiles:
+            with stage("fit:lightgbm", rows=len(X)):
+                boosters.append(lgb.train(self._params(q), dataset, num_boost_round=n_estimators))
+        return boosters
+
+    def train_lgbm(self, X, y):
+        # Lower Bound Model (5th Percentile) & Upper Bound Model (95th Percentile)
+        self.quantiles = [self.alpha_lower, self.alpha_upper]
+        self.boosters = self._fit_quantiles(X, y, self.quantiles)
+        self._forest = None
+        m_low, m_high = self.boosters
+        return m_low, m_high
+
+    def train_quantiles(self, X, y, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        # Multi-quantile mode, e.g. for fan charts: one shared binned Dataset,
+        # one booster per quantile
+        self.quantiles = sorted(quantiles)
+        self.boosters = self._fit_quantiles(X, y, self.quantiles)
+        self._forest = None
+        return self
+
+    def train_multi_horizon(self, X, targets):
+        # targets: {horizon: y}, all aligned with X. The features are binned once and
+        # every horizon's quantile pair is fitted on that Dataset by swapping the label.
+        # Returns {horizon: QuantileModels}, each usable (and registrable) on its own.
+        self.quantiles = [self.alpha_lower, self.alpha_upper]
+        horizons = list(targets)
+        with stage("bin:lightgbm", rows=len(X)):
+            dataset = lgb.Dataset(X, label=targets[horizons[0]], params={'verbose': -1}, free_raw_data=False).construct()
+
+        models = {}
+        for h in horizons:
+            dataset.set_label(targets[h])
+            qm = QuantileModels(self.alpha_lower, self.alpha_upper, n_jobs=self.n_jobs)
+            qm.quantiles = list(self.quantiles)
+            qm.boosters = []
+            for q in self.quantiles:
+                with stage("fit:lightgbm", rows=len(X)):
+                    qm.boosters.append(lgb.train(self._params(q), dataset, num_boost_round=100))
+            models[h] = qm
+        return models
+
+    def predict_quantiles(self, X):
+        # (n_samples, n_quantiles), sorted along each row so quantiles never cross
+        preds = np.column_stack([b.predict(X) for b in self.boosters])
+        return np.sort(preds, axis=1)
+
+    def predict(self, X):
+        # Outermost quantiles as the (lower, upper) band
+        preds = self.predict_quantiles(X)
+        return preds[:, 0], preds[:, -1]
+
+    def predict_fast(self, X):
+        # Serving fast path for raw float rows (FEATURE_COLS order): every quantile from
+        # one call into the compiled tree evaluator, built on first use.
+        # Returns (lower, upper) arrays, like predict.
+        if self._forest is None:
+            self._forest = CompiledForest(self.boosters)
+        preds = np.sort(self._forest.predict(X), axis=1)
+        return preds[:, 0], preds[:, -1]
+
+    def predict_one(self, x):
+        # Single feature row in, (lower, upper) band out as floats
+        low, high = self.predict_fast(x)
+        return low[0], high[0]
+
+    # --- PERSISTENCE (used by the model registry) ---
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for i, booster in enumerate(self.boosters):
+            booster.save_model(os.path.join(path, f"quantile_{i}.txt"))
+        with open(os.path.join(path, "quantiles.json"), "w") as f:
+            json.dump(self.quantiles, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "quantiles.json")) as f:
+            quantiles = json.load(f)
+        qm = cls(quantiles[0], quantiles[-1])
+        qm.quantiles = quantiles
+        qm.boosters = [lgb.Booster(model_file=os.path.join(path, f"quantile_{i}.txt")) for i in range(len(quantiles))]
+        return qm
+
+    def walk_forward(self, X, y, step=21, min_train=500, gap=0, initial_trees=100, trees_per_step=10):
+        # Expanding-window evaluation: retrain every `step` bars and predict the next block.
+        # Returns out-of-sample (pred_low, pred_high) for every row from min_train onwards.
+        #
+        # Speed tricks:
+        #   * Features are binned once. The first window defines the bin mapper and the
+        #     full matrix reuses it, so each window is just a row subset (no re-binning
+        #     and no look-ahead into future feature ranges).
+        #   * Each step continues the previous model: a few extra trees are fitted on top
+        #     of the running raw score (passed as init_score), instead of a cold refit.
+        #     We keep that score for every row ourselves, so only the new trees are ever
+        #     evaluated - lgb.train(init_model=...) would re-predict the whole ensemble
+        #     on the training rows at every step.
+        # `gap` drops the last rows of each window whose targets reach past the
+        # prediction date (use the forecast horizon).
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n = len(X)
+        if n <= min_train:
+            raise ValueError(f"walk_forward needs more than min_train={min_train} rows to test on, got {n}")
+
+        base = lgb.Dataset(X[:min_train], label=y[:min_train], params={'verbose': -1}, free_raw_data=False).construct()
+        full = lgb.Dataset(X, label=y, reference=base, free_raw_data=False).construct()
+
+        preds = []
+        for alpha in (self.alpha_lower, self.alpha_upper):
+            params = self._params(alpha)
+            score = None # Raw model output for every row, all steps so far
+            oos = np.empty(n - min_train)
+
+            for end in range(min_train, n, step):
+                window = full.subset(np.arange(max(end - gap, 1))).construct()
+                if score is not None:
+                    window.set_init_score(score[:max(end - gap, 1)])
+
+                booster = lgb.train(params, window, num_boost_round=initial_trees if score is None else trees_per_step)
+                new_trees = booster.predict(X)
+                score = new_trees if score is None else score + new_trees
+
+                oos[end - min_train:end - min_train + step] = score[end:end + step]
+
+            preds.append(oos)
+
+        return preds[0], preds[1]
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from src.strategy import mean_reversion_codes, BUY, SELL
+from src.profiling import stage
+
+# --- PORTFOLIO BACKTEST ---
+# The mean-reversion rules of src/strategy.py for the whole watchlist at once, as one
+# portfolio with costs:
+#   * Inputs are aligned (dates x tickers) arrays of price and band, NaN where a ticker
+#     has no bar (align_results builds them from main.py's backtest results).
+#   * Positions come from the same state machine as SignalGenerator, run over every
+#     ticker in one compiled pass: +1 long / -1 short / 0 flat after each bar's close.
+#   * The allocation rule turns positions into weights (fractions of equity), which
+#     earn the next bar's return. Weights are held at their target every bar.
+#   * Every weight change pays fee + slippage, in bps of the traded notional.
+# After the state machine everything is whole-array NumPy, no per-ticker loops.
+
+# Position change caused by each signal code (index = code, see strategy.SIGNAL_NAMES)
+POSITION_DELTA = np.array([0, 1, -1, -1, 1], dtype=np.int8)
+
+def align_results(results, horizon=None):
+    # {ticker: backtest result} from main.run_pipeline -> (dates, tickers, prices, lower,
+    # upper) on the union of dates. horizon picks one of a result's 'horizons'.
+    tickers = list(results)
+    series = [results[t].get('horizons', {}).get(horizon, results[t]) for t in tickers]
+    dates = pd.DatetimeIndex(series[0]['dates'])
+    for res in series[1:]:
+        dates = dates.union(pd.DatetimeIndex(res['dates']))
+
+    arrays = {name: np.full((len(dates), len(tickers)), np.nan) for name in ('actuals', 'lower', 'upper')}
+    for j, res in enumerate(series):
+        rows = dates.get_indexer(pd.DatetimeIndex(res['dates']))
+        for name, values in arrays.items():
+            values[rows, j] = res[name]
+    return dates, tickers, arrays['actuals'], arrays['lower'], arrays['upper']
+
+def _ffill(values):
+    # Forward-fill NaNs down each column (a ticker's gap keeps its last price)
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return np.take_along_axis(values, rows, axis=0)
+
+class PortfolioBacktest:
+    # allocation: "equal"  - every ticker owns a fixed 1/N slot of equity, idle slots are cash
+    #             "active" - equity is split equally between the positions open at the time
+    # Gross exposure is at most max_leverage x equity either way.
+    ALLOCATIONS = ("equal", "active")
+
+    def __init__(self, fee_bps=1.0, slippage_bps=5.0, allocation="equal", max_leverage=1.0, periods_per_year=252):
+        if allocation not in self.ALLOCATIONS:
+            raise ValueError(f"allocation must be one of {self.ALLOCATIONS}")
+        self.cost = (fee_bps + slippage_bps) / 1e4
+        self.allocation = allocation
+        self.max_leverage = max_leverage
+        self.periods_per_year = periods_per_year
+
+    def signals(self, prices, lower, upper):
+        # (tickers x dates) signal codes, one state machine pass per ticker row
+        rows = (np.ascontiguousarray(np.asarray(a, dtype=np.float64).T) for a in (prices, lower, upper))
+        return mean_reversion_codes(*rows)[0]
+
+    def weights(self, positions):
+        if self.allocation == "equal":
+            return positions * (self.max_leverage / positions.shape[1])
+        n_open = np.abs(positions).sum(axis=1, keepdims=True)
+        return positions * (self.max_leverage / np.maximum(n_open, 1))
+
+    def run(self, prices, lower, upper, dates=None):
+        # Returns the per-bar series (equity, returns, drawdown, turnover, exposure) and
+        # the summary metrics, everything as a fraction of starting equity
+        prices = np.asarray(prices, dtype=np.float64)
+        n_bars, n_tickers = prices.shape
+        with stage("portfolio", rows=prices.size, ticker="portfolio"):
+            codes = self.signals(prices, lower, upper)
+            positions = np.cumsum(POSITION_DELTA[codes], axis=1, dtype=np.int8).T
+            weights = self.weights(positions)
+
+            # Weights set at one close earn the next bar's return (no price = no move)
+            filled = _ffill(prices)
+            returns = np.zeros_like(filled)
+            returns[1:] = filled[1:] / filled[:-1] - 1
+            returns[np.isnan(returns)] = 0.0
+            gross = np.zeros(n_bars)
+            gross[1:] = np.einsum('ij,ij->i', weights[:-1], returns[1:])
+
+            # Costs on every weight change, entries and exits alike
+            traded = np.abs(np.diff(weights, axis=0, prepend=0)).sum(axis=1)
+            net = gross - traded * self.cost
+
+            equity = np.cumprod(1 + net)
+            drawdown = equity / np.maximum.accumulate(equity) - 1
+            exposure = np.abs(weights).sum(axis=1)
+
+        years = n_bars / self.periods_per_year
+        std = net.std(ddof=1) if n_bars > 1 else 0.0
+        metrics = {
+            'total_return': float(equity[-1] - 1) if n_bars else 0.0,
+            'cagr': float(equity[-1] ** (1 / years) - 1) if n_bars and equity[-1] > 0 else 0.0,
+            'sharpe': float(net.mean() / std * np.sqrt(self.periods_per_year)) if std > 0 else 0.0,
+            'max_drawdown': float(drawdown.min()) if n_bars else 0.0,
+            'turnover': float(traded.mean() * self.periods_per_year) if n_bars else 0.0, # x equity per year
+            'costs': float((traded * self.cost).sum()),
+            'exposure': float(exposure.mean()) if n_bars else 0.0,
+            'trades': int(np.count_nonzero((codes == BUY) | (codes == SELL))),
+        }
+        return {
+            'dates': dates,
+            'equity': equity,
+            'returns': net,
+            'drawdown': drawdown,
+            'turnover': traded,
+            'exposure': exposure,
+            'metrics': metrics,
+        }
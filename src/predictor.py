@@ -0,0 +1,85 @@
+import numpy as np
+from src.accel import njit
+
+# --- COMPILED TREE EVALUATOR ---
+# Booster.predict has a fixed cost of tens of microseconds per call (argument checks,
+# pandas conversion, thread setup) which dominates when scoring one row. For serving,
+# the trees of every quantile booster are flattened from dump_model() into plain
+# arrays and walked by one small kernel, so a (lower, upper) forecast is a single call.
+#
+# Node encoding (all trees share the arrays): child >= 0 is an internal node index,
+# child < 0 is a leaf, stored at leaf_value[~child].
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+_ZERO_THRESHOLD = 1e-35 # LightGBM's kZeroThreshold
+
+@njit(cache=True)
+def _forest_kernel(X, feature, threshold, left, right, default_left, missing, leaf_value, roots, tree_output, out):
+    for r in range(X.shape[0]):
+        for t in range(len(roots)):
+            node = roots[t]
+            while node >= 0:
+                x = X[r, feature[node]]
+                # Same rules as LightGBM's NumericalDecision
+                if np.isnan(x) and missing[node] != MISSING_NAN:
+                    x = 0.0
+                if (missing[node] == MISSING_ZERO and abs(x) <= _ZERO_THRESHOLD) or \
+                   (missing[node] == MISSING_NAN and np.isnan(x)):
+                    node = left[node] if default_left[node] else right[node]
+                elif x <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            out[r, tree_output[t]] += leaf_value[~node]
+    return out
+
+class CompiledForest:
+    def __init__(self, boosters):
+        # boosters: one lgb.Booster per output column (e.g. lower/upper quantile)
+        feature, threshold, left, right, default_left, missing = [], [], [], [], [], []
+        leaf_value, roots, tree_output = [], [], []
+
+        def add(node):
+            # Depth-first flattening, returns the encoded index of `node`
+            if 'leaf_value' in node:
+                leaf_value.append(node['leaf_value'])
+                return ~(len(leaf_value) - 1)
+            if node['decision_type'] != '<=':
+                raise ValueError(f"Unsupported split type: {node['decision_type']}")
+            i = len(feature)
+            feature.append(node['split_feature'])
+            threshold.append(node['threshold'])
+            default_left.append(node['default_left'])
+            missing.append(_MISSING_TYPES[node['missing_type']])
+            left.append(0)
+            right.append(0)
+            left[i] = add(node['left_child'])
+            right[i] = add(node['right_child'])
+            return i
+
+        for output, booster in enumerate(boosters):
+            dump = booster.dump_model()
+            self.n_features = dump['max_feature_idx'] + 1
+            for tree in dump['tree_info']:
+                roots.append(add(tree['tree_structure']))
+                tree_output.append(output)
+
+        self.n_outputs = len(boosters)
+        self.feature = np.array(feature, dtype=np.int64)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.default_left = np.array(default_left, dtype=np.bool_)
+        self.missing = np.array(missing, dtype=np.int64)
+        self.leaf_value = np.array(leaf_value, dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.int64)
+        self.tree_output = np.array(tree_output, dtype=np.int64)
+
+    def predict(self, X):
+        # X: raw float array, (n_features,) or (n_rows, n_features).
+        # Returns (n_rows, n_outputs), same values as booster.predict per output.
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        out = np.zeros((len(X), self.n_outputs))
+        return _forest_kernel(X, self.feature, self.threshold, self.left, self.right, self.default_left,
+                              self.missing, self.leaf_value, self.roots, self.tree_output, out)
@@ -0,0 +1,162 @@
+import contextlib
+import cProfile
+import csv
+import json
+import os
+import platform
+import resource
+import threading
+import time
+from datetime import datetime
+
+# --- STAGE PROFILING ---
+# Pipeline code wraps its expensive steps in `with stage(name, rows=n):`. When profiling
+# is enabled (main.py always does, the server never does) every stage appends a record:
+#   stage, ticker, wall_s, cpu_s, peak_rss_mb, rows, pid
+# * ticker comes from the enclosing `with ticker_scope(t):` (one ticker per process at a
+#   time: pool workers, or the serial loop), so library code does not need to know it.
+# * cpu_s is process CPU time, so threads a stage starts (LightGBM, TensorFlow) count.
+# * peak_rss_mb is the high-water mark of the process since the outermost open stage
+#   started (Linux resets it via /proc/self/clear_refs; elsewhere it is the peak of the
+#   whole process so far). Nested and concurrent stages share that window.
+# Records made in pool workers travel back with the result (call) and are merged into
+# the parent's list; write_report turns them into a JSON + CSV run report.
+
+_state = {'enabled': False, 'ticker': None, 'open': 0}
+_records = []
+_lock = threading.Lock()
+
+FIELDS = ['stage', 'ticker', 'wall_s', 'cpu_s', 'peak_rss_mb', 'rows', 'pid']
+
+def enable(enabled=True):
+    _state['enabled'] = enabled
+
+def is_enabled():
+    return _state['enabled']
+
+def _reset_peak_rss():
+    # Linux >= 4.0: "5" resets the VmHWM of this process
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if platform.system() == "Darwin" else peak / 1024
+
+@contextlib.contextmanager
+def ticker_scope(ticker):
+    previous = _state['ticker']
+    _state['ticker'] = ticker
+    try:
+        yield
+    finally:
+        _state['ticker'] = previous
+
+@contextlib.contextmanager
+def stage(name, rows=None, ticker=None):
+    # Yields the record (a dict, or None when disabled) so `rows` can be filled in later
+    if not _state['enabled']:
+        yield None
+        return
+
+    with _lock:
+        if _state['open'] == 0:
+            _reset_peak_rss()
+        _state['open'] += 1
+    record = {'stage': name, 'ticker': ticker or _state['ticker'], 'rows': rows, 'pid': os.getpid()}
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_s'] = round(time.perf_counter() - wall, 6)
+        record['cpu_s'] = round(time.process_time() - cpu, 6)
+        record['peak_rss_mb'] = round(_peak_rss_mb(), 1)
+        with _lock:
+            _state['open'] -= 1
+            _records.append(record)
+
+def records():
+    return list(_records)
+
+def clear():
+    del _records[:]
+
+def call(fn, *args, ticker=None, enabled=False, profile_path=None, **kwargs):
+    # Runs fn(*args, **kwargs) for one ticker (recorded as stage "task", around the
+    # stages inside it) and returns (result, records it produced). Used as the pool
+    # task, so the worker's profiling state comes from the parent (spawned workers
+    # start with it disabled). profile_path: also run it under cProfile and dump the
+    # stats there (pstats format: snakeviz, gprof2dot, `python -m pstats`).
+    enable(enabled)
+    start = len(_records)
+    profiler = cProfile.Profile() if profile_path else None
+    with ticker_scope(ticker):
+        if profiler:
+            profiler.enable()
+        try:
+            with stage("task"):
+                result = fn(*args, **kwargs)
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+                profiler.dump_stats(profile_path)
+    produced = _records[start:]
+    del _records[start:]
+    return result, produced
+
+def merge(worker_records):
+    with _lock:
+        _records.extend(worker_records)
+
+def summarize(recs=None):
+    # Per-stage totals: count, wall, cpu, max peak RSS, rows
+    summary = {}
+    for r in (_records if recs is None else recs):
+        s = summary.setdefault(r['stage'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': 0.0, 'rows': 0})
+        s['count'] += 1
+        s['wall_s'] += r['wall_s']
+        s['cpu_s'] += r['cpu_s']
+        s['peak_rss_mb'] = max(s['peak_rss_mb'], r['peak_rss_mb'])
+        s['rows'] += r['rows'] or 0
+    return dict(sorted(summary.items(), key=lambda kv: -kv[1]['wall_s']))
+
+def write_report(out_dir="reports", name="run_report", **meta):
+    # {out_dir}/{name}.json (meta + per-stage summary + records) and {name}.csv (records)
+    os.makedirs(out_dir, exist_ok=True)
+    recs = records()
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'cpus': os.cpu_count(),
+        **meta,
+        'summary': summarize(recs),
+        'records': recs,
+    }
+    json_path = os.path.join(out_dir, f"{name}.json")
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=1, default=str)
+    with open(os.path.join(out_dir, f"{name}.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(recs)
+    return json_path
+
+def print_summary(top=12):
+    summary = summarize()
+    if not summary:
+        return
+    print(f"{'Stage':<24}{'Count':>7}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}{'Rows':>11}")
+    for name, s in list(summary.items())[:top]:
+        print(f"{name:<24}{s['count']:>7}{s['wall_s']:>10.2f}{s['cpu_s']:>10.2f}{s['peak_rss_mb']:>10.0f}{s['rows']:>11}")
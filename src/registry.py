@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import pandas as pd
+from src.utils import write_atomic
+
+# --- ON-DISK MODEL REGISTRY ---
+# Fitted models are stored under {root}/{key}/ with a meta.json next to the artifacts.
+# The key covers everything that changes the fit: ticker, horizon, confidence, model
+# type, feature set, optional model params (e.g. the LSTM lookback) and the last bar
+# of training data ("data_through").
+#
+# * A newer data_through for the same model spec makes older entries stale; they are
+#   removed when the fresh model is stored.
+# * An optional fingerprint (content hash of the training data, src/incremental.py) is
+#   stored with the entry; a get with a different fingerprint is a miss, so revised
+#   history is refit even when the last training bar did not move.
+# * Entries are evicted least-recently-used first once the registry exceeds max_bytes
+#   (or max_entries, if given). The default is a size bound only: a nightly run stores
+#   one entry per ticker and horizon (about 0.6 MB each for LightGBM), so an entry
+#   count sized for a small watchlist would evict models trained earlier in the same
+#   run. 1 GB holds about 600 tickers x 3 horizons.
+
+class ModelRegistry:
+    def __init__(self, root="models", max_entries=None, max_bytes=1024**3):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _spec(ticker, horizon, confidence, model_type, feature_cols, params=None):
+        # Everything except the data date; identifies "the same model, maybe stale"
+        spec = {
+            'ticker': ticker,
+            'horizon': int(horizon),
+            'confidence': round(float(confidence), 4),
+            'model_type': model_type,
+            'features': list(feature_cols),
+        }
+        # Only part of the key when given, so existing entries keep their keys
+        if params:
+            spec['params'] = dict(params)
+        return spec
+
+    @staticmethod
+    def _key(spec, data_through):
+        payload = json.dumps({**spec, 'data_through': str(pd.Timestamp(data_through).date())}, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    def get(self, ticker, horizon, confidence, model_type, feature_cols, data_through, params=None, fingerprint=None):
+        spec = self._spec(ticker, horizon, confidence, model_type, feature_cols, params)
+        path = os.path.join(self.root, self._key(spec, data_through))
+        meta = self._read_meta(path)
+        if meta is None:
+            return None
+        if fingerprint is not None and meta.get('fingerprint') != fingerprint:
+            return None
+
+        try:
+            model = _load_model(model_type, os.path.join(path, "model"))
+        except Exception as e:
+            print(f"Registry entry {path} unreadable, dropping it: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        # LRU bookkeeping
+        meta['last_used'] = time.time()
+        self._write_meta(path, meta)
+        return model
+
+    def put(self, model, ticker, horizon, confidence, model_type, feature_cols, data_through, params=None, fingerprint=None):
+        spec = self._spec(ticker, horizon, confidence, model_type, feature_cols, params)
+        key = self._key(spec, data_through)
+        path = os.path.join(self.root, key)
+
+        # Save into a private temp dir, then rename, so readers never see half an entry
+        tmp_path = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        model.save(os.path.join(tmp_path, "model"))
+        meta = {
+            **spec,
+            'data_through': str(pd.Timestamp(data_through).date()),
+            'created': time.time(),
+            'last_used': time.time(),
+            'bytes': _dir_size(tmp_path),
+        }
+        if fingerprint is not None:
+            meta['fingerprint'] = fingerprint
+        self._write_meta(tmp_path, meta)
+
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        self._invalidate_stale(spec, meta['data_through'])
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.startswith("."):
+                continue
+            meta = self._read_meta(os.path.join(self.root, name))
+            if meta is not None:
+                entries.append((name, meta))
+        return entries
+
+    def _invalidate_stale(self, spec, data_through):
+        # New bars arrived: the same model trained on older data is obsolete
+        for name, meta in self._entries():
+            if all(meta.get(k) == v for k, v in spec.items()) and meta['data_through'] < data_through:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1]['last_used'])
+        total = sum(meta['bytes'] for _, meta in entries)
+        max_entries = float('inf') if self.max_entries is None else self.max_entries
+        while entries and (len(entries) > max_entries or total > self.max_bytes):
+            name, meta = entries.pop(0)
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= meta['bytes']
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(path, meta):
+        write_atomic(os.path.join(path, "meta.json"), json.dumps(meta))
+
+def _load_model(model_type, path):
+    # Imported here so loading a LightGBM entry never pulls in TensorFlow
+    if model_type == "lightgbm":
+        from src.models import QuantileModels
+        return QuantileModels.load(path)
+    if model_type == "ensemble":
+        from src.ensemble import Ensemble
+        return Ensemble.load(path)
+    if model_type == "lstm":
+        from src.deep_models import DeepQuantileModel
+        return DeepQuantileModel.load(path)
+    raise ValueError(f"Unknown model type: {model_type}")
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
@@ -1,41 +1,116 @@
 import pandas as pd
+import numpy as np
+from src.accel import njit, HAS_NUMBA
+from src.profiling import stage
+
+# Signal codes used by the array engine (0 = no signal on that bar)
+SIGNAL_NAMES = ("", "BUY", "SELL", "EXIT_LONG", "EXIT_SHORT")
+BUY, SELL, EXIT_LONG, EXIT_SHORT = 1, 2, 3, 4
+
+# One record per trade signal: which series (row), which bar, what signal, at what price
+TRADE_DTYPE = np.dtype([('row', np.int32), ('bar', np.int32), ('signal', np.int8), ('price', np.float64)])
+
+@njit(cache=True)
+def _mean_reversion_kernel(actuals, lower, upper, codes):
+    # Same state machine as the original row loop, written against plain arrays
+    current_pos = 0 # 0=None, 1=Long, -1=Short
+    entry_price = 0.0
+    pnl = 0.0
+
+    for i in range(len(actuals)):
+        price = actuals[i]
+
+        # ENTRY LOGIC
+        if current_pos == 0:
+            if price < lower[i]: # Oversold -> Buy
+                current_pos = 1
+                entry_price = price
+                codes[i] = 1
+            elif price > upper[i]: # Overbought -> Sell
+                current_pos = -1
+                entry_price = price
+                codes[i] = 2
+
+        # EXIT LOGIC
+        elif current_pos == 1:
+            if price >= (lower[i] + upper[i]) / 2: # Reverted to mean
+                pnl += price - entry_price
+                current_pos = 0
+                codes[i] = 3
+
+        elif current_pos == -1:
+            if price <= (lower[i] + upper[i]) / 2: # Reverted to mean
+                pnl += entry_price - price
+                current_pos = 0
+                codes[i] = 4
+
+    return pnl
+
+@njit(cache=True)
+def _mean_reversion_batch(actuals, lower, upper, codes, pnl):
+    for r in range(actuals.shape[0]):
+        pnl[r] = _mean_reversion_kernel(actuals[r], lower[r], upper[r], codes[r])
+
+def mean_reversion_codes(actuals, lower, upper):
+    # The state machine over 2-D (n_series, n_bars) float64 inputs of the same shape.
+    # Returns (codes, pnl): the signal code of every bar (0 = none, see SIGNAL_NAMES)
+    # and the PnL per series. src/portfolio.py turns the codes into positions.
+    codes = np.zeros(actuals.shape, dtype=np.int8)
+    pnl = np.zeros(actuals.shape[0])
+
+    if HAS_NUMBA:
+        _mean_reversion_batch(np.ascontiguousarray(actuals), np.ascontiguousarray(lower),
+                              np.ascontiguousarray(upper), codes, pnl)
+    else:
+        # Plain Python is much faster on lists than on NumPy scalars
+        for r in range(actuals.shape[0]):
+            pnl[r] = _mean_reversion_kernel(actuals[r].tolist(), lower[r].tolist(), upper[r].tolist(), codes[r])
+    return codes, pnl
+
+def mean_reversion_engine(actuals, lower, upper):
+    # Array backtest engine.
+    # Inputs are 1-D (one series) or 2-D (n_series, n_bars) and are broadcast against
+    # each other, so one price path can be run against many band sets (e.g. a grid of
+    # calibration factors) or many tickers in a single call.
+    # Returns (trades, pnl): a TRADE_DTYPE record array and the PnL per series.
+    actuals, lower, upper = np.broadcast_arrays(
+        np.asarray(actuals, dtype=np.float64),
+        np.asarray(lower, dtype=np.float64),
+        np.asarray(upper, dtype=np.float64),
+    )
+    is_1d = actuals.ndim == 1
+    if is_1d:
+        actuals, lower, upper = actuals[None], lower[None], upper[None]
+
+    codes, pnl = mean_reversion_codes(actuals, lower, upper)
+
+    rows, bars = np.nonzero(codes)
+    trades = np.empty(len(rows), dtype=TRADE_DTYPE)
+    trades['row'] = rows
+    trades['bar'] = bars
+    trades['signal'] = codes[rows, bars]
+    trades['price'] = actuals[rows, bars]
+
+    return trades, (pnl[0] if is_1d else pnl)
 
 class SignalGenerator:
     def run_mean_reversion(self, dates, actuals, lower, upper):
-        signals = []
-        current_pos = 0 # 0=None, 1=Long, -1=Short
-        entry_price = 0
-        pnl = []
-        
-        df = pd.DataFrame({'Date': dates, 'Actual': actuals, 'Lower': lower, 'Upper': upper})
-        df['Midpoint'] = (df['Lower'] + df['Upper']) / 2
-        
-        for i, row in df.iterrows():
-            price = row['Actual']
-            
-            # ENTRY LOGIC
-            if current_pos == 0:
-                if price < row['Lower']: # Oversold -> Buy
-                    current_pos = 1
-                    entry_price = price
-                    signals.append((row['Date'], "BUY", price))
-                    
-                elif price > row['Upper']: # Overbought -> Sell
-                    current_pos = -1
-                    entry_price = price
-                    signals.append((row['Date'], "SELL", price))
-            
-            # EXIT LOGIC
-            elif current_pos == 1:
-                if price >= row['Midpoint']: # Reverted to mean
-                    pnl.append(price - entry_price)
-                    current_pos = 0
-                    signals.append((row['Date'], "EXIT_LONG", price))
-                    
-            elif current_pos == -1:
-                if price <= row['Midpoint']: # Reverted to mean
-                    pnl.append(entry_price - price)
-                    current_pos = 0
-                    signals.append((row['Date'], "EXIT_SHORT", price))
-                    
-        return df, signals, sum(pnl)
\ No newline at end of file
+        with stage("strategy", rows=len(actuals)):
+            return self._run_mean_reversion(dates, actuals, lower, upper)
+
+    def _run_mean_reversion(self, dates, actuals, lower, upper):
+        # The caller's arrays as they are: no DataFrame is built. The first value
+        # returned is just those series by name (what utils.visualize_results plots).
+        series = {'Date': dates, 'Actual': actuals, 'Lower': lower, 'Upper': upper}
+
+        trades, total_pnl = mean_reversion_engine(actuals, lower, upper)
+
+        # Keep the (Date, Signal, Price) tuples the dashboard expects
+        signal_dates = pd.DatetimeIndex(dates)[trades['bar']].tolist()
+        signals = [(d, SIGNAL_NAMES[s], p) for d, s, p in zip(signal_dates, trades['signal'].tolist(), trades['price'])]
+
+        return series, signals, total_pnl
+
+    def run_mean_reversion_batch(self, actuals, lower, upper):
+        # Many tickers / calibration settings in one call, see mean_reversion_engine
+        return mean_reversion_engine(actuals, lower, upper)
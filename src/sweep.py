@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from src.models import QuantileModels
+from src.strategy import mean_reversion_engine
+from src.utils import apply_calibration, band_metrics
+
+class ParameterSweep:
+    # Grid search over (confidence level x calibration factor) for one ticker/horizon.
+    # Every confidence level's quantile pair is fitted in one train_quantiles call (the
+    # features are binned once for the whole grid); every calibration factor is then
+    # just a rescaling of those predictions, so the whole grid is scored with one
+    # vectorized band_metrics call and one batched backtest.
+    def __init__(self, calib_factors, confidence_levels, n_jobs=1):
+        self.calib_factors = np.asarray(calib_factors, dtype=np.float64)
+        self.confidence_levels = list(confidence_levels)
+        self.n_jobs = n_jobs
+
+    def run(self, X_train, y_train, X_test, current_prices, y_test):
+        # 1. One shared binned Dataset, one booster per distinct quantile of the grid
+        pairs = [((1 - conf) / 2, 1 - (1 - conf) / 2) for conf in self.confidence_levels]
+        qm = QuantileModels(n_jobs=self.n_jobs).train_quantiles(X_train, y_train, {q for pair in pairs for q in pair})
+        # Each booster on its own (predict_quantiles would re-sort across the whole grid)
+        by_quantile = {q: booster.predict(X_test) for q, booster in zip(qm.quantiles, qm.boosters)}
+        preds = [(by_quantile[low], by_quantile[high]) for low, high in pairs]
+
+        pred_low = np.array([p[0] for p in preds])    # (n_conf, n_bars)
+        pred_high = np.array([p[1] for p in preds])
+
+        # 2. Rescale for every calibration factor at once -> (n_conf, n_calib, n_bars)
+        calib = self.calib_factors[None, :, None]
+        ret_low, ret_high = apply_calibration(pred_low[:, None, :], pred_high[:, None, :], calib)
+
+        n_settings = len(self.confidence_levels) * len(self.calib_factors)
+        p_low_price = (current_prices * (1 + ret_low)).reshape(n_settings, -1)
+        p_high_price = (current_prices * (1 + ret_high)).reshape(n_settings, -1)
+        y_test_price = current_prices * (1 + np.asarray(y_test))
+
+        # 3. Score the whole grid in one pass
+        picp, mpiw = band_metrics(y_test_price, p_low_price, p_high_price)
+        trades, pnl = mean_reversion_engine(y_test_price, p_low_price, p_high_price)
+        n_trades = np.bincount(trades['row'], minlength=n_settings)
+
+        conf_grid, calib_grid = np.meshgrid(self.confidence_levels, self.calib_factors, indexing='ij')
+        return pd.DataFrame({
+            'confidence': conf_grid.ravel(),
+            'calib': calib_grid.ravel(),
+            'picp': picp,
+            'mpiw': mpiw,
+            'pnl': pnl,
+            'trades': n_trades,
+        })
@@ -1,19 +1,57 @@
-import matplotlib.pyplot as plt
+import os
+import uuid
 import numpy as np
 
+def write_atomic(path, content):
+    # Temp file + rename: a reader (a server worker, the GitHub Pages deploy, the next
+    # run) never sees a half-written file, even if the writer is killed mid-way.
+    # content: bytes, str (UTF-8) or a function writing the file at the path it is given
+    # (e.g. df.to_parquet). The temp name is unique per call, so processes and threads
+    # writing the same file at once never clobber each other's temp file.
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if callable(content):
+            content(tmp_path)
+        else:
+            with open(tmp_path, "wb") as f:
+                f.write(content if isinstance(content, bytes) else content.encode("utf-8"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def apply_calibration(pred_low, pred_high, calib):
+    # Rescale the band around its center: center +/- width * calib (0.5 = unchanged).
+    # calib may be an array, e.g. a column of factors broadcast against 1-D bands,
+    # or one factor per bar from src/calibration.py.
+    center = (pred_high + pred_low) / 2
+    width = (pred_high - pred_low)
+    return center - (width * calib), center + (width * calib)
+
+def band_metrics(y_true, p_lower, p_upper):
+    # Vectorized PICP/MPIW along the last axis, so a whole grid of bands
+    # (n_settings, n_bars) is scored in one pass
+    in_bound = (y_true >= p_lower) & (y_true <= p_upper)
+    picp = np.mean(in_bound, axis=-1)
+    mpiw = np.mean(p_upper - p_lower, axis=-1)
+    return picp, mpiw
+
+def pinball_loss(y_true, pred, q):
+    # Mean quantile (pinball) loss of a q-quantile forecast along the last axis
+    e = y_true - pred
+    return np.mean(np.maximum(q * e, (q - 1) * e), axis=-1)
+
 def evaluate_metrics(y_true, p_lower, p_upper):
-    # Coverage (PICP)
-    in_bound = np.where((y_true >= p_lower) & (y_true <= p_upper), 1, 0)
-    picp = np.mean(in_bound)
-    
-    # Width (MPIW)
-    mpiw = np.mean(p_upper - p_lower)
+    # Coverage (PICP) & Width (MPIW)
+    picp, mpiw = band_metrics(y_true, p_lower, p_upper)
     
     print(f"PICP (Coverage): {picp:.2%}")
     print(f"MPIW (Width): {mpiw:.2f}")
     return picp, mpiw
 
 def visualize_results(df_sig, signals, ticker):
+    import matplotlib.pyplot as plt # Only needed for local plotting
     plt.figure(figsize=(12, 6))
     plt.title(f"{ticker} Forecast & Mean Reversion Signals")
     
@@ -0,0 +1,29 @@
+# The rolling conformal factor against a brute-force sort of each window
+import math
+import numpy as np
+
+from src.calibration import ConformalCalibrator
+
+def brute_factor(scores, confidence, min_samples):
+    if len(scores) < min_samples:
+        return ConformalCalibrator.RAW_FACTOR
+    k = min(math.ceil((len(scores) + 1) * confidence), len(scores))
+    return np.sort(scores)[k - 1]
+
+def test_factors_match_brute_force():
+    rng = np.random.default_rng(3)
+    n, window, gap = 400, 50, 5
+    actual = rng.normal(0, 1, n)
+    lower = rng.normal(-1, 0.1, n)
+    upper = lower + rng.uniform(0.5, 2.0, n)
+    actual[::7] = lower[::7] # Ties in the window
+    scores = ConformalCalibrator.score(actual, lower, upper)
+
+    calibrator = ConformalCalibrator(0.9, window, min_samples=20)
+    factors = calibrator.factors(actual, lower, upper, gap=gap)
+    for t in range(n):
+        known = scores[max(t - gap - window + 1, 0):max(t - gap + 1, 0)]
+        assert factors[t] == brute_factor(known, 0.9, 20), t
+    # Afterwards it holds the last `window` scores, ready for the live forecast
+    assert len(calibrator) == window
+    assert calibrator.factor() == brute_factor(scores[-window:], 0.9, 20)
@@ -0,0 +1,38 @@
+# Ensemble weight fitting: the validation block must not leak into the trial fit
+import numpy as np
+
+from src.ensemble import Ensemble
+
+def test_trial_fit_purges_overlapping_targets():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 3))
+    targets = {5: rng.normal(size=300), 21: rng.normal(size=300)}
+
+    ensemble = Ensemble(("lightgbm", "lightgbm"), 0.9, val_fraction=0.2)
+    fit_rows = []
+    fit_all = ensemble._fit_all
+    def recording_fit_all(X, targets):
+        fit_rows.append(len(X))
+        return fit_all(X, targets)
+    ensemble._fit_all = recording_fit_all
+
+    fitted = ensemble.fit_horizons(X, targets)
+    split = int(300 * 0.8)
+    # Trial fit ends max(horizon) rows before the validation block, final fit uses all
+    assert fit_rows == [split - 21, 300]
+    for h in targets:
+        np.testing.assert_allclose(fitted[h].weights.sum(axis=0), 1.0)
+
+def test_calibration_scores_from_known_validation_rows(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(300, 3))
+    targets = {5: rng.normal(size=300), 21: rng.normal(size=300)}
+
+    fitted = Ensemble(("lightgbm",), 0.9, val_fraction=0.2).fit_horizons(X, targets)
+    split = int(300 * 0.8)
+    # Validation rows whose target ends inside the training rows, and they survive a reload
+    for h in targets:
+        assert len(fitted[h].calibration_scores) == 300 - split - h
+        assert (fitted[h].calibration_scores >= 0).all()
+        fitted[h].save(tmp_path / str(h))
+        np.testing.assert_allclose(Ensemble.load(tmp_path / str(h)).calibration_scores, fitted[h].calibration_scores)
@@ -0,0 +1,92 @@
+# The panel feature engine against FeatureEngineer, and extending a dataset with new
+# bars (the nightly fast path) against a full recompute
+import numpy as np
+import pytest
+
+from src.feature_eng import FeatureEngineer, PanelFeatureEngineer, extend_dataset
+from benchmarks.synthetic import make_ohlcv
+
+HORIZONS = [5, 21, 60]
+
+def make_frames(n_bars=400):
+    # Float32 VIX like DataLoader; one late listing, one missing VIX print
+    frames = {}
+    for j, ticker in enumerate(["AAA", "BBB", "CCC"]):
+        df = make_ohlcv(n_bars, seed=j)
+        frames[ticker] = df.astype({'VIX': np.float32})
+    frames["BBB"] = frames["BBB"].iloc[50:]
+    frames["CCC"].iloc[n_bars - 3, frames["CCC"].columns.get_loc('VIX')] = np.nan
+    return frames
+
+def build_panel(frames):
+    panel = PanelFeatureEngineer.from_frames(frames)
+    panel.add_technical_indicators()
+    panel.create_targets(HORIZONS)
+    return panel
+
+def assert_same(dataset, expected):
+    assert dataset.dates.equals(expected.dates)
+    assert list(dataset.columns) == list(expected.columns)
+    for name in expected.columns:
+        np.testing.assert_array_equal(dataset[name], expected[name], err_msg=name)
+
+def test_panel_matches_feature_engineer():
+    frames = make_frames()
+    panel = build_panel(frames).to_frames()
+    for ticker, df in frames.items():
+        expected = FeatureEngineer(df.dropna())
+        expected.add_technical_indicators()
+        expected = expected.create_targets(HORIZONS)
+        np.testing.assert_array_equal(panel[ticker].to_numpy(), expected.to_numpy())
+        assert panel[ticker].index.equals(expected.index)
+
+@pytest.mark.parametrize("new_bars", [1, 7, 80])
+def test_extend_matches_recompute(new_bars):
+    frames = make_frames()
+    n_old = {t: len(df) - new_bars for t, df in frames.items()}
+    old = build_panel({t: df.iloc[:n_old[t]] for t, df in frames.items()})
+    states = old.states()
+    full = build_panel(frames).to_tickers()
+
+    for ticker, dataset in old.to_tickers().items():
+        assert states[ticker] is not None
+        extended = extend_dataset(dataset, states[ticker], frames[ticker].iloc[n_old[ticker]:], HORIZONS)
+        assert_same(extended, full[ticker])
+
+def test_extend_in_steps():
+    # Night after night: each extension continues from the state the last one left.
+    # Steps are cut by date; CCC's step with the missing VIX print has no valid bar.
+    frames = make_frames()
+    dates = frames["AAA"].index
+    def until(stop):
+        return {t: df[df.index < dates[stop]] for t, df in frames.items()}
+
+    old = build_panel(until(300))
+    states, datasets, seen = old.states(), old.to_tickers(), until(300)
+    for stop in [301, 314, 397, 398, 399]:
+        for ticker, df in until(stop).items():
+            bars = df.iloc[len(seen[ticker]):]
+            datasets[ticker] = extend_dataset(datasets[ticker], states[ticker], bars, HORIZONS)
+            seen[ticker] = df
+    full = build_panel(until(399)).to_tickers()
+    for ticker in frames:
+        assert_same(datasets[ticker], full[ticker])
+
+def test_volume_keeps_full_precision():
+    # Share counts above 2^24 are not representable in float32
+    frames = make_frames()
+    volume = frames["AAA"]['Volume'].to_numpy().copy()
+    volume[-150:] = 2 ** 24 + 1 + np.arange(150)
+    frames["AAA"] = frames["AAA"].assign(Volume=volume)
+    n_old = len(frames["AAA"]) - 10
+
+    dataset = build_panel(frames).to_tickers()["AAA"]
+    assert dataset['Volume'].dtype == np.float64
+    np.testing.assert_array_equal(dataset['Volume'][-150:], volume[-150:])
+
+    old = build_panel({"AAA": frames["AAA"].iloc[:n_old]})
+    extended = extend_dataset(old.to_tickers()["AAA"], old.states()["AAA"], frames["AAA"].iloc[n_old:], HORIZONS)
+    assert_same(extended, dataset)
+
+    fe = FeatureEngineer(frames["AAA"])
+    assert fe.add_technical_indicators()['Volume'].dtype == np.float64
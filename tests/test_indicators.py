@@ -0,0 +1,97 @@
+# The NumPy indicator kernels against fixed reference values, and the streaming state
+# against a full recompute
+import numpy as np
+import pytest
+
+import src.indicators as indicators
+from src.indicators import compute_features, IndicatorState
+
+# pandas_ta 0.4.71b0 on make_bars() (ta.atr length 14, ta.bbands length 20 std 2,
+# pct_change), i.e. what FeatureEngineer computed before the NumPy engine
+REFERENCE = {
+    'ATR': {13: 2.6718651632135826, 14: 2.6473798750447486, 19: 2.676595068629509,
+            20: 2.719134107934443, 27: 2.685083072807431, 39: 2.695673800813644},
+    'BB_Width': {19: 0.09812304452859001, 20: 0.1014521118981527,
+                 27: 0.17696328810341358, 39: 0.09753361566093807},
+    'Return': {13: -0.005620943535546208, 14: -0.0005007517550099649, 19: 0.01872747893441984,
+               20: 0.01812278994410721, 27: -0.009683435618970893, 39: 0.016981093741979647},
+}
+FIRST_VALID = {'ATR': 13, 'BB_Width': 19, 'Return': 1} # Warm-up bars are NaN
+
+def make_bars(n_bars=40, phase=0.0):
+    # Deterministic OHLC-like series (no RNG, so the reference values stay valid)
+    i = np.arange(n_bars, dtype=np.float64) + phase
+    close = 100 + 5 * np.sin(i / 3) + 0.3 * i
+    high = close + 1 + 0.5 * np.cos(i / 2) ** 2
+    low = close - 1 - 0.4 * np.sin(i / 5) ** 2
+    return high, low, close
+
+def make_panel(n_bars, n_tickers=4):
+    bars = [make_bars(n_bars, phase=7.0 * j) for j in range(n_tickers)]
+    return tuple(np.column_stack([b[k] for b in bars]) for k in range(3))
+
+@pytest.fixture(params=["numba", "numpy"])
+def engine(request, monkeypatch):
+    # Rolling std has a compiled kernel and a sliding-window fallback: test both
+    if request.param == "numpy":
+        monkeypatch.setattr(indicators, "HAS_NUMBA", False)
+    elif not indicators.HAS_NUMBA:
+        pytest.skip("numba is not installed")
+    return request.param
+
+def test_matches_reference_values(engine):
+    features = compute_features(*make_bars())
+    for name, values in REFERENCE.items():
+        for bar, expected in values.items():
+            assert features[name][bar] == pytest.approx(expected, rel=1e-12), (name, bar)
+
+def test_warm_up_mask(engine):
+    features = compute_features(*make_bars())
+    for name, first in FIRST_VALID.items():
+        assert np.isnan(features[name][:first]).all(), name
+        assert not np.isnan(features[name][first:]).any(), name
+
+def test_panel_matches_single_series(engine):
+    # A later listing (leading NaNs) is handled per column
+    high, low, close = make_panel(80)
+    for a in (high, low, close):
+        a[:25, 1] = np.nan
+    panel = compute_features(high, low, close)
+    for j in range(high.shape[1]):
+        start = 25 if j == 1 else 0
+        single = compute_features(high[start:, j], low[start:, j], close[start:, j])
+        for name in panel:
+            np.testing.assert_allclose(panel[name][start:, j], single[name], rtol=1e-12)
+            assert np.isnan(panel[name][:start, j]).all()
+
+@pytest.mark.parametrize("block", [1, 3, 10])
+def test_streaming_matches_full_recompute(engine, block):
+    high, low, close = make_bars(120)
+    full = compute_features(high, low, close)
+
+    state = IndicatorState()
+    fitted = state.fit(high[:60], low[:60], close[:60])
+    for name in full:
+        np.testing.assert_array_equal(fitted[name], full[name][:60])
+    for start in range(60, 120, block):
+        stop = min(start + block, 120)
+        new = state.update(high[start:stop], low[start:stop], close[start:stop])
+        for name in full:
+            np.testing.assert_allclose(new[name], full[name][start:stop], rtol=1e-12, err_msg=name)
+
+def test_streaming_panel_matches_full_recompute(engine):
+    high, low, close = make_panel(100)
+    full = compute_features(high, low, close)
+
+    state = IndicatorState()
+    state.fit(high[:70], low[:70], close[:70])
+    for start, stop in [(70, 71), (71, 85), (85, 100)]:
+        new = state.update(high[start:stop], low[start:stop], close[start:stop])
+        for name in full:
+            assert new[name].shape == (stop - start, high.shape[1])
+            np.testing.assert_allclose(new[name], full[name][start:stop], rtol=1e-12, err_msg=name)
+
+def test_fit_needs_warm_up_bars():
+    high, low, close = make_bars(15)
+    with pytest.raises(ValueError):
+        IndicatorState().fit(high, low, close)
@@ -0,0 +1,33 @@
+# QuantileModels: walk-forward evaluation
+import numpy as np
+import pytest
+
+from src.models import QuantileModels
+
+def walk_forward_data(n=300):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 3))
+    return X, X[:, 0] * 0.01 + rng.normal(0, 0.01, n)
+
+def test_walk_forward_is_out_of_sample():
+    X, y = walk_forward_data()
+    min_train, step, gap = 200, 25, 5
+    low, high = QuantileModels(n_jobs=1).walk_forward(X, y, step=step, min_train=min_train, gap=gap,
+                                                      initial_trees=20, trees_per_step=5)
+    assert low.shape == high.shape == (len(X) - min_train,)
+    assert np.isfinite(low).all() and (low <= high).all()
+
+    # A block's forecasts only depend on targets known `gap` bars before it starts:
+    # changing the targets from the second block's cutoff on leaves the first block alone
+    y_changed = y.copy()
+    y_changed[min_train + step - gap:] += 1.0
+    low2, high2 = QuantileModels(n_jobs=1).walk_forward(X, y_changed, step=step, min_train=min_train, gap=gap,
+                                                        initial_trees=20, trees_per_step=5)
+    np.testing.assert_array_equal(low2[:step], low[:step])
+    np.testing.assert_array_equal(high2[:step], high[:step])
+    assert not np.array_equal(low2[step:], low[step:])
+
+def test_walk_forward_needs_rows_after_min_train():
+    X, y = walk_forward_data(100)
+    with pytest.raises(ValueError, match="min_train=100"):
+        QuantileModels().walk_forward(X, y, min_train=100)
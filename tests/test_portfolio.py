@@ -0,0 +1,62 @@
+# The vectorized portfolio backtest against a bar-by-bar loop over the legacy strategy
+import numpy as np
+import pytest
+
+from src.portfolio import PortfolioBacktest
+from tests.test_strategy import legacy_mean_reversion
+
+POSITION_CHANGE = {"BUY": 1, "SELL": -1, "EXIT_LONG": -1, "EXIT_SHORT": 1}
+
+def make_panel(n_bars, n_tickers, rng):
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_bars, n_tickers)), axis=0))
+    center = prices * (1 + rng.normal(0, 0.01, prices.shape))
+    width = prices * 0.01
+    return prices, center - width, center + width
+
+def reference_equity(prices, lower, upper, cost, allocation):
+    # Positions from the original per-ticker loop, then one bar at a time: yesterday's
+    # weights earn today's return, every weight change pays `cost`
+    n_bars, n_tickers = prices.shape
+    positions = np.zeros((n_bars, n_tickers))
+    for j in range(n_tickers):
+        _, signals, _ = legacy_mean_reversion(np.arange(n_bars), prices[:, j], lower[:, j], upper[:, j])
+        changes = {bar: POSITION_CHANGE[signal] for bar, signal, _ in signals}
+        position = 0
+        for t in range(n_bars):
+            position += changes.get(t, 0)
+            positions[t, j] = position
+
+    equity, costs, curve = 1.0, 0.0, []
+    previous = np.zeros(n_tickers)
+    for t in range(n_bars):
+        if allocation == "equal":
+            weights = positions[t] / n_tickers
+        else:
+            weights = positions[t] / max(np.abs(positions[t]).sum(), 1)
+        gross = previous @ (prices[t] / prices[t - 1] - 1) if t else 0.0
+        cost_t = np.abs(weights - previous).sum() * cost
+        equity *= 1 + gross - cost_t
+        costs += cost_t
+        curve.append(equity)
+        previous = weights
+    return np.array(curve), costs
+
+@pytest.mark.parametrize("allocation", PortfolioBacktest.ALLOCATIONS)
+def test_portfolio_matches_reference_loop(allocation):
+    prices, lower, upper = make_panel(300, 4, np.random.default_rng(2))
+    result = PortfolioBacktest(fee_bps=1.0, slippage_bps=5.0, allocation=allocation).run(prices, lower, upper)
+
+    equity, costs = reference_equity(prices, lower, upper, 6 / 1e4, allocation)
+    assert result['metrics']['trades'] > 0
+    np.testing.assert_allclose(result['equity'], equity, rtol=1e-12)
+    assert result['metrics']['costs'] == pytest.approx(costs, rel=1e-12)
+    assert result['metrics']['total_return'] == pytest.approx(equity[-1] - 1, rel=1e-12)
+
+def test_costs_only_lower_returns():
+    prices, lower, upper = make_panel(300, 4, np.random.default_rng(3))
+    free = PortfolioBacktest(fee_bps=0.0, slippage_bps=0.0).run(prices, lower, upper)
+    paid = PortfolioBacktest(fee_bps=1.0, slippage_bps=5.0).run(prices, lower, upper)
+    # Same trades, each bar's return lower by exactly the traded notional x cost
+    np.testing.assert_array_equal(free['turnover'], paid['turnover'])
+    np.testing.assert_allclose(free['returns'] - paid['returns'], paid['turnover'] * 6 / 1e4, atol=1e-15)
+    assert paid['metrics']['total_return'] < free['metrics']['total_return']
@@ -0,0 +1,40 @@
+# The compiled tree evaluator against LightGBM's own Booster.predict
+import numpy as np
+import pytest
+
+import src.predictor as predictor
+from src.models import QuantileModels
+from src.predictor import CompiledForest
+
+@pytest.fixture(params=["compiled", "python"])
+def kernel(request, monkeypatch):
+    # The same kernel compiled by numba and as plain Python (no numba installed)
+    if request.param == "python":
+        monkeypatch.setattr(predictor, "_forest_kernel", getattr(predictor._forest_kernel, "py_func", predictor._forest_kernel))
+    elif not hasattr(predictor._forest_kernel, "py_func"):
+        pytest.skip("numba is not installed")
+    return request.param
+
+def make_data(n, rng):
+    X = rng.normal(size=(n, 4))
+    # Missing values and exact zeros exercise every default-direction rule
+    X[rng.random(n) < 0.1, 1] = np.nan
+    X[rng.random(n) < 0.1, 2] = 0.0
+    y = X[:, 0] * 0.02 + np.nan_to_num(X[:, 1]) * 0.01 + rng.normal(0, 0.01, n)
+    return X, y
+
+def test_compiled_forest_matches_booster(kernel):
+    rng = np.random.default_rng(0)
+    X_train, y_train = make_data(500, rng)
+    qm = QuantileModels().train_quantiles(X_train, y_train, (0.05, 0.5, 0.95))
+
+    X, _ = make_data(200, rng)
+    X[:5] = np.nan # Rows missing every feature
+    forest = CompiledForest(qm.boosters)
+    expected = np.column_stack([booster.predict(X) for booster in qm.boosters])
+    np.testing.assert_allclose(forest.predict(X), expected, rtol=1e-12, atol=1e-12)
+
+    # The serving entry points agree with the batch band
+    low, high = qm.predict(X)
+    np.testing.assert_allclose(np.column_stack(qm.predict_fast(X)), np.column_stack([low, high]), rtol=1e-12, atol=1e-12)
+    assert qm.predict_one(X[7]) == pytest.approx((low[7], high[7]), rel=1e-12, abs=1e-12)
@@ -0,0 +1,81 @@
+# The on-disk model registry: hits, stale entries, fingerprints and LRU eviction
+import itertools
+import os
+import numpy as np
+import pytest
+
+from src import registry as registry_module
+from src.models import QuantileModels
+from src.registry import ModelRegistry
+
+FEATURES = ['Close', 'VIX']
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    qm = QuantileModels()
+    qm.train_lgbm(rng.normal(size=(200, 2)), rng.normal(size=200))
+    return qm
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # One tick per call, so last_used orders entries without waiting
+    ticks = itertools.count()
+    monkeypatch.setattr(registry_module.time, "time", lambda: float(next(ticks)))
+
+def put(registry, model, ticker, data_through="2024-01-05", **kwargs):
+    registry.put(model, ticker, 5, 0.9, "lightgbm", FEATURES, data_through, **kwargs)
+
+def get(registry, ticker, data_through="2024-01-05", **kwargs):
+    return registry.get(ticker, 5, 0.9, "lightgbm", FEATURES, data_through, **kwargs)
+
+def test_hit_returns_the_stored_model(tmp_path, model):
+    registry = ModelRegistry(tmp_path)
+    assert get(registry, "INFY.NS") is None
+    put(registry, model, "INFY.NS")
+    loaded = get(registry, "INFY.NS")
+    X = np.random.default_rng(1).normal(size=(20, 2))
+    np.testing.assert_allclose(loaded.predict(X), model.predict(X))
+    # Any other part of the key is a miss
+    assert get(registry, "TCS.NS") is None
+    assert registry.get("INFY.NS", 21, 0.9, "lightgbm", FEATURES, "2024-01-05") is None
+
+def test_newer_data_invalidates_stale_entries(tmp_path, model):
+    registry = ModelRegistry(tmp_path)
+    put(registry, model, "INFY.NS", "2024-01-05")
+    put(registry, model, "TCS.NS", "2024-01-05")
+    put(registry, model, "INFY.NS", "2024-01-12")
+    assert get(registry, "INFY.NS", "2024-01-05") is None
+    assert get(registry, "INFY.NS", "2024-01-12") is not None
+    assert get(registry, "TCS.NS", "2024-01-05") is not None
+    assert len(os.listdir(tmp_path)) == 2
+
+def test_fingerprint_mismatch_is_a_miss(tmp_path, model):
+    registry = ModelRegistry(tmp_path)
+    put(registry, model, "INFY.NS", fingerprint="abc")
+    assert get(registry, "INFY.NS", fingerprint="abc") is not None
+    assert get(registry, "INFY.NS", fingerprint="def") is None
+    # Callers without a fingerprint still hit
+    assert get(registry, "INFY.NS") is not None
+
+def test_least_recently_used_is_evicted(tmp_path, model):
+    registry = ModelRegistry(tmp_path, max_entries=2)
+    put(registry, model, "INFY.NS")
+    put(registry, model, "TCS.NS")
+    assert get(registry, "INFY.NS") is not None # TCS.NS is now the least recently used
+    put(registry, model, "HDFCBANK.NS")
+    assert get(registry, "TCS.NS") is None
+    assert get(registry, "INFY.NS") is not None
+    assert get(registry, "HDFCBANK.NS") is not None
+
+def test_size_bound_is_the_default(tmp_path, model):
+    registry = ModelRegistry(tmp_path)
+    for i in range(30):
+        put(registry, model, f"T{i}")
+    assert len(os.listdir(tmp_path)) == 30
+
+    entry_bytes = registry._entries()[0][1]['bytes']
+    small = ModelRegistry(tmp_path, max_bytes=10 * entry_bytes)
+    put(small, model, "T30")
+    assert len(os.listdir(tmp_path)) == 10
+    assert get(small, "T30") is not None
@@ -0,0 +1,121 @@
+# Equivalence of the array backtest engine with the original iterrows() loop
+# (benchmarks/bench_strategy.py times them against each other)
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.strategy as strategy
+from src.strategy import SignalGenerator, mean_reversion_engine, SIGNAL_NAMES
+
+def legacy_mean_reversion(dates, actuals, lower, upper):
+    # The original iterrows() implementation, kept as the reference
+    signals = []
+    current_pos = 0
+    entry_price = 0
+    pnl = []
+
+    df = pd.DataFrame({'Date': dates, 'Actual': actuals, 'Lower': lower, 'Upper': upper})
+    df['Midpoint'] = (df['Lower'] + df['Upper']) / 2
+
+    for i, row in df.iterrows():
+        price = row['Actual']
+        if current_pos == 0:
+            if price < row['Lower']:
+                current_pos = 1
+                entry_price = price
+                signals.append((row['Date'], "BUY", price))
+            elif price > row['Upper']:
+                current_pos = -1
+                entry_price = price
+                signals.append((row['Date'], "SELL", price))
+        elif current_pos == 1:
+            if price >= row['Midpoint']:
+                pnl.append(price - entry_price)
+                current_pos = 0
+                signals.append((row['Date'], "EXIT_LONG", price))
+        elif current_pos == -1:
+            if price <= row['Midpoint']:
+                pnl.append(entry_price - price)
+                current_pos = 0
+                signals.append((row['Date'], "EXIT_SHORT", price))
+
+    return df, signals, sum(pnl)
+
+def make_series(n_bars, rng):
+    dates = pd.bdate_range("2015-01-01", periods=n_bars)
+    actuals = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    center = actuals * (1 + rng.normal(0, 0.01, n_bars))
+    width = actuals * 0.01 # Narrow enough for regular entries and exits
+    return dates, actuals, center - width, center + width
+
+def engine_signals(trades, dates, row=0):
+    # TRADE_DTYPE records of one series -> the legacy (Date, Signal, Price) tuples
+    trades = trades[trades['row'] == row]
+    return [(dates[b], SIGNAL_NAMES[s], p) for b, s, p in zip(trades['bar'], trades['signal'], trades['price'])]
+
+@pytest.fixture(params=["numba", "python"])
+def engine(request, monkeypatch):
+    # Run every test on the compiled kernel and on the plain Python fallback
+    if request.param == "python":
+        kernel = strategy._mean_reversion_kernel
+        monkeypatch.setattr(strategy, "HAS_NUMBA", False)
+        monkeypatch.setattr(strategy, "_mean_reversion_kernel", getattr(kernel, "py_func", kernel))
+    elif not strategy.HAS_NUMBA:
+        pytest.skip("numba is not installed")
+    return request.param
+
+@pytest.mark.parametrize("seed", range(1, 6))
+def test_signal_generator_matches_legacy(engine, seed):
+    args = make_series(500, np.random.default_rng(seed))
+    _, ref_signals, ref_pnl = legacy_mean_reversion(*args)
+    series, signals, pnl = SignalGenerator().run_mean_reversion(*args)
+
+    assert len(ref_signals) > 0
+    assert signals == ref_signals
+    assert pnl == pytest.approx(ref_pnl, rel=0, abs=1e-9)
+
+    # The first value is the caller's series by name (a dict, no DataFrame is built)
+    assert list(series) == ['Date', 'Actual', 'Lower', 'Upper']
+    for name, values in zip(series, args):
+        assert series[name] is values
+
+def test_engine_1d_matches_legacy(engine):
+    dates, actuals, lower, upper = make_series(500, np.random.default_rng(7))
+    _, ref_signals, ref_pnl = legacy_mean_reversion(dates, actuals, lower, upper)
+    trades, pnl = mean_reversion_engine(actuals, lower, upper)
+
+    assert np.ndim(pnl) == 0
+    assert (trades['row'] == 0).all()
+    assert engine_signals(trades, dates) == ref_signals
+    assert pnl == pytest.approx(ref_pnl, rel=0, abs=1e-9)
+
+def test_engine_batch_matches_legacy(engine):
+    # One price path against a grid of band widths (broadcast), every row on its own
+    dates, actuals, lower, upper = make_series(300, np.random.default_rng(11))
+    center, half = (lower + upper) / 2, (upper - lower) / 2
+    factors = np.linspace(0.3, 2.0, 8)[:, None]
+    batch_lower, batch_upper = center - half * factors, center + half * factors
+
+    trades, pnl = mean_reversion_engine(actuals, batch_lower, batch_upper)
+
+    assert pnl.shape == (len(factors),)
+    for r in range(len(factors)):
+        _, ref_signals, ref_pnl = legacy_mean_reversion(dates, actuals, batch_lower[r], batch_upper[r])
+        assert engine_signals(trades, dates, r) == ref_signals
+        assert pnl[r] == pytest.approx(ref_pnl, rel=0, abs=1e-9)
+
+    # A 2-D batch of distinct series gives the same rows as running them one by one
+    rng = np.random.default_rng(12)
+    series = [make_series(300, rng)[1:] for _ in range(4)]
+    trades, pnl = mean_reversion_engine(*(np.stack(parts) for parts in zip(*series)))
+    for r, (actuals, lower, upper) in enumerate(series):
+        _, ref_signals, ref_pnl = legacy_mean_reversion(dates, actuals, lower, upper)
+        assert engine_signals(trades, dates, r) == ref_signals
+        assert pnl[r] == pytest.approx(ref_pnl, rel=0, abs=1e-9)
+
+def test_no_signal_series():
+    # Price always inside the band: no trades, zero PnL
+    actuals = np.full(50, 100.0)
+    trades, pnl = mean_reversion_engine(actuals, actuals - 1, actuals + 1)
+    assert len(trades) == 0
+    assert pnl == 0.0
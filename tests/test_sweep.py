@@ -0,0 +1,34 @@
+# The parameter sweep against one quantile pair fitted per confidence level
+import numpy as np
+
+from src.models import QuantileModels
+from src.sweep import ParameterSweep
+from src.utils import apply_calibration, band_metrics
+
+def test_sweep_matches_per_level_fits(monkeypatch):
+    rng = np.random.default_rng(0)
+    X_train, y_train = rng.normal(size=(400, 3)), rng.normal(0, 0.02, 400)
+    X_test, y_test = rng.normal(size=(100, 3)), rng.normal(0, 0.02, 100)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 100)))
+    confidence, calib = [0.8, 0.9], [0.5, 1.0]
+
+    calls = []
+    train_quantiles = QuantileModels.train_quantiles
+    def recording_train_quantiles(self, *args, **kwargs):
+        calls.append(1)
+        return train_quantiles(self, *args, **kwargs)
+    monkeypatch.setattr(QuantileModels, "train_quantiles", recording_train_quantiles)
+
+    table = ParameterSweep(calib, confidence).run(X_train, y_train, X_test, prices, y_test)
+    # The whole grid shares one binned Dataset
+    assert len(calls) == 1
+    assert len(table) == len(confidence) * len(calib)
+
+    for conf in confidence:
+        alpha_lower = (1 - conf) / 2
+        m_low, m_high = QuantileModels(alpha_lower, 1 - alpha_lower).train_lgbm(X_train, y_train)
+        for c in calib:
+            low, high = apply_calibration(m_low.predict(X_test), m_high.predict(X_test), c)
+            picp, mpiw = band_metrics(prices * (1 + y_test), prices * (1 + low), prices * (1 + high))
+            row = table[(table['confidence'] == conf) & (table['calib'] == c)].iloc[0]
+            np.testing.assert_allclose([row['picp'], row['mpiw']], [picp, mpiw])